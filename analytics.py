@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+import numpy as np
+
+# ==========================================
+# ANALÍTICA COLUMNAR DEL HISTORIAL
+# ==========================================
+# Número máximo de intervalos de una serie temporal (acota el tamaño de la respuesta)
+ANALYTICS_MAX_BUCKETS = int(os.environ.get('ANALYTICS_MAX_BUCKETS', 10000))
+# Filas reservadas al crear las columnas (después crecen duplicando su capacidad)
+INITIAL_CAPACITY = 1024
+# Bloques leídos de la cadena por lote al ponerse al día
+SYNC_BATCH_BLOCKS = 1000
+
+TOP_CRITERIA = ('sent', 'received', 'rewards', 'transactions', 'balance')
+
+# Columnas por transacción y por bloque: nombre -> tipo NumPy
+_TX_COLUMNS = {'height': np.int32, 'sender': np.int32, 'recipient': np.int32, 'amount': np.int64}
+_BLOCK_COLUMNS = {'timestamp': np.float64, 'tx_offset': np.int64}
+
+
+class ChainAnalytics:
+    """
+    Representación columnar del historial confirmado para consultas agregadas: una fila por transacción
+    (altura, remitente, destinatario y monto) y una por bloque (marca de tiempo y primera fila de sus
+    transacciones). Las direcciones se internan como enteros (SYSTEM es siempre el 0), de modo que los
+    agregados por dirección o por intervalo se resuelven con np.bincount sobre las columnas en lugar de
+    recorrer diccionarios.
+    Las columnas se llenan de forma incremental: cada consulta incorpora antes los bloques añadidos desde
+    la anterior (la primera recorre la cadena una vez), sin intervenir en la confirmación de bloques.
+    Se guarda el hash de cada bloque incorporado: si una reorganización reemplaza alguno, las columnas se
+    recortan hasta el último bloque común antes de incorporar los nuevos.
+    En un nodo podado sin archivo empiezan en el primer bloque con cuerpo disponible ('first_height').
+    """
+
+    def __init__(self, chain):
+        self._chain = chain
+        self._ids = {'SYSTEM': 0}
+        self._addresses = ['SYSTEM']
+        self._tx = {name: np.zeros(INITIAL_CAPACITY, dtype) for name, dtype in _TX_COLUMNS.items()}
+        self._blocks = {name: np.zeros(INITIAL_CAPACITY, dtype) for name, dtype in _BLOCK_COLUMNS.items()}
+        self._tx_count = 0
+        self._block_count = 0
+        # Altura del primer bloque incorporado (None hasta la primera consulta) y hashes de los incorporados
+        self._first_height = None
+        self._hashes = []
+        self._lock = threading.Lock()
+
+    # ==========================================
+    #          CONSTRUCCIÓN INCREMENTAL
+    # ==========================================
+
+    @property
+    def height(self) -> int:
+        """
+        Altura del último bloque incorporado a las columnas.
+        """
+        return (self._first_height or 1) - 1 + self._block_count
+
+    def sync(self) -> int:
+        """
+        Incorpora los bloques añadidos a la cadena desde la última llamada. Retorna la altura alcanzada.
+        """
+        with self._lock:
+            self._sync()
+            return self.height
+
+    def _sync(self):
+        chain = self._chain
+        if self._first_height is None or self.height < chain.available_from:
+            # Primera consulta, o bloques aún no incorporados que se podaron entre tanto
+            self._reset(chain.available_from + 1)
+        self._rollback()
+        while self.height < len(chain):
+            start = self.height
+            stop = min(len(chain), start + SYNC_BATCH_BLOCKS)
+            hashes = self._chain_hashes(start, stop)
+            blocks = list(chain.iter_blocks(start, stop))
+            # Si la cadena cambió mientras se leía el lote (reorganización en curso), se reintenta en la
+            # siguiente consulta: el lote debe enlazar con el último bloque incorporado y sus hashes no variar
+            if (not blocks or len(blocks) != len(hashes) or self._chain_hashes(start, stop) != hashes
+                    or (self._hashes and blocks[0]['previous_hash'] != self._hashes[-1])):
+                break
+            self._append(blocks)
+            self._hashes.extend(hashes)
+
+    def _chain_hashes(self, start: int, stop: int) -> list:
+        try:
+            return [self._chain.hash_at(position) for position in range(start, stop)]
+        except IndexError:
+            return None
+
+    def _rollback(self):
+        """
+        Recorta las columnas hasta el último bloque incorporado que sigue perteneciendo a la cadena.
+        """
+        height = self.height
+        while (height >= self._first_height
+               and self._chain_hashes(height - 1, height) != [self._hashes[height - self._first_height]]):
+            height -= 1
+        if height < self.height:
+            self._block_count = height - self._first_height + 1
+            self._tx_count = int(self._blocks['tx_offset'][self._block_count])
+            del self._hashes[self._block_count:]
+
+    def _reset(self, first_height: int):
+        self._tx_count = 0
+        self._block_count = 0
+        self._first_height = first_height
+        self._hashes = []
+
+    def _intern(self, address: str) -> int:
+        address_id = self._ids.get(address)
+        if address_id is None:
+            address_id = self._ids[address] = len(self._addresses)
+            self._addresses.append(address)
+        return address_id
+
+    def _append(self, blocks: list):
+        """
+        Añade un lote de bloques consecutivos (los que siguen a la altura actual) a las columnas.
+        """
+        intern = self._intern
+        heights, senders, recipients, amounts, timestamps, offsets = [], [], [], [], [], []
+        offset = self._tx_count
+        for block in blocks:
+            timestamps.append(block['timestamp'])
+            offsets.append(offset)
+            height = block['index']
+            for tx in block['transactions']:
+                heights.append(height)
+                senders.append(intern(tx['sender']))
+                recipients.append(intern(tx['recipient']))
+                amounts.append(int(tx['amount']))
+            offset += len(block['transactions'])
+
+        self._tx_count = self._extend(self._tx, self._tx_count, {
+            'height': heights, 'sender': senders, 'recipient': recipients, 'amount': amounts})
+        self._block_count = self._extend(self._blocks, self._block_count, {
+            'timestamp': timestamps, 'tx_offset': offsets})
+
+    @staticmethod
+    def _extend(columns: dict, count: int, values: dict) -> int:
+        """
+        Escribe 'values' a continuación de las 'count' filas ocupadas, duplicando la capacidad si hace falta.
+        Retorna el nuevo número de filas.
+        """
+        added = len(next(iter(values.values())))
+        needed = count + added
+        capacity = len(next(iter(columns.values())))
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            for name, column in columns.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:count] = column[:count]
+                columns[name] = grown
+        for name, column in columns.items():
+            column[count:needed] = values[name]
+        return needed
+
+    # ==========================================
+    #              AGREGADOS
+    # ==========================================
+
+    def _columns(self) -> tuple[dict, dict]:
+        """
+        Vistas de las filas ocupadas (se usan siempre con el candado tomado).
+        """
+        self._sync()
+        tx = {name: column[:self._tx_count] for name, column in self._tx.items()}
+        blocks = {name: column[:self._block_count] for name, column in self._blocks.items()}
+        return tx, blocks
+
+    def _sums(self, ids: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+        """
+        Suma de 'weights' (o número de filas) por id de dirección. Los montos se acumulan en float64,
+        exacto mientras cada total quede por debajo de 2**53.
+        """
+        sums = np.bincount(ids, weights=weights, minlength=len(self._addresses))
+        return np.rint(sums).astype(np.int64) if weights is not None else sums
+
+    def summary(self) -> dict:
+        """
+        Totales del historial incorporado: bloques, transferencias, direcciones, volumen y emisión.
+        """
+        with self._lock:
+            tx, blocks = self._columns()
+            issued = tx['sender'] == 0
+            rewards = issued & (tx['height'] > 1)
+            active = np.union1d(tx['sender'][~issued], tx['recipient'])
+            return {
+                'first_height': self._first_height,
+                'height': self.height,
+                'blocks': self._block_count,
+                'transactions': int(np.count_nonzero(~issued)),
+                'addresses': int(active.size),
+                'volume': int(tx['amount'][~issued].sum()),
+                'rewards': int(tx['amount'][rewards].sum()),
+                'issued': int(tx['amount'][issued].sum()),
+                'first_timestamp': float(blocks['timestamp'][0]) if self._block_count else None,
+                'last_timestamp': float(blocks['timestamp'][-1]) if self._block_count else None,
+            }
+
+    def volume_series(self, blocks_per_bucket: int = None, seconds_per_bucket: float = None,
+                      start: int = None, stop: int = None) -> dict:
+        """
+        Serie temporal por intervalos de 'blocks_per_bucket' bloques o de 'seconds_per_bucket' segundos
+        (según la marca de tiempo de cada bloque), opcionalmente limitada a las alturas [start, stop]:
+        bloques, transferencias, volumen transferido y recompensas de minado de cada intervalo.
+        Lanza ValueError si la serie tendría más de ANALYTICS_MAX_BUCKETS intervalos.
+        """
+        with self._lock:
+            tx, blocks = self._columns()
+            first = max(start or self._first_height, self._first_height)
+            last = min(stop or self.height, self.height)
+            if last < first:
+                return {'start': [], 'blocks': [], 'transactions': [], 'volume': [], 'rewards': []}
+            low, high = first - self._first_height, last - self._first_height + 1
+            timestamps = blocks['timestamp'][low:high]
+            tx_low = int(blocks['tx_offset'][low])
+            tx_high = int(blocks['tx_offset'][high]) if high < self._block_count else self._tx_count
+            heights = tx['height'][tx_low:tx_high]
+
+            if seconds_per_bucket:
+                origin = float(timestamps.min())
+                block_buckets = ((timestamps - origin) // seconds_per_bucket).astype(np.int64)
+                tx_buckets = block_buckets[heights - first]
+            else:
+                origin = first
+                block_buckets = np.arange(high - low, dtype=np.int64) // blocks_per_bucket
+                tx_buckets = (heights - first).astype(np.int64) // blocks_per_bucket
+            count = int(block_buckets.max()) + 1
+            if count > ANALYTICS_MAX_BUCKETS:
+                raise ValueError(f"La serie tendría {count} intervalos (máximo {ANALYTICS_MAX_BUCKETS}).")
+
+            amounts = tx['amount'][tx_low:tx_high]
+            issued = tx['sender'][tx_low:tx_high] == 0
+            transfer_amounts = np.where(issued, 0, amounts)
+            reward_amounts = np.where(issued & (heights > 1), amounts, 0)
+            size = seconds_per_bucket or blocks_per_bucket
+
+            def per_bucket(buckets, weights=None):
+                sums = np.bincount(buckets, weights=weights, minlength=count)
+                return np.rint(sums).astype(np.int64).tolist()
+
+            return {
+                'start': (origin + np.arange(count) * size).tolist(),
+                'blocks': per_bucket(block_buckets),
+                'transactions': per_bucket(tx_buckets, ~issued),
+                'volume': per_bucket(tx_buckets, transfer_amounts),
+                'rewards': per_bucket(tx_buckets, reward_amounts),
+            }
+
+    def _totals(self, by: str) -> np.ndarray:
+        """
+        Valor por id de dirección según el criterio: 'sent' (monto enviado), 'received' (monto recibido,
+        incluidas recompensas), 'rewards' (recompensas de minado), 'transactions' (transferencias en las
+        que participa) o 'balance' (saldo confirmado), con el candado tomado.
+        """
+        tx, _ = self._columns()
+        senders, recipients, amounts = tx['sender'], tx['recipient'], tx['amount']
+        if by == 'sent':
+            return self._sums(senders, amounts)
+        if by == 'received':
+            return self._sums(recipients, amounts)
+        if by == 'rewards':
+            rewards = (senders == 0) & (tx['height'] > 1)
+            return self._sums(recipients, np.where(rewards, amounts, 0))
+        if by == 'transactions':
+            transfers = senders != 0
+            counts = self._sums(senders[transfers]) + self._sums(recipients[transfers])
+            # Una transferencia a uno mismo cuenta una sola vez
+            return counts - self._sums(senders[transfers & (senders == recipients)])
+        if by == 'balance':
+            return self._sums(recipients, amounts) - self._sums(senders, amounts)
+        raise ValueError(f"Criterio desconocido: {by}.")
+
+    def top_addresses(self, by: str, limit: int = None) -> list:
+        """
+        Direcciones con mayor valor según el criterio de _totals() (las limit primeras, o todas con valor
+        positivo), como [(dirección, valor)] ordenadas de mayor a menor y, a igualdad, por dirección.
+        """
+        with self._lock:
+            values = self._totals(by)
+            values[0] = 0  # SYSTEM no participa en los rankings
+            candidates = np.flatnonzero(values > 0)
+            if limit is not None and limit < candidates.size:
+                # Umbral del top-K con argpartition; los empates en el umbral se resuelven después por dirección
+                threshold = values[candidates[np.argpartition(-values[candidates], limit - 1)[limit - 1]]]
+                candidates = candidates[values[candidates] >= threshold]
+            ranked = sorted(((self._addresses[i], int(values[i])) for i in candidates),
+                            key=lambda item: (-item[1], item[0]))
+            return ranked[:limit] if limit is not None else ranked
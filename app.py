@@ -1,14 +1,23 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-from time import time
-from flask import Flask, jsonify, request, render_template
+import hashlib
+import math
+from time import perf_counter
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
 # Importación de módulos locales para la lógica de blockchain y criptografía
+from analytics import TOP_CRITERIA
 from blockchain import Blockchain, FOUNDER_PRIVATE_KEY, FOUNDER_ADDRESS
+from chain_store import BlockPrunedError
 from keys import Keys
+from mining_jobs import MiningJobManager
+from network import PeerNetwork, create_network_blueprint
+from realtime import DeltaPublisher, address_room
+from response_cache import ResponseCache
+import metrics
 
 # ==========================================
 # CONFIGURACIÓN DE LA APLICACIÓN FLASK
@@ -28,11 +37,59 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Instancia de la Blockchain (gestiona la base de datos y la lógica de cadena)
 blockchain = Blockchain()
 
+# Eventos WebSocket con deltas compactos (transacciones, cabeceras de bloque y saldos modificados),
+# agrupados por ventanas de DELTA_DEBOUNCE_MS. Cubre minado local, API y bloques/transacciones de pares.
+delta_publisher = DeltaPublisher(blockchain, socketio.emit)
+
+# Trabajos de minado asíncronos: /mine encola y responde de inmediato
+mining_jobs = MiningJobManager(blockchain)
+
+# Red entre nodos: registro de pares, difusión de bloques/transacciones y consenso (/nodes, /network)
+network = PeerNetwork(blockchain)
+app.register_blueprint(create_network_blueprint(network))
+
+# Métricas del nodo (/metrics) y perfilador por muestreo opcional (/debug/profile)
+HTTP_REQUEST_SECONDS = metrics.histogram('http_request_seconds', 'Duración de las peticiones HTTP por ruta.',
+                                         ('method', 'route', 'status'))
+metrics.gauge('blockchain_height', 'Número de bloques de la cadena.', lambda: blockchain.height)
+metrics.gauge('blockchain_difficulty', 'Dificultad de minado vigente.', lambda: blockchain.difficulty)
+metrics.gauge('mempool_transactions', 'Transacciones pendientes en el Mempool.', lambda: len(blockchain.mempool))
+metrics.gauge('network_peers', 'Nodos pares registrados.', lambda: len(blockchain.nodes))
+metrics.gauge('blockchain_pruned_height', 'Altura hasta la que se han podado los cuerpos de los bloques.',
+              lambda: blockchain.pruned_height)
+metrics.gauge('sqlite_database_bytes', 'Tamaño en disco de la BD y de su WAL.',
+              lambda: sum(blockchain.storage.disk_usage()[key] for key in ('database', 'wal')))
+profiler = metrics.SamplingProfiler()
+
+# Caché de las respuestas de consulta más sondeadas (/balances, /leaders, /chain, /mempool, /aliases):
+# guarda el JSON ya serializado junto a la versión del estado de la que se derivó
+response_cache = ResponseCache()
+metrics.gauge('response_cache_bytes', 'Memoria ocupada por las respuestas en caché.',
+              lambda: response_cache.stats()['bytes'])
+
+# Número máximo de transacciones aceptadas por /transactions/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+# Cabeceras incluidas por defecto en /proof/<txid> (desde el bloque de la transacción hacia la punta) y máximo
+PROOF_HEADERS = int(os.environ.get('PROOF_HEADERS', 6))
+MAX_PROOF_HEADERS = int(os.environ.get('MAX_PROOF_HEADERS', 1000))
+
 # Registro de Alias: Mapeo de nombres legibles a direcciones públicas
 # Se inicializa con la dirección del fundador pre-cargada
 alias_registry = {
     'FOUNDER': FOUNDER_ADDRESS
 }
+# Versión del registro de alias (cambia con cada registro; invalida /aliases en la caché)
+alias_version = 0
+
+
+def cached_json(endpoint: str, key, version, build) -> Response:
+    """
+    Respuesta JSON servida desde la caché si ya se serializó para esta versión del estado.
+    build() construye el objeto solo en caso de fallo; la salida es idéntica a la de jsonify.
+    La versión debe haberse leído antes de llamar aquí (ver ResponseCache).
+    """
+    body = response_cache.get_or_build(endpoint, key, version, lambda: app.json.response(build()).get_data())
+    return Response(body, mimetype=app.json.mimetype)
 
 # ==========================================
 # RUTAS DEL SISTEMA
@@ -44,7 +101,63 @@ def health_check():
     Endpoint para verificar el estado del servicio.
     Retorna el estado operativo y la dificultad actual de minado.
     """
-    return jsonify({"status": "OK", "message": "Simulador Activo", "difficulty": 4}), 200
+    return jsonify({"status": "OK", "message": "Simulador Activo", "difficulty": blockchain.difficulty}), 200
+
+@app.errorhandler(BlockPrunedError)
+def block_pruned(error):
+    """ Bloques cuyo cuerpo ya no guarda este nodo (poda sin archivo): 410 Gone. """
+    return jsonify({'message': f'Error: {error}'}), 410
+
+if metrics.METRICS_ENABLED:
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Se etiqueta con la regla de la ruta (no con la URL) para acotar el número de series
+            route = request.url_rule.rule if request.url_rule else 'desconocida'
+            HTTP_REQUEST_SECONDS.observe(perf_counter() - started, request.method, route, response.status_code)
+        return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """ Métricas del nodo en el formato de texto de Prometheus. """
+    return Response(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/cache', methods=['GET'])
+def cache_stats():
+    """ Estado de la caché de respuestas: entradas, memoria y tasa de aciertos por endpoint. """
+    return jsonify(response_cache.stats()), 200
+
+@app.route('/debug/profile', methods=['GET'])
+def profile_node():
+    """
+    Perfila todos los hilos del nodo por muestreo durante una ventana de tiempo (requiere PROFILER_ENABLED=1).
+    Parámetros opcionales: seconds (por defecto 10), sort (p. ej. cumulative, tottime), limit,
+    format=pstats para descargar el resultado como archivo .pstats.
+    """
+    if not metrics.PROFILER_ENABLED:
+        return jsonify({'message': 'Error: Perfilador deshabilitado (PROFILER_ENABLED=1).'}), 404
+    seconds = request.args.get('seconds', 10, type=float)
+    limit = request.args.get('limit', 40, type=int)
+    sort = request.args.get('sort', 'cumulative')
+    if not 0 < seconds <= metrics.PROFILER_MAX_SECONDS:
+        return jsonify({'message': f'Error: seconds debe estar entre 0 y {metrics.PROFILER_MAX_SECONDS}.'}), 400
+    try:
+        profiler.run(seconds)
+    except RuntimeError as error:
+        return jsonify({'message': f'Error: {error}'}), 409
+    if request.args.get('format') == 'pstats':
+        response = Response(profiler.dump(), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = 'attachment; filename=node.pstats'
+        return response
+    try:
+        return Response(profiler.report(sort, limit), mimetype='text/plain; charset=utf-8')
+    except KeyError:
+        return jsonify({'message': 'Error: Criterio de ordenación inválido.'}), 400
 
 @app.route('/')
 def get_index():
@@ -76,9 +189,6 @@ def faucet_funds():
 
     success, msg = blockchain.issue_faucet_funds(recipient)
     if not success: return jsonify({'message': msg}), 500
-
-    # Emisión de evento WebSocket: Notificar a los clientes para actualizar el mempool
-    socketio.emit('actualizacion_mempool', {'msg': 'Faucet utilizado'})
     
     return jsonify({'message': 'Exito: ' + str(msg)}), 200
 
@@ -87,12 +197,14 @@ def register_alias():
     """
     Registra un alias legible para una clave pública específica.
     """
+    global alias_version
     values = request.get_json()
     alias = values.get('alias')
     pub = values.get('public_key')
     if not alias or not pub: return jsonify({'message': 'Error: Faltan datos requeridos.'}), 400
     
     alias_registry[alias] = pub
+    alias_version += 1
     return jsonify({'message': 'Alias registrado correctamente.'}), 201
 
 @app.route('/aliases', methods=['GET'])
@@ -100,7 +212,7 @@ def get_aliases():
     """
     Retorna el registro completo de alias para su resolución en el frontend.
     """
-    return jsonify(alias_registry), 200
+    return cached_json('aliases', None, alias_version, lambda: alias_registry), 200
 
 @app.route('/transactions/verify_only', methods=['POST'])
 def verify_transaction_only():
@@ -120,7 +232,7 @@ def verify_transaction_only():
 def new_transaction():
     """
     Crea una nueva transacción y la añade al Mempool.
-    Emite un evento WebSocket para actualizar la interfaz de los clientes conectados.
+    Los clientes WebSocket reciben la transacción como delta en 'actualizacion_mempool'.
     """
     v = request.get_json()
     try: amt = int(v['amount'])
@@ -129,51 +241,64 @@ def new_transaction():
     success, msg = blockchain.new_transaction(v['sender_pub'], v['recipient'], amt, v['signature'])
     if not success: return jsonify({'message': msg}), 400
 
-    # Emisión de evento WebSocket: Notificar nueva transacción pendiente
-    socketio.emit('actualizacion_mempool', {'msg': 'Nueva transacción pendiente'})
-
     return jsonify({'message': msg}), 201
 
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions_batch():
+    """
+    Recibe un lote de transacciones y las añade al Mempool.
+    Las firmas se verifican en paralelo y la admisión es atómica frente a los saldos.
+    Retorna el resultado de cada transacción en el mismo orden del lote.
+    """
+    v = request.get_json()
+    items = v.get('transactions') if isinstance(v, dict) else v
+    if not isinstance(items, list) or not items: return jsonify({'message': 'Error: Se requiere una lista de transacciones.'}), 400
+    if len(items) > MAX_BATCH_SIZE: return jsonify({'message': f'Error: El lote supera el máximo de {MAX_BATCH_SIZE} transacciones.'}), 413
+
+    results = [None] * len(items)
+    batch, positions = [], []
+    for i, tx in enumerate(items):
+        try:
+            batch.append((tx['sender_pub'], tx['recipient'], int(tx['amount']), tx['signature']))
+            positions.append(i)
+        except (KeyError, TypeError, ValueError):
+            results[i] = {'index': i, 'accepted': False, 'message': 'Error: Transacción malformada o monto inválido.'}
+
+    for i, (accepted, msg) in zip(positions, blockchain.new_transactions_batch(batch)):
+        results[i] = {'index': i, 'accepted': accepted, 'message': msg}
+
+    accepted_count = sum(1 for r in results if r['accepted'])
+    return jsonify({'results': results, 'accepted': accepted_count, 'rejected': len(results) - accepted_count}), 200
+
 @app.route('/mine', methods=['POST'])
 def mine():
     """
-    Ejecuta el algoritmo de Prueba de Trabajo (PoW) para minar un nuevo bloque.
-    Sincroniza el tiempo de minado y creación del bloque para asegurar la consistencia del hash.
+    Encola un trabajo de Prueba de Trabajo (PoW) para minar un nuevo bloque y retorna su id.
+    Las solicitudes concurrentes para la misma altura se agrupan en un único trabajo.
+    La finalización se notifica con el evento WebSocket 'bloque_minado'.
     """
     v = request.get_json()
     miner = v.get('miner_address')
     if not miner: return jsonify({'message': 'Error: Se requiere dirección del minero.'}), 400
 
-    blockchain.node_id = miner
-    last_block = blockchain.last_block
-    
-    # Captura del tiempo actual para asegurar consistencia entre el cálculo del nonce y el bloque final
-    timestamp_fijo = time()
-    
-    # Ejecución de PoW con tiempo congelado
-    nonce = blockchain.proof_of_work(last_block, current_time=timestamp_fijo)
-    
-    # Creación y persistencia del bloque con el nonce encontrado
-    block = blockchain._new_block(
-        previous_hash=blockchain._hash(last_block), 
-        nonce=nonce, 
-        current_time=timestamp_fijo
-    )
-
-    # Construcción de la respuesta con detalles técnicos para el frontend
+    job, coalesced = mining_jobs.submit(miner)
     response = {
-        'message': "Nuevo bloque minado exitosamente.",
-        'index': block['index'],
-        'nonce': block['nonce'],
-        'previous_hash': block['previous_hash'],
-        'transactions': block['transactions'],
-        'hash': blockchain._hash(block)
+        'message': 'Trabajo de minado en curso.' if coalesced else 'Trabajo de minado encolado.',
+        'job_id': job['id'],
+        'status': job['status'],
+        'height': job['height'],
+        'coalesced': coalesced
     }
-    
-    # Emisión de evento WebSocket: Notificar a todos los nodos sobre el nuevo bloque
-    socketio.emit('bloque_minado', {'index': block['index'], 'miner': miner})
-    
-    return jsonify(response), 200
+    return jsonify(response), 202
+
+@app.route('/mine/<job_id>', methods=['GET'])
+def mine_status(job_id):
+    """
+    Retorna el estado, el hashrate y el resultado de un trabajo de minado.
+    """
+    job = mining_jobs.get(job_id)
+    if not job: return jsonify({'message': 'Error: Trabajo de minado no encontrado.'}), 404
+    return jsonify(job), 200
 
 # ==========================================
 # RUTAS DE CONSULTA E INFORMACIÓN
@@ -181,29 +306,239 @@ def mine():
 
 @app.route('/chain', methods=['GET'])
 def full_chain(): 
-    """ Retorna la cadena de bloques completa y su longitud. """
-    return jsonify({'chain': blockchain.chain, 'length': len(blockchain.chain)}), 200
+    """
+    Retorna la cadena de bloques y su longitud total.
+    Parámetros opcionales:
+        from: índice del primer bloque (desde 1). limit: número máximo de bloques.
+        since_hash: solo los bloques posteriores al bloque con ese hash (sincronización incremental).
+        format=ndjson: un bloque por línea en streaming, leído directamente de la tabla 'blocks'.
+    El ETag se deriva del hash de la punta y del formato; con If-None-Match coincidente se responde 304.
+    La respuesta JSON (no la de streaming) se sirve de la caché de respuestas mientras la punta no cambie.
+    """
+    length, tip_hash = blockchain.state_version[:2]
+    ndjson = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+    etag = tip_hash
+    if request.query_string:
+        etag += '-' + hashlib.sha256(request.query_string).hexdigest()[:16]
+    if ndjson:
+        # El formato también se negocia con Accept: cada representación tiene su propio ETag
+        etag += '-ndjson'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.vary.add('Accept')
+        return response
+
+    start = 0
+    since_hash = request.args.get('since_hash')
+    if since_hash:
+        position = blockchain.find_block_position(since_hash)
+        if position is None: return jsonify({'message': 'Error: Hash de bloque desconocido.'}), 404
+        start = position + 1
+
+    from_index = request.args.get('from', type=int)
+    limit = request.args.get('limit', type=int)
+    if ('from' in request.args and (from_index is None or from_index < 1)) or \
+            ('limit' in request.args and (limit is None or limit < 1)):
+        return jsonify({'message': 'Error: Parámetros de paginación inválidos.'}), 400
+    if from_index:
+        start = max(start, from_index - 1)
+    # Ventana acotada a la longitud leída para el ETag: un bloque confirmado entre medias no entra en un
+    # cuerpo que se sirve (y se guarda en caché) bajo la punta anterior
+    count = max(0, length - start if limit is None else min(limit, length - start))
+
+    if ndjson:
+        lines = (block_string + '\n' for block_string in blockchain.iter_block_strings(start, count))
+        response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    else:
+        def build():
+            body = {'chain': blockchain.get_blocks(start, count), 'length': length}
+            if request.args:
+                # Metadatos de paginación solo cuando se solicita una ventana de la cadena
+                end = start + len(body['chain'])
+                body['from'] = start + 1
+                body['next_from'] = end + 1 if end < length else None
+                body['tip_hash'] = tip_hash
+            return body
+        response = cached_json('chain', request.query_string, (length, tip_hash, blockchain.pruned_height), build)
+
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    return response, 200
 
 @app.route('/mempool', methods=['GET'])
 def get_mempool(): 
-    """ Retorna las transacciones pendientes en el Mempool. """
-    return jsonify(blockchain.mempool), 200
+    """ Retorna las transacciones pendientes en el Mempool (cada una con su 'txid'). """
+    return cached_json('mempool', None, blockchain.state_version, lambda: blockchain.mempool_with_ids), 200
 
 @app.route('/balances', methods=['GET'])
 def get_all_balances(): 
     """ Retorna el estado actual de cuentas (UTXO abstraído). """
-    return jsonify(blockchain.get_all_balances()), 200
+    return cached_json('balances', None, blockchain.state_version, blockchain.get_all_balances), 200
 
 @app.route('/leaders', methods=['GET'])
 def get_leaders(): 
-    """ Retorna la tabla de clasificación de mineros por recompensas obtenidas. """
-    return jsonify(blockchain.get_leaders()), 200
+    """
+    Retorna la tabla de clasificación de mineros por recompensas obtenidas.
+    Parámetro opcional: limit (los N mineros con más recompensas).
+    """
+    limit = request.args.get('limit', type=int)
+    if 'limit' in request.args and (limit is None or limit < 1):
+        return jsonify({'message': 'Error: Parámetro limit inválido.'}), 400
+    # Las estadísticas de mineros se recalculan tras una reorganización: su generación forma parte de la versión
+    version = (blockchain.stats.generation, *blockchain.state_version[:2])
+    return cached_json('leaders', limit, version, lambda: blockchain.get_leaders(limit)), 200
+
+@app.route('/address/<address>/stats', methods=['GET'])
+def get_address_stats(address):
+    """ Retorna las estadísticas de actividad de una dirección y su saldo en tiempo real. """
+    stats = blockchain.get_address_stats(address)
+    if stats is None: return jsonify({'message': 'Error: Dirección sin actividad en la cadena.'}), 404
+    stats['available_balance'] = blockchain.get_balance(address)
+    return jsonify(stats), 200
+
+@app.route('/address/<address>/history', methods=['GET'])
+def get_address_history(address):
+    """
+    Historial de transacciones confirmadas de una dirección, de la más reciente a la más antigua.
+    Parámetros opcionales: limit y cursor (el 'next_cursor' de la página anterior).
+    """
+    limit = request.args.get('limit', type=int)
+    if 'limit' in request.args and (limit is None or limit < 1):
+        return jsonify({'message': 'Error: Parámetro limit inválido.'}), 400
+    before = None
+    if request.args.get('cursor'):
+        try:
+            block_index, position = request.args['cursor'].split('-')
+            before = (int(block_index), int(position))
+        except ValueError:
+            return jsonify({'message': 'Error: Parámetro cursor inválido.'}), 400
+    entries, next_before = blockchain.get_address_history(address, before, limit)
+    return jsonify({
+        'address': address,
+        'transactions': entries,
+        'next_cursor': f"{next_before[0]}-{next_before[1]}" if next_before else None
+    }), 200
+
+@app.route('/tx/<txid>', methods=['GET'])
+def get_transaction(txid):
+    """ Retorna una transacción por su hash, confirmada (con su bloque) o pendiente en el Mempool. """
+    found = blockchain.get_transaction(txid)
+    if found is None: return jsonify({'message': 'Error: Transacción desconocida.'}), 404
+    return jsonify(found), 200
+
+@app.route('/proof/<txid>', methods=['GET'])
+def get_proof(txid):
+    """
+    Prueba de inclusión de una transacción confirmada para clientes ligeros: ruta de Merkle y
+    cabeceras desde su bloque (?headers=N, por defecto PROOF_HEADERS). Se verifica con merkle.verify_inclusion,
+    que exige anclar las cabeceras en un hash o una cabecera de confianza obtenidos por otra vía: la prueba
+    por sí sola no demuestra que el bloque pertenezca a la cadena.
+    """
+    try:
+        headers = min(max(1, int(request.args.get('headers', PROOF_HEADERS))), MAX_PROOF_HEADERS)
+    except ValueError:
+        return jsonify({'message': 'Error: Parámetro headers inválido.'}), 400
+    proof, msg = blockchain.get_merkle_proof(txid, headers)
+    if proof is None: return jsonify({'message': f'Error: {msg}'}), 404
+    return jsonify(proof), 200
+
+@app.route('/block/<reference>', methods=['GET'])
+def get_block(reference):
+    """ Retorna un bloque por su altura (base 1) o por su hash. """
+    block = blockchain.get_block(reference)
+    if block is None: return jsonify({'message': 'Error: Bloque desconocido.'}), 404
+    return jsonify(block), 200
 
 @app.route('/validate', methods=['GET'])
 def validate_chain():
-    """ Verifica la integridad criptográfica de toda la cadena. """
-    valid = blockchain.is_chain_valid()
-    return jsonify({'valid': valid, 'message': 'Cadena válida' if valid else 'Cadena inválida'}), 200 if valid else 500
+    """
+    Verifica la integridad criptográfica de la cadena.
+    Por defecto solo revisa los bloques posteriores al último punto de control;
+    con ?full=true audita la cadena completa en paralelo.
+    """
+    full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+    valid, report = blockchain.validate_chain(full=full)
+    response = {'valid': valid, 'message': 'Cadena válida' if valid else 'Cadena inválida'}
+    response.update(report)
+    return jsonify(response), 200 if valid else 500
+
+# ==========================================
+# RUTAS DE ANALÍTICA
+# ==========================================
+
+@app.route('/analytics/summary', methods=['GET'])
+def analytics_summary():
+    """ Totales del historial confirmado: bloques, transferencias, direcciones, volumen y emisión. """
+    version = blockchain.state_version[:2]
+    return cached_json('analytics_summary', None, version, blockchain.analytics.summary), 200
+
+@app.route('/analytics/volume', methods=['GET'])
+def analytics_volume():
+    """
+    Serie temporal de bloques, transferencias, volumen y recompensas por intervalo.
+    Parámetros opcionales: blocks (bloques por intervalo, 100 por defecto) o seconds (segundos por
+    intervalo según la marca de tiempo de los bloques), y from/to (rango de alturas).
+    """
+    blocks = request.args.get('blocks', type=int)
+    seconds = request.args.get('seconds', type=float)
+    start = request.args.get('from', type=int)
+    stop = request.args.get('to', type=int)
+    if 'blocks' in request.args and 'seconds' in request.args:
+        return jsonify({'message': 'Error: Indique blocks o seconds, no ambos.'}), 400
+    if ('blocks' in request.args and (blocks is None or blocks < 1)) or \
+            ('seconds' in request.args and (seconds is None or not math.isfinite(seconds) or seconds <= 0)):
+        return jsonify({'message': 'Error: Tamaño de intervalo inválido.'}), 400
+    if any(name in request.args and (value is None or value < 1) for name, value in (('from', start), ('to', stop))):
+        return jsonify({'message': 'Error: Rango de alturas inválido.'}), 400
+    if seconds is None and blocks is None:
+        blocks = 100
+
+    def build():
+        series = blockchain.analytics.volume_series(blocks, seconds, start, stop)
+        return dict(series, bucket='seconds' if seconds else 'blocks', size=seconds or blocks)
+    try:
+        return cached_json('analytics_volume', request.query_string, blockchain.state_version[:2], build), 200
+    except ValueError as error:
+        return jsonify({'message': f'Error: {error}'}), 400
+
+@app.route('/analytics/top', methods=['GET'])
+def analytics_top():
+    """
+    Ranking de direcciones. Parámetros opcionales: by (sent, received, rewards, transactions o balance;
+    sent por defecto) y limit (10 por defecto).
+    """
+    by = request.args.get('by', 'sent')
+    limit = request.args.get('limit', 10, type=int)
+    if by not in TOP_CRITERIA:
+        return jsonify({'message': f"Error: Criterio inválido (use {', '.join(TOP_CRITERIA)})."}), 400
+    if limit is None or limit < 1:
+        return jsonify({'message': 'Error: Parámetro limit inválido.'}), 400
+
+    def build():
+        ranked = blockchain.analytics.top_addresses(by, limit)
+        return {'by': by, 'addresses': [{'address': address, 'value': value} for address, value in ranked]}
+    return cached_json('analytics_top', (by, limit), blockchain.state_version[:2], build), 200
+
+# ==========================================
+# SUSCRIPCIONES WEBSOCKET
+# ==========================================
+
+@socketio.on('suscribir')
+def subscribe_address(data):
+    """
+    Une al cliente a la sala de una dirección: recibirá 'saldo_actualizado' cuando cambie su saldo.
+    """
+    address = (data or {}).get('address')
+    if not address: return
+    join_room(address_room(address))
+    emit('saldo_actualizado', {'address': address, 'balance': blockchain.get_balance(address), 'transactions': []})
+
+@socketio.on('desuscribir')
+def unsubscribe_address(data):
+    """ Abandona la sala de una dirección. """
+    address = (data or {}).get('address')
+    if address: leave_room(address_room(address))
 
 # ==========================================
 # PUNTO DE ENTRADA
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la analítica columnar (analytics.ChainAnalytics) frente a los bucles sobre diccionarios,
+sobre una cadena sintética de 1M de transacciones (100k bloques con la Coinbase y 9 transferencias).
+
+Se cargan todos los bloques en memoria una vez y se resuelven las mismas consultas de dos formas:
+    bucles     -> recorrido de bloques y transacciones acumulando en diccionarios
+    columnar   -> np.bincount sobre las columnas de ids de dirección, montos y alturas
+Consultas: saldos de todas las direcciones, recompensas por minero, serie de volumen por intervalos
+de --bucket bloques y top --limit remitentes. Se comprueba que ambos resultados coinciden y se reporta
+además el coste de construir las columnas desde la BD y la memoria que ocupan.
+Uso:
+    python benchmarks/bench_analytics.py --blocks 100000 --txs-per-block 9 --bucket 100 --limit 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database
+
+
+def loop_balances(blocks: list) -> dict:
+    balances = {}
+    for block in blocks:
+        for tx in block['transactions']:
+            amount = int(tx['amount'])
+            balances[tx['sender']] = balances.get(tx['sender'], 0) - amount
+            balances[tx['recipient']] = balances.get(tx['recipient'], 0) + amount
+    return {address: balance for address, balance in balances.items() if address != "SYSTEM" and balance > 0}
+
+
+def loop_rewards(blocks: list) -> dict:
+    rewards = {}
+    for block in blocks:
+        for tx in block['transactions']:
+            if tx['sender'] == "SYSTEM" and block['index'] > 1:
+                rewards[tx['recipient']] = rewards.get(tx['recipient'], 0) + int(tx['amount'])
+    return rewards
+
+
+def loop_volume(blocks: list, bucket: int) -> list:
+    volume = {}
+    for block in blocks:
+        index = (block['index'] - 1) // bucket
+        for tx in block['transactions']:
+            if tx['sender'] != "SYSTEM":
+                volume[index] = volume.get(index, 0) + int(tx['amount'])
+    return [volume.get(index, 0) for index in range((len(blocks) - 1) // bucket + 1)]
+
+
+def loop_top_senders(blocks: list, limit: int) -> list:
+    sent = {}
+    for block in blocks:
+        for tx in block['transactions']:
+            if tx['sender'] != "SYSTEM":
+                sent[tx['sender']] = sent.get(tx['sender'], 0) + int(tx['amount'])
+    return sorted(sent.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def timed(call, repeat: int) -> tuple:
+    """
+    (resultado, mejor tiempo en ms de 'repeat' ejecuciones).
+    """
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        result = call()
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--txs-per-block', type=int, default=9)
+    parser.add_argument('--bucket', type=int, default=100, help='bloques por intervalo de la serie de volumen')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from analytics import ChainAnalytics
+    from blockchain import Blockchain
+    from chain_store import ChainStore
+    from storage import Storage
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    build_database(path, args.blocks, args.txs_per_block)
+    store = ChainStore(Storage(path, group_commit_ms=0), Blockchain._hash)
+    store.load()
+    started = perf_counter()
+    blocks = list(store.iter_blocks())
+    print(f"Cadena: {len(blocks)} bloques, {sum(len(block['transactions']) for block in blocks)} transacciones "
+          f"(lectura y decodificación {perf_counter() - started:.2f}s)")
+
+    analytics = ChainAnalytics(store)
+    started = perf_counter()
+    analytics.sync()
+    build_time = perf_counter() - started
+    columns = list(analytics._tx.values()) + list(analytics._blocks.values())
+    print(f"Construcción de las columnas desde la BD: {build_time:.2f}s, "
+          f"{sum(column.nbytes for column in columns) / 1e6:.1f} MB reservados")
+
+    queries = {
+        'saldos': (lambda: loop_balances(blocks), lambda: dict(analytics.top_addresses('balance'))),
+        'recompensas por minero': (lambda: loop_rewards(blocks), lambda: dict(analytics.top_addresses('rewards'))),
+        f'volumen por {args.bucket} bloques': (lambda: loop_volume(blocks, args.bucket),
+                                               lambda: analytics.volume_series(args.bucket)['volume']),
+        f'top {args.limit} remitentes': (lambda: loop_top_senders(blocks, args.limit),
+                                         lambda: analytics.top_addresses('sent', args.limit)),
+    }
+    print(f"{'consulta':<26}{'bucles ms':>12}{'columnar ms':>14}{'aceleración':>14}")
+    for label, (loop, columnar) in queries.items():
+        expected, loop_ms = timed(loop, args.repeat)
+        result, columnar_ms = timed(columnar, args.repeat)
+        assert result == expected, label
+        print(f"{label:<26}{loop_ms:>12.1f}{columnar_ms:>14.1f}{loop_ms / columnar_ms:>13.1f}x")
+    store.storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque: tiempo y memoria (RSS máximo) al cargar una BD sintética de 100k bloques.
+
+Compara la carga original (json.loads de todas las filas en una lista) con ChainStore
+(cabeceras + ventana de bloques recientes). Cada medición se ejecuta en un subproceso
+para que el RSS máximo no se contamine entre modos.
+Uso:
+    python benchmarks/bench_chain_loading.py --blocks 100000 --txs-per-block 5
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def build_transactions(index: int, txs_per_block: int) -> list:
+    """
+    Transacciones sintéticas del bloque index: la Coinbase y txs_per_block transferencias de 1 unidad.
+    """
+    from retarget import TARGET_BLOCK_TIME
+    transactions = [{'sender': "SYSTEM", 'recipient': f"miner-{index % 50}", 'amount': 10,
+                     'signature': "SYSTEM_SIGNATURE"}]
+    transactions.extend(
+        {'sender': "04" + f"{index % 997:0128x}", 'recipient': "04" + f"{(index + t) % 991:0128x}",
+         'amount': 1, 'signature': "30" + "ab" * 70, 'timestamp': 1700000000.0 + index * TARGET_BLOCK_TIME}
+        for t in range(txs_per_block)
+    )
+    return transactions
+
+
+def build_database(path: str, blocks: int, txs_per_block: int, first_index: int = 1, previous_hash: str = '0' * 64):
+    """
+    Genera una cadena sintética (enlaces de hash correctos, sin PoW real) directamente en SQLite.
+    Con first_index y previous_hash se prolonga una cadena sintética existente.
+    Los bloques se separan exactamente TARGET_BLOCK_TIME segundos, así que el objetivo declarado
+    nunca cambia y la cadena respeta el calendario de reajuste de dificultad.
+    """
+    from blockchain import Blockchain
+    from retarget import TARGET_BLOCK_TIME
+    from chain_store import block_header
+    from codec import encode_block
+    from storage import Storage, SQL_INSERT_BLOCK
+
+    storage = Storage(path, group_commit_ms=0)
+    rows = []
+    for index in range(first_index, first_index + blocks):
+        transactions = build_transactions(index, txs_per_block)
+        block = Blockchain._build_block_struct(index, 1700000000.0 + index * TARGET_BLOCK_TIME, transactions,
+                                               index, previous_hash)
+        previous_hash = Blockchain._hash(block)
+        rows.append((index, encode_block(block), json.dumps(block_header(block), sort_keys=True),
+                     previous_hash))
+        if len(rows) == 5000:
+            with storage.write() as cursor:
+                cursor.executemany(SQL_INSERT_BLOCK, rows)
+            rows = []
+    if rows:
+        with storage.write() as cursor:
+            cursor.executemany(SQL_INSERT_BLOCK, rows)
+    storage.close()
+
+
+def measure(path: str, mode: str):
+    """
+    Carga la BD en el modo indicado y reporta (segundos, RSS máximo en MB).
+    """
+    started = perf_counter()
+    if mode == 'lista':
+        from codec import decode_block
+        conn = sqlite3.connect(path)
+        chain = [decode_block(row[0]) for row in conn.execute('SELECT block_data FROM blocks ORDER BY "index" ASC')]
+        assert chain
+    elif mode == 'chainstore':
+        from blockchain import Blockchain
+        from chain_store import ChainStore
+        from storage import Storage
+        store = ChainStore(Storage(path, group_commit_ms=0), Blockchain._hash)
+        store.load()
+        assert len(store)
+    else:
+        from blockchain import Blockchain
+        Blockchain(db_path=path)
+    elapsed = perf_counter() - started
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'mode': mode, 'seconds': round(elapsed, 3), 'max_rss_mb': round(rss_mb, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--measure', choices=['lista', 'chainstore', 'blockchain'])
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.db, args.measure)
+        return
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    build_database(path, args.blocks, args.txs_per_block)
+    print(f"BD sintética: {args.blocks} bloques, {os.path.getsize(path) / 1e6:.1f} MB")
+    for mode in ('lista', 'chainstore', 'blockchain'):
+        output = subprocess.run([sys.executable, __file__, '--measure', mode, '--db', path],
+                                capture_output=True, text=True, check=True).stdout
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés de concurrencia: 100+ clientes simultáneos enviando transacciones mientras se mina
+y se consultan saldos. Comprueba que no se pierden transacciones ni se producen dobles gastos.
+
+Cada uno de los --clients clientes tiene una llave financiada con --funds unidades y envía
+--txs-per-client transacciones de 1 unidad (más que su saldo). Todas las transacciones se envían
+barajadas desde --clients hilos, de modo que los gastos de una misma llave compiten entre sí.
+En paralelo un hilo mina bloques sin parar y --readers hilos consultan /balances y /address/<a>/stats.
+Al terminar se mina hasta vaciar el Mempool y se verifica:
+    - cada llave admitió exactamente min(--funds, --txs-per-client) transacciones (sin dobles gastos)
+    - cada transacción admitida está confirmada exactamente una vez (sin transacciones perdidas)
+    - ningún saldo es negativo, el índice de saldos coincide con la cadena y la cadena es válida
+Las mismas comprobaciones, con una carga reducida, se ejecutan con la batería de pruebas
+(tests/test_concurrency.py); este script mide además latencias con una carga real.
+Uso:
+    python benchmarks/bench_concurrency.py --clients 120 --txs-per-client 15 --funds 10 --driver http
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_load import ClientDriver, HttpDriver, generate_keys, summarize
+
+
+def presign(keys: list, txs_per_client: int) -> list:
+    """
+    Payloads de /transactions/new firmados: txs_per_client por llave, 1 unidad, destinatarios únicos.
+    """
+    from blockchain import Blockchain
+    from keys import Keys
+    payloads = []
+    for client, (private_key, public_key) in enumerate(keys):
+        for i in range(txs_per_client):
+            recipient = f"stress-{client}-{i}"
+            digest = Blockchain._transaction_digest(public_key, recipient, 1)
+            payloads.append({'sender_pub': public_key, 'recipient': recipient, 'amount': 1,
+                             'signature': Keys.sign_digest(private_key, digest)})
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=120)
+    parser.add_argument('--txs-per-client', type=int, default=15)
+    parser.add_argument('--funds', type=int, default=10, help='saldo inicial de cada cliente')
+    parser.add_argument('--readers', type=int, default=20, help='hilos que consultan saldos durante la carga')
+    parser.add_argument('--driver', choices=('client', 'http'), default='http')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    import app as node
+    from blockchain import GENESIS_SUPPLY, MINING_REWARD
+    blockchain = node.blockchain
+
+    keys = generate_keys(args.clients)
+    for _, public_key in keys:
+        accepted, message = blockchain.issue_faucet_funds(public_key, args.funds)
+        if not accepted:
+            raise SystemExit(f"No se pudo financiar a los clientes: {message}")
+    blockchain.mine_block('stress-miner')
+    payloads = presign(keys, args.txs_per_client)
+    random.Random(args.seed).shuffle(payloads)
+    print(f"{args.clients} clientes, {len(payloads)} transacciones firmadas, generador '{args.driver}'")
+
+    driver = ClientDriver(node.app) if args.driver == 'client' else HttpDriver(node.app)
+    stop = threading.Event()
+    mined = []
+
+    def mine_forever():
+        while not stop.is_set():
+            block, _ = blockchain.mine_block('stress-miner')
+            if block:
+                mined.append(block['index'])
+
+    read_latencies = []
+
+    def read_forever(reader: int):
+        addresses = [public_key for _, public_key in keys]
+        while not stop.is_set():
+            path = '/balances' if reader % 2 else f"/address/{addresses[reader % len(addresses)]}/stats"
+            started = perf_counter()
+            status, _ = driver.request('GET', path)
+            read_latencies.append((perf_counter() - started, status))
+
+    def submit(payload):
+        started = perf_counter()
+        status, _ = driver.request('POST', '/transactions/new', payload)
+        return payload, status, perf_counter() - started
+
+    background = [threading.Thread(target=mine_forever, daemon=True)]
+    background += [threading.Thread(target=read_forever, args=(reader,), daemon=True) for reader in range(args.readers)]
+    for thread in background:
+        thread.start()
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(submit, payloads))
+    elapsed = perf_counter() - started
+    stop.set()
+    blockchain.miner.cancel()
+    for thread in background:
+        thread.join()
+
+    # Se confirma todo lo pendiente
+    while len(blockchain.mempool):
+        blockchain.mine_block('stress-miner')
+    driver.close()
+
+    # ==========================================
+    # VERIFICACIÓN
+    # ==========================================
+    failures = []
+    accepted = [payload for payload, status, _ in results if status == 201]
+    rejected = [payload for payload, status, _ in results if status != 201]
+    per_key = {}
+    for payload in accepted:
+        per_key[payload['sender_pub']] = per_key.get(payload['sender_pub'], 0) + 1
+    expected = min(args.funds, args.txs_per_client)
+    wrong = {key: count for key, count in per_key.items() if count != expected}
+    if wrong or len(per_key) != args.clients:
+        failures.append(f"llaves con admisiones distintas de {expected}: {len(wrong) + args.clients - len(per_key)}")
+
+    balances = blockchain.get_all_balances()
+    lost = [p for p in accepted if balances.get(p['recipient']) != 1]
+    if lost:
+        failures.append(f"transacciones admitidas no confirmadas (o confirmadas dos veces): {len(lost)}")
+    phantom = [p for p in rejected if p['recipient'] in balances]
+    if phantom:
+        failures.append(f"transacciones rechazadas que llegaron a la cadena: {len(phantom)}")
+    negative = [address for address, balance in balances.items() if balance < 0]
+    if negative:
+        failures.append(f"saldos negativos: {len(negative)}")
+    supply = GENESIS_SUPPLY + MINING_REWARD * (blockchain.height - 1)
+    if sum(balances.values()) != supply:
+        failures.append(f"suma de saldos {sum(balances.values())} != emisión {supply}")
+    if not blockchain.is_ledger_consistent():
+        failures.append("el índice de saldos no coincide con la cadena")
+    if not blockchain.validate_chain(full=True)[0]:
+        failures.append("la cadena no es válida")
+
+    tx_stats = summarize([latency for _, _, latency in results], len(rejected), elapsed)
+    read_stats = summarize([latency for latency, _ in read_latencies],
+                           sum(1 for _, status in read_latencies if status >= 400), elapsed)
+    print(f"{'operación':<22}{'req':>7}{'rechazos':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, stats in (('POST /transactions/new', tx_stats), ('lecturas', read_stats)):
+        print(f"{label:<22}{stats['requests']:>7}{stats['errors']:>10}{stats['throughput_rps']:>10.1f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print(f"admitidas {len(accepted)} (esperadas {expected * args.clients}), bloques minados durante la carga "
+          f"{len(mined)}, altura final {blockchain.height}")
+    blockchain.miner.shutdown()
+    if failures:
+        raise SystemExit("FALLO: " + "; ".join(failures))
+    print("OK: sin transacciones perdidas ni dobles gastos")
+
+
+if __name__ == '__main__':
+    main()
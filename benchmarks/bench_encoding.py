@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la codificación de bloques: tamaño de la BD, tiempo de carga y RSS con JSON y con
+el formato compacto de codec.py, sobre una cadena sintética de 100k transacciones.
+
+Cada BD se genera con BLOCK_ENCODING correspondiente y cada medición se ejecuta en un subproceso
+(el RSS máximo no se contamina entre modos). También compara la memoria del índice de cabeceras
+de ChainStore como dicts y como BlockHeader (__slots__).
+Uso:
+    python benchmarks/bench_encoding.py --blocks 20000 --txs-per-block 5
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ENCODINGS = ('json', 'compact')
+
+
+def measure(path: str):
+    """
+    Carga la cadena con ChainStore y la recorre entera decodificando cada bloque.
+    """
+    from blockchain import Blockchain
+    from chain_store import ChainStore
+    from storage import Storage
+
+    started = perf_counter()
+    store = ChainStore(Storage(path, group_commit_ms=0), Blockchain._hash)
+    store.load()
+    load_time = perf_counter() - started
+    started = perf_counter()
+    transactions = sum(len(block['transactions']) for block in store)
+    scan_time = perf_counter() - started
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'load_s': round(load_time, 3), 'scan_s': round(scan_time, 3),
+                      'transactions': transactions, 'max_rss_mb': round(rss_mb, 1)}))
+
+
+def header_memory(blocks: int) -> tuple[float, float]:
+    """
+    MB ocupados por el índice de cabeceras de una cadena de 'blocks' bloques: (dicts, BlockHeader).
+    """
+    from codec import BlockHeader
+    results = []
+    for use_slots in (False, True):
+        tracemalloc.start()
+        headers = []
+        for index in range(1, blocks + 1):
+            header = {'index': index, 'merkle_root': f"{index:064x}", 'nonce': index * 7,
+                      'previous_hash': f"{index - 1:064x}", 'timestamp': 1700000000.0 + index, 'version': 2}
+            block_hash = f"{index:064x}"
+            headers.append(BlockHeader(header, block_hash) if use_slots else (header, block_hash))
+        results.append(tracemalloc.get_traced_memory()[0] / 1e6)
+        tracemalloc.stop()
+        del headers
+    return results[0], results[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--measure')
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure)
+        return
+
+    print(f"Cadena sintética: {args.blocks} bloques x {args.txs_per_block} transacciones (+ Coinbase)")
+    print(f"{'formato':<10}{'BD (MB)':>10}{'carga (s)':>12}{'recorrido (s)':>16}{'RSS máx (MB)':>15}")
+    for encoding in ENCODINGS:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        env = dict(os.environ, BLOCK_ENCODING=encoding)
+        subprocess.run([sys.executable, '-c',
+                        f"from bench_chain_loading import build_database; "
+                        f"build_database({path!r}, {args.blocks}, {args.txs_per_block})"],
+                       cwd=os.path.dirname(os.path.abspath(__file__)), env=env, check=True, capture_output=True)
+        output = subprocess.run([sys.executable, __file__, '--measure', path],
+                                capture_output=True, text=True, check=True, env=env).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{encoding:<10}{size_mb:>10.1f}{result['load_s']:>12.3f}{result['scan_s']:>16.3f}{result['max_rss_mb']:>15.1f}")
+
+    dict_mb, slots_mb = header_memory(args.blocks)
+    print(f"Índice de cabeceras en memoria: dicts {dict_mb:.1f} MB, BlockHeader {slots_mb:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
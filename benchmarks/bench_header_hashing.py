@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark del coste por nonce en función del tamaño del mempool.
+
+Compara el hash v1 (JSON completo del bloque en cada intento) con el hash v2
+(prefijo de cabecera precalculado + copy() del estado SHA-256 + bytes del nonce).
+Uso:
+    python benchmarks/bench_header_hashing.py --sizes 0 10 100 1000 --nonces 20000
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain
+
+
+def build_block(mempool_size: int) -> dict:
+    transactions = [{'sender': "SYSTEM", 'recipient': "bench", 'amount': 10, 'signature': "SYSTEM_SIGNATURE"}]
+    transactions.extend(
+        {'sender': "04" + "ab" * 64, 'recipient': "04" + "cd" * 64, 'amount': i,
+         'signature': "30" + "ef" * 70, 'timestamp': 1700000000.0 + i}
+        for i in range(mempool_size)
+    )
+    return Blockchain._build_block_struct(2, 1700000000.0, transactions, 0, '0' * 64)
+
+
+def per_nonce_v1(block: dict, nonces: int) -> float:
+    legacy = {k: v for k, v in block.items() if k not in ('version', 'merkle_root')}
+    started = perf_counter()
+    for nonce in range(nonces):
+        legacy['nonce'] = nonce
+        hashlib.sha256(json.dumps(legacy, sort_keys=True).encode()).hexdigest()
+    return (perf_counter() - started) / nonces
+
+
+def per_nonce_v2(block: dict, nonces: int) -> float:
+    prefix_state = hashlib.sha256(Blockchain._header_prefix(block))
+    started = perf_counter()
+    for nonce in range(nonces):
+        guess = prefix_state.copy()
+        guess.update(b'%d' % nonce)
+        guess.hexdigest()
+    return (perf_counter() - started) / nonces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 10, 100, 1000])
+    parser.add_argument('--nonces', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'mempool':>8} {'v1 us/nonce':>12} {'v2 us/nonce':>12}")
+    for size in args.sizes:
+        block = build_block(size)
+        # El JSON completo es muy lento con mempools grandes; se limita el número de intentos v1
+        v1_nonces = max(100, args.nonces // max(1, size // 10))
+        v1 = per_nonce_v1(block, v1_nonces) * 1e6
+        v2 = per_nonce_v2(block, args.nonces) * 1e6
+        print(f"{size:>8} {v1:>12.2f} {v2:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
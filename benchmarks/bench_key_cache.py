@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latencia de verificación y firma para remitentes recurrentes.
+
+Compara la decodificación de llaves en cada llamada (caché vaciada antes de cada operación)
+con la caché LRU de keys.py, donde las llaves públicas recurrentes se precalculan.
+Uso:
+    python benchmarks/bench_key_cache.py --senders 20 --operations 2000
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain
+from keys import Keys, VERIFYING_KEY_CACHE, SIGNING_KEY_CACHE
+
+
+def timed(operation, items, clear_cache: bool) -> float:
+    """
+    Latencia media (ms) de aplicar operation a cada item.
+    """
+    started = perf_counter()
+    for item in items:
+        if clear_cache:
+            VERIFYING_KEY_CACHE.clear()
+            SIGNING_KEY_CACHE.clear()
+        operation(*item)
+    return (perf_counter() - started) / len(items) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--senders', type=int, default=20)
+    parser.add_argument('--operations', type=int, default=2000)
+    args = parser.parse_args()
+
+    key_pairs = [Keys.generate_key_pair() for _ in range(args.senders)]
+    sign_items, verify_items = [], []
+    for i in range(args.operations):
+        private_key, public_key = key_pairs[i % args.senders]
+        digest = Blockchain._transaction_digest(public_key, f"recipient-{i}", 1)
+        sign_items.append((private_key, digest))
+        verify_items.append((public_key, Keys.sign_digest(private_key, digest), digest))
+
+    print(f"{'operación':>12} {'sin caché ms':>14} {'con caché ms':>14}")
+    for name, operation, items in (('verify', Keys.verify_signature, verify_items),
+                                   ('sign', Keys.sign_digest, sign_items)):
+        cold = timed(operation, items, clear_cache=True)
+        VERIFYING_KEY_CACHE.clear()
+        SIGNING_KEY_CACHE.clear()
+        warm = timed(operation, items, clear_cache=False)
+        print(f"{name:>12} {cold:>14.3f} {warm:>14.3f}   {Keys.key_cache_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ranking de mineros sobre una BD sintética (100k bloques por defecto).
+
+Compara el recorrido completo de la cadena (implementación original de get_leaders) con la
+consulta top-N sobre la tabla materializada 'miner_stats'.
+Uso:
+    python benchmarks/bench_leaders.py --blocks 100000 --limit 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database
+
+
+def scan_leaders(chain) -> dict:
+    leaders = {}
+    for block in chain:
+        for tx in block['transactions']:
+            if tx['sender'] == "SYSTEM" and block['index'] > 1:
+                leaders[tx['recipient']] = leaders.get(tx['recipient'], 0) + int(tx['amount'])
+    return leaders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    from blockchain import Blockchain
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    build_database(path, args.blocks, args.txs_per_block)
+
+    started = perf_counter()
+    blockchain = Blockchain(db_path=path)
+    print(f"Arranque con reconstrucción de estadísticas: {perf_counter() - started:.3f}s")
+    started = perf_counter()
+    blockchain = Blockchain(db_path=path)
+    print(f"Arranque con estadísticas persistidas:       {perf_counter() - started:.3f}s")
+
+    started = perf_counter()
+    scanned = scan_leaders(blockchain._chain)
+    scan_time = perf_counter() - started
+    started = perf_counter()
+    top = blockchain.get_leaders(args.limit)
+    top_time = perf_counter() - started
+
+    expected = dict(sorted(scanned.items(), key=lambda item: (-item[1], item[0]))[:args.limit])
+    assert top == expected
+    print(f"/leaders recorriendo la cadena: {scan_time * 1000:>10.2f} ms")
+    print(f"/leaders?limit={args.limit} (índice):    {top_time * 1000:>10.2f} ms")
+    blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
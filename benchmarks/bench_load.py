@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga reproducible del nodo: throughput y latencias p50/p90/p99 por endpoint.
+
+Prepara una BD temporal con --chain-blocks bloques minados, genera --keys pares de llaves
+(Keys.generate_key_pair), las financia con el Faucet y pre-firma todas las transacciones
+(Keys.sign_digest) antes de medir, de modo que la firma no cuenta en las latencias.
+Después ejecuta la misma carga con dos generadores:
+    client -> cliente de pruebas de Flask (sin red), --concurrency hilos
+    http   -> servidor WSGI real en un puerto local y sesiones HTTP concurrentes
+Endpoints: POST /transactions/new, POST /mine (hasta completar el trabajo), GET /balances, /chain y /validate.
+Antes de cada generador el Mempool se rellena hasta --mempool-size transacciones pendientes.
+
+Los resultados se escriben en JSON (--output) junto con los parámetros y el commit medido;
+con --compare se muestran las diferencias respecto a un resultado anterior.
+Uso:
+    python benchmarks/bench_load.py --chain-blocks 20 --mempool-size 200 --requests 200 --concurrency 8 \\
+        --output resultados.json [--compare anterior.json]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter, sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DRIVERS = ('client', 'http')
+READ_ENDPOINTS = ('/balances', '/chain', '/validate')
+LOAD_MINER = 'loadtest-miner'
+
+
+# ==========================================
+# PREPARACIÓN DE LA CARGA
+# ==========================================
+
+def generate_keys(count: int) -> list:
+    from keys import Keys
+    return [Keys.generate_key_pair() for _ in range(count)]
+
+
+def presign_transactions(keys: list, count: int, rng: random.Random, tag: str) -> list:
+    """
+    Payloads de /transactions/new ya firmados (1 unidad cada uno, destinatarios únicos).
+    """
+    from blockchain import Blockchain
+    from keys import Keys
+    payloads = []
+    for i in range(count):
+        private_key, public_key = keys[rng.randrange(len(keys))]
+        recipient = f"load-{tag}-{i}"
+        digest = Blockchain._transaction_digest(public_key, recipient, 1)
+        payloads.append({'sender_pub': public_key, 'recipient': recipient, 'amount': 1,
+                         'signature': Keys.sign_digest(private_key, digest)})
+    return payloads
+
+
+def prepare_chain(blockchain, keys: list, chain_blocks: int, funds_per_key: int):
+    """
+    Financia las llaves con el Faucet y mina hasta alcanzar chain_blocks bloques.
+    """
+    for _, public_key in keys:
+        accepted, message = blockchain.issue_faucet_funds(public_key, funds_per_key)
+        if not accepted:
+            raise SystemExit(f"No se pudo financiar la carga: {message}")
+    blockchain.mine_block(LOAD_MINER)
+    while blockchain.height < chain_blocks:
+        blockchain.mine_block(LOAD_MINER)
+
+
+def fill_mempool(blockchain, pool: list, target: int):
+    while len(blockchain.mempool) < target and pool:
+        payload = pool.pop()
+        blockchain.new_transaction(payload['sender_pub'], payload['recipient'], payload['amount'],
+                                   payload['signature'])
+
+
+# ==========================================
+# GENERADORES DE CARGA
+# ==========================================
+
+class ClientDriver:
+    """
+    Peticiones a través del cliente de pruebas de Flask (un cliente por hilo).
+    """
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, payload: dict = None) -> tuple[int, dict]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    """
+    Peticiones HTTP reales contra un servidor WSGI multihilo levantado en un puerto libre.
+    """
+    name = 'http'
+
+    def __init__(self, app):
+        import requests
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self._requests = requests
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, payload: dict = None) -> tuple[int, dict]:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(method, self.base_url + path, json=payload)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+    def close(self):
+        self._server.shutdown()
+
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Percentil por rango más cercano sobre una lista ya ordenada.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'seconds': round(elapsed, 4),
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if count else 0.0
+    }
+
+
+def run_load(driver, calls: list, concurrency: int) -> dict:
+    """
+    Ejecuta las llamadas (método, ruta, payload) con 'concurrency' hilos y mide cada una.
+    """
+    def timed(call):
+        method, path, payload = call
+        started = perf_counter()
+        status, _ = driver.request(method, path, payload)
+        return perf_counter() - started, status
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, calls))
+    elapsed = perf_counter() - started
+    return summarize([latency for latency, _ in results], sum(1 for _, status in results if status >= 400), elapsed)
+
+
+def run_mining(driver, jobs: int, poll_interval: float) -> dict:
+    """
+    /mine es asíncrono: la latencia medida va desde el POST hasta que el trabajo termina.
+    Los trabajos se lanzan de uno en uno (los concurrentes para la misma altura se agrupan en uno solo).
+    """
+    latencies, errors = [], 0
+    started = perf_counter()
+    for _ in range(jobs):
+        job_started = perf_counter()
+        status, body = driver.request('POST', '/mine', {'miner_address': LOAD_MINER})
+        if status >= 400:
+            errors += 1
+            continue
+        while True:
+            status, job = driver.request('GET', f"/mine/{body['job_id']}")
+            if status >= 400 or job['status'] not in ('queued', 'running'):
+                break
+            sleep(poll_interval)
+        if status >= 400 or job['status'] != 'done':
+            errors += 1
+        latencies.append(perf_counter() - job_started)
+    return summarize(latencies, errors, perf_counter() - started)
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, previous: dict = None):
+    print(f"{'generador':<10}{'endpoint':<20}{'req':>6}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          + (f"{'Δ p50':>10}{'Δ req/s':>10}" if previous else ''))
+    for driver_name, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            line = (f"{driver_name:<10}{endpoint:<20}{stats['requests']:>6}{stats['errors']:>5}"
+                    f"{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+            before = (previous or {}).get(driver_name, {}).get(endpoint)
+            if before and before['p50_ms'] and before['throughput_rps']:
+                line += (f"{(stats['p50_ms'] / before['p50_ms'] - 1) * 100:>+9.1f}%"
+                         f"{(stats['throughput_rps'] / before['throughput_rps'] - 1) * 100:>+9.1f}%")
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chain-blocks', type=int, default=20, help='altura de la cadena antes de medir')
+    parser.add_argument('--mempool-size', type=int, default=200, help='transacciones pendientes antes de medir')
+    parser.add_argument('--keys', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200, help='peticiones por endpoint de lectura y de transacciones')
+    parser.add_argument('--mine-jobs', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--drivers', nargs='+', choices=DRIVERS, default=list(DRIVERS))
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', default='bench_load_results.json')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    output = os.path.abspath(args.output)
+    previous = None
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)['results']
+    os.chdir(tempfile.mkdtemp())
+    import app as node
+    blockchain = node.blockchain
+
+    keys = generate_keys(args.keys)
+    # Cada generador consume su propio lote de transacciones (cada firma se usa una sola vez)
+    per_driver = args.requests + args.mempool_size
+    funds_per_key = per_driver * len(args.drivers) // args.keys + 10
+    prepare_chain(blockchain, keys, args.chain_blocks, funds_per_key)
+
+    started = perf_counter()
+    pools = {name: presign_transactions(keys, per_driver, rng, name) for name in args.drivers}
+    presign_time = perf_counter() - started
+
+    results = {}
+    for name in args.drivers:
+        driver = ClientDriver(node.app) if name == 'client' else HttpDriver(node.app)
+        pool = pools[name]
+        fill_mempool(blockchain, pool, args.mempool_size)
+        endpoints = {}
+        for path in READ_ENDPOINTS:
+            endpoints[path] = run_load(driver, [('GET', path, None)] * args.requests, args.concurrency)
+        calls = [('POST', '/transactions/new', payload) for payload in pool[:args.requests]]
+        endpoints['/transactions/new'] = run_load(driver, calls, args.concurrency)
+        endpoints['/mine'] = run_mining(driver, args.mine_jobs, poll_interval=0.01)
+        driver.close()
+        results[name] = endpoints
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': current_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'final_height': blockchain.height,
+            'presign_seconds': round(presign_time, 3),
+            'params': vars(args)
+        },
+        'results': results
+    }
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print_report(results, previous)
+    print(f"Resultados escritos en {output}")
+    blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del mempool con muchas transacciones pendientes (100k por defecto).
+
+Compara la lista plana original (escaneo lineal de débitos pendientes y bloque con todo el mempool)
+con Mempool (débitos indexados por remitente y selección acotada por MAX_TXS_PER_BLOCK).
+Uso:
+    python benchmarks/bench_mempool.py --pending 100000 --senders 1000 --lookups 1000
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mempool import Mempool, MAX_TXS_PER_BLOCK
+
+
+def synthetic_transactions(pending: int, senders: int) -> list:
+    return [
+        {'sender': f"sender-{i % senders}", 'recipient': f"recipient-{i % 997}", 'amount': 1,
+         'signature': "30" + "ab" * 70, 'timestamp': 1700000000.0 + i}
+        for i in range(pending)
+    ]
+
+
+def best_of(fn, repeats: int = 5):
+    """
+    Mejor tiempo de varias ejecuciones (evita contar pausas del recolector de basura).
+    """
+    best, result = None, None
+    for _ in range(repeats):
+        started = perf_counter()
+        result = fn()
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pending', type=int, default=100000)
+    parser.add_argument('--senders', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.pending, args.senders)
+    addresses = [f"sender-{i % args.senders}" for i in range(args.lookups)]
+
+    # Lista plana: débito pendiente por escaneo y bloque con el mempool completo
+    started = perf_counter()
+    for address in addresses:
+        sum(tx['amount'] for tx in transactions if tx['sender'] == address)
+    list_lookup = (perf_counter() - started) / args.lookups
+    list_build, block_transactions = best_of(lambda: list(transactions))
+
+    mempool = Mempool(max_size=args.pending)
+    started = perf_counter()
+    for row_id, tx in enumerate(transactions, start=1):
+        mempool.add(row_id, tx)
+    load = perf_counter() - started
+    started = perf_counter()
+    for address in addresses:
+        mempool.pending_debit(address)
+    indexed_lookup = (perf_counter() - started) / args.lookups
+    indexed_build, selected = best_of(mempool.select)
+
+    print(f"Mempool: {args.pending} pendientes, {args.senders} remitentes (carga del índice: {load:.3f}s)")
+    print(f"{'modo':<12}{'débito (µs)':>14}{'selección (ms)':>17}{'txs en bloque':>16}")
+    print(f"{'lista':<12}{list_lookup * 1e6:>14.1f}{list_build * 1e3:>17.3f}{len(block_transactions):>16}")
+    print(f"{'indexado':<12}{indexed_lookup * 1e6:>14.3f}{indexed_build * 1e3:>17.3f}{len(selected):>16}")
+    print(f"MAX_TXS_PER_BLOCK={MAX_TXS_PER_BLOCK}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de hashes/segundo del motor de minado multiproceso.
+
+Compara 1..N procesos para dificultades 4 a 6 sobre un bloque candidato sintético.
+La dificultad d (ceros hexadecimales iniciales) se traduce al objetivo numérico 16^(64-d) - 1.
+Uso:
+    python benchmarks/bench_mining.py --max-workers 8 --difficulties 4 5 6 --rounds 3
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain
+from miner import ParallelMiner
+
+
+def build_candidate(round_number: int, mempool_size: int) -> bytes:
+    """
+    Prefijo de cabecera de un bloque candidato sintético con un mempool de tamaño configurable.
+    """
+    transactions = [{'sender': "SYSTEM", 'recipient': "bench", 'amount': 10, 'signature': "SYSTEM_SIGNATURE"}]
+    transactions.extend(
+        {'sender': f"s{i}", 'recipient': f"r{i}", 'amount': i, 'signature': "ab" * 36, 'timestamp': 0.0}
+        for i in range(mempool_size)
+    )
+    block = Blockchain._build_block_struct(
+        index=round_number + 2,
+        timestamp=1700000000.0 + round_number,
+        transactions=transactions,
+        nonce=0,
+        previous_hash='0' * 64
+    )
+    return Blockchain._header_prefix(block)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--difficulties', type=int, nargs='+', default=[4, 5, 6])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--mempool-size', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'dificultad':>10} {'hashes/s':>14} {'seg/bloque':>12}")
+    for difficulty in args.difficulties:
+        for workers in range(1, args.max_workers + 1):
+            miner = ParallelMiner(workers=workers)
+            hashes = 0
+            elapsed = 0.0
+            for round_number in range(args.rounds):
+                result = miner.mine(build_candidate(round_number, args.mempool_size), 16 ** (64 - difficulty) - 1)
+                hashes += result['hashes']
+                elapsed += result['elapsed']
+            miner.shutdown()
+            print(f"{workers:>8} {difficulty:>10} {hashes / elapsed:>14,.0f} {elapsed / args.rounds:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
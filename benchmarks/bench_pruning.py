@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de poda de bloques y compactación: tamaño en disco y latencia de consultas antes y después,
+sobre una cadena sintética de 100k bloques.
+
+Se genera la cadena, se abre una vez (migración: índice de transacciones y estadísticas), se guarda una
+instantánea y se prolonga con --keep bloques más, de modo que la instantánea queda a --keep bloques de la
+punta. La cadena sintética no tiene PoW real: se registra como verificada con un punto de control.
+De esa BD salen cuatro copias:
+    completo          -> sin poda (referencia)
+    podado            -> PRUNE_KEEP_BLOCKS=--keep, los cuerpos antiguos se descartan
+    podado + archivo  -> igual, pero los cuerpos se mueven a un archivo comprimido leído bajo demanda
+    podado + índice   -> sin archivo y con PRUNE_TX_INDEX=1: solo cabeceras e instantánea por debajo
+La poda (y la compactación incremental que la sigue) se ejecuta mientras un hilo hace escrituras cortas
+cada 5 ms; se reporta su latencia para comprobar que las escrituras no quedan bloqueadas.
+Después se mide, en un subproceso por copia, la latencia de consultas típicas sobre bloques recientes y
+antiguos, transacciones por txid e historial de direcciones.
+Uso:
+    python benchmarks/bench_pruning.py --blocks 100000 --keep 1000 --txs-per-block 5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database, build_transactions
+from bench_load import percentile
+
+
+def prune_node(path: str) -> dict:
+    """
+    Abre el nodo con la poda activada (variables de entorno del subproceso) y poda hasta la instantánea.
+    """
+    from blockchain import Blockchain
+    blockchain = Blockchain(db_path=path)
+    latencies = []
+    done = threading.Event()
+
+    def probe_writes():
+        while not done.is_set():
+            started = perf_counter()
+            with blockchain.storage.write() as cursor:
+                cursor.execute("SELECT 1")
+            latencies.append(perf_counter() - started)
+            sleep(0.005)
+
+    prober = threading.Thread(target=probe_writes, daemon=True)
+    prober.start()
+    started = perf_counter()
+    report = blockchain.prune()
+    elapsed = perf_counter() - started
+    done.set()
+    prober.join()
+    blockchain.miner.shutdown()
+    blockchain.storage.close()
+    latencies.sort()
+    return {'seconds': round(elapsed, 3), 'pruned_height': report['pruned_height'],
+            'write_p99_ms': round(percentile(latencies, 0.99) * 1e3, 2), 'write_max_ms': round(latencies[-1] * 1e3, 2)}
+
+
+def measure_queries(path: str, keep: int, samples: int) -> dict:
+    """
+    Latencia (p50/p99 en ms) de consultas típicas. None si la consulta no es posible (bloques podados o
+    transacciones fuera del índice).
+    """
+    from blockchain import Blockchain
+    from chain_store import BlockPrunedError
+    from merkle import tx_hash
+    blockchain = Blockchain(db_path=path)
+    rng = random.Random(7)
+    height = blockchain.height
+    old_heights = [rng.randint(1, height - keep) for _ in range(samples)]
+    recent_heights = [rng.randint(height - keep + 1, height - 256) for _ in range(samples)]
+    # Los txids sintéticos se recalculan a partir de las direcciones (el índice podado ya no los tiene)
+    txids = [tx_hash(tx) for h in old_heights[:samples] for tx in build_transactions(h, 1)[1:]]
+    addresses = ["04" + f"{rng.randrange(997):0128x}" for _ in range(samples)]
+
+    queries = {
+        'bloque reciente': [lambda h=h: blockchain.get_block(str(h)) for h in recent_heights],
+        'bloque antiguo': [lambda h=h: blockchain.get_block(str(h)) for h in old_heights],
+        'página de 100 antiguos': [lambda h=h: blockchain.get_blocks(h - 1, 100) for h in old_heights[:samples // 10]],
+        'tx antigua por txid': [lambda t=t: blockchain.get_transaction(t) for t in txids],
+        'historial (50)': [lambda a=a: blockchain.get_address_history(a, limit=50) for a in addresses],
+        'estadísticas dirección': [lambda a=a: blockchain.get_address_stats(a) for a in addresses],
+    }
+    results = {}
+    for label, calls in queries.items():
+        latencies = []
+        try:
+            for call in calls:
+                started = perf_counter()
+                if call() is None:
+                    raise LookupError
+                latencies.append(perf_counter() - started)
+        except (BlockPrunedError, LookupError):
+            results[label] = None
+            continue
+        latencies.sort()
+        results[label] = [round(percentile(latencies, 0.50) * 1e3, 3), round(percentile(latencies, 0.99) * 1e3, 3)]
+    blockchain.miner.shutdown()
+    blockchain.storage.close()
+    return results
+
+
+def run(mode: str, path: str, env: dict, *extra) -> dict:
+    output = subprocess.run([sys.executable, __file__, f'--{mode}', path, *extra], capture_output=True,
+                            text=True, check=True, env=dict(os.environ, **env)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def disk_usage(path: str, archive: str = None) -> int:
+    files = [path, path + '-wal'] + ([archive] if archive else [])
+    return sum(os.path.getsize(name) for name in files if os.path.exists(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--keep', type=int, default=1000, help='bloques recientes con cuerpo completo')
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--prune', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prune:
+        print(json.dumps(prune_node(args.prune)))
+        return
+    if args.measure:
+        print(json.dumps(measure_queries(args.measure, args.keep, args.samples)))
+        return
+
+    from blockchain import Blockchain
+    from chain_validator import SQL_INSERT_CHECKPOINT
+    from storage import Storage
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    base_blocks = args.blocks - args.keep
+    build_database(path, base_blocks, args.txs_per_block)
+    blockchain = Blockchain(storage=Storage(path, group_commit_ms=0))
+    blockchain.create_snapshot()
+    tip_hash = blockchain.tip_hash
+    blockchain.miner.shutdown()
+    blockchain.storage.close()
+    build_database(path, args.keep, args.txs_per_block, first_index=base_blocks + 1, previous_hash=tip_hash)
+    blockchain = Blockchain(storage=Storage(path, group_commit_ms=0))
+    with blockchain.storage.write() as cursor:
+        cursor.execute(SQL_INSERT_CHECKPOINT, (blockchain.height, blockchain.tip_hash, 0))
+    blockchain.miner.shutdown()
+    blockchain.storage.close()
+
+    variants = {}
+    for label, archived, prune_index in (('completo', False, False), ('podado', False, False),
+                                         ('podado + archivo', True, False), ('podado + índice', False, True)):
+        copy = os.path.join(workdir, f"{len(variants)}.db")
+        shutil.copy(path, copy)
+        archive = copy + '.archive' if archived else None
+        env = {'PRUNE_KEEP_BLOCKS': str(args.keep), 'PRUNE_ARCHIVE': archive or '',
+               'PRUNE_TX_INDEX': '1' if prune_index else '0'} if label != 'completo' else {}
+        variants[label] = (copy, archive, env)
+
+    print(f"Cadena de {args.blocks} bloques ({args.txs_per_block} tx/bloque), cuerpos completos en los últimos {args.keep}")
+    print(f"{'variante':<18}{'disco MB':>10}{'poda s':>9}{'escritura p99/máx ms':>23}")
+    for label, (copy, archive, env) in variants.items():
+        pruning = run('prune', copy, env) if env else None
+        size = disk_usage(copy, archive) / 1e6
+        writes = f"{pruning['write_p99_ms']:.2f} / {pruning['write_max_ms']:.2f}" if pruning else '-'
+        detail = f"  (BD {os.path.getsize(copy) / 1e6:.1f} MB + archivo {os.path.getsize(archive) / 1e6:.1f} MB)" if archive else ''
+        print(f"{label:<18}{size:>10.1f}{pruning['seconds'] if pruning else '-':>9}{writes:>23}{detail}")
+
+    results = {label: run('measure', copy, env, '--keep', str(args.keep), '--samples', str(args.samples))
+               for label, (copy, archive, env) in variants.items()}
+    print(f"\n{'consulta (p50 / p99 ms)':<26}" + ''.join(f"{label:>20}" for label in variants))
+    for query in results['completo']:
+        cells = []
+        for label in variants:
+            value = results[label][query]
+            cells.append(f"{value[0]:>9.3f} / {value[1]:<8.3f}" if value else f"{'no disponible':>20}")
+        print(f"{query:<26}" + ''.join(cells))
+
+
+if __name__ == '__main__':
+    main()
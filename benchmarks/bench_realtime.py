@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las notificaciones en tiempo real: bytes y peticiones por bloque y por panel abierto.
+
+"Antes": cada evento solo traía un mensaje y cada panel volvía a pedir el estado completo
+(/mempool por cada transacción; /chain, /mempool, /balances y /leaders por cada bloque).
+"Después": los eventos traen deltas compactos agrupados y el panel no hace peticiones.
+Se ejecuta contra app.py con una BD temporal y el cliente de pruebas de Flask-SocketIO.
+Uso:
+    python benchmarks/bench_realtime.py --history 50 --txs-per-block 20 --blocks 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from time import sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+OLD_BLOCK_REFRESH = ('/balances', '/leaders', '/chain', '/mempool')
+
+
+def submit_transactions(client, count: int):
+    from blockchain import Blockchain, FOUNDER_ADDRESS, FOUNDER_PRIVATE_KEY
+    from keys import Keys
+    for i in range(count):
+        recipient = f"dashboard-{i % 7}"
+        signature = Keys.sign_digest(FOUNDER_PRIVATE_KEY, Blockchain._transaction_digest(FOUNDER_ADDRESS, recipient, 1))
+        client.post('/transactions/new', json={'sender_pub': FOUNDER_ADDRESS, 'recipient': recipient,
+                                               'amount': 1, 'signature': signature})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, default=50, help='bloques previos (tamaño de /chain)')
+    parser.add_argument('--txs-per-block', type=int, default=20)
+    parser.add_argument('--blocks', type=int, default=3)
+    parser.add_argument('--debounce-ms', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ['DELTA_DEBOUNCE_MS'] = str(args.debounce_ms)
+    os.chdir(tempfile.mkdtemp())
+    import app as node
+
+    client = node.app.test_client()
+    for _ in range(args.history):
+        submit_transactions(client, 2)
+        node.blockchain.mine_block('miner-history')
+
+    before_bytes = before_requests = 0
+    after_bytes = after_events = 0
+    socket_client = node.socketio.test_client(node.app)
+    sleep(args.debounce_ms / 1000 * 2)
+    socket_client.get_received()
+
+    for _ in range(args.blocks):
+        submit_transactions(client, args.txs_per_block)
+        node.blockchain.mine_block('miner-bench')
+        sleep(args.debounce_ms / 1000 * 2)
+
+        # Antes: un /mempool por transacción y el refresco completo por el bloque
+        refreshes = ['/mempool'] * args.txs_per_block + list(OLD_BLOCK_REFRESH)
+        before_requests += len(refreshes)
+        before_bytes += sum(len(client.get(path).data) for path in refreshes)
+
+        # Después: solo los eventos con deltas recibidos por el panel
+        received = socket_client.get_received()
+        after_events += len(received)
+        after_bytes += sum(len(json.dumps(event['args'])) for event in received)
+
+    print(f"Por bloque y por panel ({args.txs_per_block} transacciones, cadena de {node.blockchain.height} bloques):")
+    print(f"{'modo':<10}{'peticiones':>12}{'eventos':>10}{'KiB':>12}")
+    print(f"{'antes':<10}{before_requests / args.blocks:>12.1f}{args.txs_per_block + 1:>10}"
+          f"{before_bytes / args.blocks / 1024:>12.1f}")
+    print(f"{'después':<10}{0:>12.1f}{after_events / args.blocks:>10.1f}{after_bytes / args.blocks / 1024:>12.1f}")
+    node.blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
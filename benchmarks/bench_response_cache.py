@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la caché de respuestas: throughput y latencias de los endpoints de consulta más sondeados
+(/balances, /leaders, /chain, /mempool, /aliases) con y sin caché.
+
+Prepara una BD temporal con --chain-blocks bloques y --mempool-size transacciones pendientes (igual que
+bench_load.py) y mide cada endpoint con el cliente de pruebas de Flask y --concurrency hilos:
+    sin caché   -> cada petición construye y serializa la respuesta (caché con 0 bytes)
+    con caché   -> solo la primera petición de cada versión del estado se serializa
+Con --tx-rate > 0 un hilo envía transacciones firmadas (hasta --background-txs en total) a ese ritmo
+mientras se mide, de modo que /balances y /mempool se invalidan continuamente; se reporta la tasa de
+aciertos resultante.
+Uso:
+    python benchmarks/bench_response_cache.py --chain-blocks 200 --mempool-size 500 --requests 2000 \\
+        --concurrency 8 [--tx-rate 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from time import sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_load import ClientDriver, fill_mempool, generate_keys, prepare_chain, presign_transactions, run_load
+
+ENDPOINTS = ('/balances', '/leaders', '/chain?from=1&limit=100', '/mempool', '/aliases')
+
+
+def submit_transactions(blockchain, pool: list, rate: float, done: threading.Event) -> int:
+    """
+    Envía transacciones del lote al ritmo indicado hasta que se detiene la medición. Retorna cuántas envió.
+    """
+    sent = 0
+    while pool and not done.is_set():
+        payload = pool.pop()
+        blockchain.new_transaction(payload['sender_pub'], payload['recipient'], payload['amount'],
+                                   payload['signature'])
+        sent += 1
+        sleep(1 / rate)
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chain-blocks', type=int, default=200)
+    parser.add_argument('--mempool-size', type=int, default=500)
+    parser.add_argument('--keys', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000, help='peticiones por endpoint y variante')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--tx-rate', type=float, default=0, help='transacciones por segundo durante la medición')
+    parser.add_argument('--background-txs', type=int, default=1000, help='transacciones de fondo firmadas de antemano')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.chdir(tempfile.mkdtemp())
+    import app as node
+    blockchain = node.blockchain
+    cache = node.response_cache
+    max_bytes = cache.max_bytes
+
+    keys = generate_keys(args.keys)
+    total = args.mempool_size + (args.background_txs if args.tx_rate > 0 else 0)
+    prepare_chain(blockchain, keys, args.chain_blocks, total // args.keys + 10)
+    pool = presign_transactions(keys, total, rng, 'cache')
+    fill_mempool(blockchain, pool, args.mempool_size)
+
+    print(f"Cadena de {blockchain.height} bloques, {len(blockchain.mempool)} transacciones pendientes"
+          + (f", {args.tx_rate:g} tx/s de fondo" if args.tx_rate > 0 else ''))
+    print(f"{'endpoint':<26}{'variante':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'aciertos':>10}")
+    driver = ClientDriver(node.app)
+    for path in ENDPOINTS:
+        endpoint = path.split('?')[0].strip('/')
+        for label, limit in (('sin caché', 0), ('con caché', max_bytes)):
+            cache.max_bytes = limit
+            cache.clear()
+            before = cache.stats()['endpoints'].get(endpoint, {'hits': 0, 'misses': 0})
+            done = threading.Event()
+            submitter = None
+            if args.tx_rate > 0:
+                submitter = threading.Thread(target=submit_transactions, daemon=True,
+                                             args=(blockchain, pool, args.tx_rate, done))
+                submitter.start()
+            result = run_load(driver, [('GET', path, None)] * args.requests, args.concurrency)
+            done.set()
+            if submitter is not None:
+                submitter.join()
+            after = cache.stats()['endpoints'][endpoint]
+            hits = after['hits'] - before['hits']
+            lookups = hits + after['misses'] - before['misses']
+            hit_rate = f"{hits / lookups * 100:.1f}%" if limit else '-'
+            print(f"{path:<26}{label:<12}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{hit_rate:>10}")
+    driver.close()
+    blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
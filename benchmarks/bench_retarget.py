@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Simulación del ajuste de dificultad (retarget.next_target) frente a cambios de potencia de minado.
+
+No se mina de verdad: el tiempo de cada bloque se muestrea de una exponencial con media
+2^256 / (objetivo + 1) / hashrate, que es el tiempo esperado para encontrar un hash <= objetivo.
+La potencia arranca en --hashrate y se multiplica por cada factor de --changes en bloques
+equiespaciados. Se imprime, por ventana de reajuste, el tiempo medio por bloque y la dificultad
+resultante: tras cada cambio el tiempo medio debe volver a TARGET_BLOCK_TIME en pocas ventanas.
+Uso:
+    python benchmarks/bench_retarget.py --blocks 400 --hashrate 50000 --changes 10 0.25 --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retarget import (RETARGET_INTERVAL, TARGET_BLOCK_TIME, block_target, difficulty_of, encode_target,
+                      next_target)
+
+
+def simulate(blocks: int, hashrate: float, changes: list, seed: int) -> list:
+    """
+    Genera 'blocks' cabeceras v3 con timestamps simulados. Retorna la lista de cabeceras (altura h en h-1).
+    """
+    rng = random.Random(seed)
+    headers = []
+
+    def header_at(height):
+        return headers[height - 1]
+
+    change_every = blocks // (len(changes) + 1)
+    timestamp = 1700000000.0
+    for height in range(1, blocks + 1):
+        if changes and height > 1 and (height - 1) % change_every == 0 and (height - 1) // change_every <= len(changes):
+            hashrate *= changes[(height - 1) // change_every - 1]
+        target = next_target(header_at, height)
+        mean_seconds = 2 ** 256 / (target + 1) / hashrate
+        timestamp += rng.expovariate(1 / mean_seconds)
+        headers.append({'version': 3, 'index': height, 'timestamp': timestamp, 'target': encode_target(target),
+                        'hashrate': hashrate})
+    return headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=400)
+    parser.add_argument('--hashrate', type=float, default=50000.0, help='hashes/s iniciales')
+    parser.add_argument('--changes', type=float, nargs='*', default=[10.0, 0.25],
+                        help='factores de cambio de la potencia de minado')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    headers = simulate(args.blocks, args.hashrate, args.changes, args.seed)
+    print(f"Objetivo: {TARGET_BLOCK_TIME:g} s por bloque, reajuste cada {RETARGET_INTERVAL} bloques")
+    print(f"{'bloques':>12} {'hashes/s':>12} {'seg/bloque':>11} {'dificultad':>11}")
+    for first in range(1, len(headers), RETARGET_INTERVAL):
+        last = min(first + RETARGET_INTERVAL, len(headers))
+        span = headers[last - 1]['timestamp'] - headers[first - 1]['timestamp']
+        window = headers[last - 1]
+        print(f"{f'{first}-{last}':>12} {window['hashrate']:>12,.0f} {span / (last - first):>11.2f} "
+              f"{difficulty_of(block_target(window)):>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de verificación de firmas ECDSA: secuencial vs Keys.verify_many (pool de procesos).
+
+Mide 1k y 10k firmas de remitentes distintos.
+Uso:
+    python benchmarks/bench_signatures.py --sizes 1000 10000 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain
+from keys import Keys
+
+
+def presign(count: int, senders: int = 100) -> list:
+    """
+    Genera 'count' tuplas (llave_publica, firma, hash) firmadas por 'senders' remitentes.
+    """
+    key_pairs = [Keys.generate_key_pair() for _ in range(senders)]
+    items = []
+    for i in range(count):
+        private_key, public_key = key_pairs[i % senders]
+        digest = Blockchain._transaction_digest(public_key, f"recipient-{i}", 1)
+        items.append((public_key, Keys.sign_digest(private_key, digest), digest))
+    return items
+
+
+def warmup_size(workers: int) -> int:
+    """
+    Tamaño del lote de calentamiento que arranca los procesos del pool antes de medir.
+    """
+    return workers * 64
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    items = presign(max(args.sizes))
+    print(f"{'firmas':>8} {'modo':>22} {'segundos':>10} {'firmas/s':>10}")
+    for size in args.sizes:
+        batch = items[:size]
+
+        started = perf_counter()
+        assert all(Keys.verify_signature(*item) for item in batch)
+        elapsed = perf_counter() - started
+        print(f"{size:>8} {'secuencial':>22} {elapsed:>10.3f} {size / elapsed:>10,.0f}")
+
+        for workers in args.workers:
+            Keys.verify_many(batch[:warmup_size(workers)], workers=workers)
+            started = perf_counter()
+            assert all(Keys.verify_many(batch, workers=workers))
+            elapsed = perf_counter() - started
+            print(f"{size:>8} {f'verify_many({workers})':>22} {elapsed:>10.3f} {size / elapsed:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
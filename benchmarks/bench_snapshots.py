@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque en frío con y sin instantáneas del estado sobre una cadena sintética de 100k bloques.
+
+Se genera la cadena, se abre una vez (migración: índice de transacciones y estadísticas), se guarda una
+instantánea en la punta y se prolonga la cadena con --recent bloques más. De esa BD salen dos copias:
+    con instantánea  -> al arrancar, las estadísticas se reconstruyen desde la instantánea y solo se
+                        recorren los --recent bloques posteriores
+    sin instantánea  -> se borran las instantáneas y se recorre la cadena completa
+Como referencia se mide también un reinicio normal (estadísticas ya al día). Cada arranque se ejecuta
+en un subproceso. Se reporta además el tamaño de la instantánea servida a los pares.
+Uso:
+    python benchmarks/bench_snapshots.py --blocks 100000 --recent 1000 --txs-per-block 5
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database
+
+
+def open_node(path: str) -> dict:
+    """
+    Arranca el nodo sobre la BD indicada y reporta el tiempo hasta tener los saldos listos.
+    """
+    import stats
+    replayed = {}
+    rebuild = stats.ChainStats.rebuild
+
+    def counting_rebuild(self, chain, base=None):
+        replayed['blocks'] = len(chain) - (base['height'] if base else 0)
+        return rebuild(self, chain, base)
+
+    stats.ChainStats.rebuild = counting_rebuild
+    from blockchain import Blockchain
+    started = perf_counter()
+    blockchain = Blockchain(db_path=path)
+    elapsed = perf_counter() - started
+    blockchain.miner.shutdown()
+    return {'seconds': round(elapsed, 3), 'replayed_blocks': replayed.get('blocks', 0),
+            'height': blockchain.height}
+
+
+def run_open(path: str) -> dict:
+    output = subprocess.run([sys.executable, __file__, '--open', path], capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--recent', type=int, default=1000, help='bloques posteriores a la instantánea')
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--open', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.open:
+        print(json.dumps(open_node(args.open)))
+        return
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    base_blocks = args.blocks - args.recent
+    build_database(path, base_blocks, args.txs_per_block)
+    print(f"Migración inicial ({base_blocks} bloques): {run_open(path)['seconds']:.3f}s")
+
+    from blockchain import Blockchain
+    from storage import Storage
+    blockchain = Blockchain(storage=Storage(path, group_commit_ms=0))
+    started = perf_counter()
+    meta = blockchain.create_snapshot()
+    print(f"Instantánea a la altura {meta['height']}: {meta['size'] / 1e3:.1f} kB comprimida, "
+          f"creada en {perf_counter() - started:.3f}s")
+    tip_hash = blockchain.tip_hash
+    blockchain.miner.shutdown()
+    blockchain.storage.close()
+    build_database(path, args.recent, args.txs_per_block, first_index=base_blocks + 1, previous_hash=tip_hash)
+
+    variants = {}
+    for label in ('con instantánea', 'sin instantánea'):
+        copy = os.path.join(workdir, f"{len(variants)}.db")
+        shutil.copy(path, copy)
+        if label == 'sin instantánea':
+            conn = sqlite3.connect(copy)
+            conn.execute('DELETE FROM snapshots')
+            conn.commit()
+            conn.close()
+        variants[label] = copy
+
+    print(f"{'arranque':<22}{'segundos':>10}{'bloques recorridos':>20}")
+    for label, copy in variants.items():
+        result = run_open(copy)
+        print(f"{label:<22}{result['seconds']:>10.3f}{result['replayed_blocks']:>20}")
+    result = run_open(variants['con instantánea'])
+    print(f"{'reinicio normal':<22}{result['seconds']:>10.3f}{result['replayed_blocks']:>20}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de throughput de /transactions/new antes y después de la capa WAL + group commit.
+
+"antes": journal DELETE, synchronous FULL y un commit por transacción (comportamiento original).
+"después": journal WAL, synchronous NORMAL y group commit del mempool.
+Las firmas se calculan antes de medir, para aislar el coste de ingesta y persistencia.
+Cada respuesta espera a que su fila esté en disco, de modo que el group commit solo rinde con
+varios clientes concurrentes (--clients), como en el servidor.
+Uso:
+    python benchmarks/bench_storage.py --transactions 2000 --clients 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain, FOUNDER_ADDRESS, FOUNDER_PRIVATE_KEY
+from keys import Keys
+from storage import Storage
+
+CONFIGURATIONS = {
+    'antes (DELETE/FULL, commit por tx)': dict(journal_mode='DELETE', synchronous='FULL', group_commit_ms=0),
+    'despues (WAL/NORMAL, group commit)': dict(journal_mode='WAL', synchronous='NORMAL', group_commit_ms=10),
+}
+
+
+def presign(count: int) -> list:
+    """
+    Firma con la llave del Fundador 'count' transferencias de 1 unidad.
+    """
+    signed = []
+    for i in range(count):
+        recipient = f"bench-{i}"
+        payload = {'amount': 1, 'recipient': recipient, 'sender': FOUNDER_ADDRESS}
+        signature = Keys.sign_digest(FOUNDER_PRIVATE_KEY, Blockchain._stable_hash_payload(payload))
+        signed.append((FOUNDER_ADDRESS, recipient, 1, signature))
+    return signed
+
+
+def run(name: str, options: dict, signed: list, clients: int):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    blockchain = Blockchain(storage=Storage(path, **options))
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for ok, message in pool.map(lambda tx: blockchain.new_transaction(*tx), signed):
+            assert ok, message
+    elapsed = perf_counter() - started
+    blockchain.storage.close()
+    print(f"{name:<40} {len(signed) / elapsed:>10,.0f} tx/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=32)
+    args = parser.parse_args()
+
+    signed = presign(min(args.transactions, 5000))
+    for name, options in CONFIGURATIONS.items():
+        run(name, options, signed, args.clients)
+
+
+if __name__ == '__main__':
+    main()
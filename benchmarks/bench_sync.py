@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de sincronización entre nodos en proceso (sin red real, con LocalTransport).
+
+El nodo A mina una cadena; el nodo B se sincroniza una vez desde cero y, tras unos pocos bloques
+nuevos en A, vuelve a resolver conflictos. Compara los bytes transferidos y el tiempo de la
+descarga del sufijo con los de descargar la cadena completa.
+Uso:
+    python benchmarks/bench_sync.py --blocks 100 --missing 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from blockchain import Blockchain
+from network import LocalTransport, PeerNetwork, create_network_blueprint
+
+
+class CountingTransport(LocalTransport):
+    """
+    LocalTransport que acumula el tamaño JSON de las respuestas recibidas.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_received = 0
+
+    def request(self, method, peer, path, payload=None):
+        code, body = super().request(method, peer, path, payload)
+        self.bytes_received += len(json.dumps(body))
+        return code, body
+
+
+def create_node(name: str, directory: str, transport: LocalTransport) -> PeerNetwork:
+    url = f"http://{name}"
+    network = PeerNetwork(Blockchain(db_path=os.path.join(directory, f"{name}.db")), node_url=url,
+                          transport=transport)
+    app = Flask(name)
+    app.register_blueprint(create_network_blueprint(network))
+    transport.attach(url, app)
+    return network
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100)
+    parser.add_argument('--missing', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    transport = CountingTransport()
+    node_a = create_node('a', directory, transport)
+    node_b = create_node('b', directory, transport)
+    node_b.blockchain.register_node('http://a')
+
+    for _ in range(args.blocks - args.missing):
+        node_a.blockchain.mine_block('miner-a')
+
+    for label in ('cadena completa', 'sufijo'):
+        if label == 'sufijo':
+            for _ in range(args.missing):
+                node_a.blockchain.mine_block('miner-a')
+        transport.bytes_received = 0
+        started = perf_counter()
+        replaced, message = node_b.resolve_conflicts()
+        elapsed = perf_counter() - started
+        print(f"{label:<16}{elapsed:>9.3f}s {transport.bytes_received / 1024:>10.1f} KiB  {message}")
+
+    assert node_b.blockchain.tip_hash == node_a.blockchain.tip_hash
+    for network in (node_a, node_b):
+        network.blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las consultas del explorador sobre una BD sintética (20k bloques por defecto).
+
+Compara la búsqueda de una transacción y del historial de una dirección recorriendo la cadena
+con las consultas sobre las tablas indexadas 'transactions' y 'address_tx'.
+Uso:
+    python benchmarks/bench_tx_lookup.py --blocks 20000 --txs-per-block 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database
+
+
+def scan_transaction(chain, txid: str):
+    from merkle import tx_hash
+    for block in chain:
+        for position, tx in enumerate(block['transactions']):
+            if tx_hash(tx) == txid:
+                return block['index'], position
+    return None
+
+
+def scan_history(chain, address: str, limit: int) -> list:
+    history = []
+    for block in chain:
+        for position, tx in enumerate(block['transactions']):
+            if address in (tx['sender'], tx['recipient']):
+                history.append((block['index'], position))
+    return history[::-1][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    from blockchain import Blockchain
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    build_database(path, args.blocks, args.txs_per_block)
+    blockchain = Blockchain(db_path=path)
+
+    # Una transacción y una dirección de la mitad de la cadena
+    middle = blockchain.get_block(str(args.blocks // 2))
+    txid = blockchain.get_address_history(middle['transactions'][-1]['sender'], limit=1)[0][0]['txid']
+    address = middle['transactions'][-1]['sender']
+
+    started = perf_counter()
+    expected = scan_transaction(blockchain._chain, txid)
+    scan_tx_time = perf_counter() - started
+    started = perf_counter()
+    found = blockchain.get_transaction(txid)
+    index_tx_time = perf_counter() - started
+    assert found is not None and expected is not None
+
+    started = perf_counter()
+    expected_history = scan_history(blockchain._chain, address, args.limit)
+    scan_history_time = perf_counter() - started
+    started = perf_counter()
+    history, _ = blockchain.get_address_history(address, limit=args.limit)
+    index_history_time = perf_counter() - started
+    assert [(entry['block_index'], entry['position']) for entry in history] == expected_history
+
+    print(f"{'consulta':<28}{'recorrido (ms)':>16}{'índice (ms)':>14}")
+    print(f"{'/tx/<txid>':<28}{scan_tx_time * 1000:>16.2f}{index_tx_time * 1000:>14.3f}")
+    print(f"{'/address/<addr>/history':<28}{scan_history_time * 1000:>16.2f}{index_history_time * 1000:>14.3f}")
+    blockchain.miner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
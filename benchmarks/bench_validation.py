@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de validación de la cadena sobre una BD sintética (100k bloques por defecto).
+
+Compara la auditoría completa en un solo hilo, la auditoría completa repartida entre procesos
+y la validación incremental desde el último punto de control tras añadir unos pocos bloques.
+La cadena sintética no tiene prueba de trabajo real, así que se valida con el objetivo máximo (any_target).
+Uso:
+    python benchmarks/bench_validation.py --blocks 100000 --workers 4 --chunk-size 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chain_loading import build_database
+
+NO_POW_TARGET = 2 ** 256 - 1
+
+
+def any_target(block: dict) -> int:
+    """
+    Objetivo que acepta cualquier hash (función de módulo para poder enviarla a los procesos del pool).
+    """
+    return NO_POW_TARGET
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100000)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--new-blocks', type=int, default=10)
+    args = parser.parse_args()
+
+    from blockchain import Blockchain
+    from chain_store import ChainStore, block_header
+    from chain_validator import ChainValidator
+    from retarget import TARGET_BLOCK_TIME
+    from storage import Storage, SQL_INSERT_BLOCK
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    build_database(path, args.blocks, args.txs_per_block)
+    storage = Storage(path, group_commit_ms=0)
+    chain = ChainStore(storage, Blockchain._hash)
+    chain.load()
+    print(f"BD sintética: {len(chain)} bloques")
+
+    for label, workers in (('completa, 1 proceso', 1), (f'completa, {args.workers} procesos', args.workers)):
+        validator = ChainValidator(storage, chain, Blockchain._hash, any_target, workers=workers, chunk_size=args.chunk_size)
+        started = perf_counter()
+        valid, report = validator.validate(full=True)
+        print(f"{label:<28}{perf_counter() - started:>9.3f}s  válida={valid} bloques={report['checked']}")
+
+    # Unos bloques nuevos por encima del punto de control registrado por la auditoría
+    previous_hash = chain.hash_at(-1)
+    for index in range(len(chain) + 1, len(chain) + args.new_blocks + 1):
+        block = Blockchain._build_block_struct(index, 1700000000.0 + index * TARGET_BLOCK_TIME, [], index,
+                                               previous_hash)
+        previous_hash = Blockchain._hash(block)
+        with storage.write() as cursor:
+            cursor.execute(SQL_INSERT_BLOCK, (index, json.dumps(block, sort_keys=True),
+                                              json.dumps(block_header(block), sort_keys=True), previous_hash))
+        chain.append(block, previous_hash)
+
+    validator = ChainValidator(storage, chain, Blockchain._hash, any_target, workers=1, chunk_size=args.chunk_size)
+    started = perf_counter()
+    valid, report = validator.validate()
+    print(f"{'incremental':<28}{perf_counter() - started:>9.3f}s  válida={valid} bloques={report['checked']}")
+
+
+if __name__ == '__main__':
+    main()
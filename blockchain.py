@@ -2,12 +2,29 @@
 import hashlib
 import json
 import sqlite3
+import threading
 from time import time
 from uuid import uuid4
 from urllib.parse import urlparse
-from collections import OrderedDict
+from collections import ChainMap, OrderedDict
 
 from keys import Keys
+from miner import ParallelMiner
+from merkle import tx_hash, merkle_root, merkle_proof, header_prefix
+from storage import Storage, SQL_INSERT_BLOCK, SQL_DELETE_MEMPOOL_BY_ID, SQL_DELETE_BLOCKS_ABOVE
+from chain_store import ChainStore, BlockPrunedError, block_header
+from mempool import Mempool
+from chain_validator import ChainValidator
+from codec import encode_block
+from retarget import (INITIAL_TARGET, encode_target, block_target, meets_target, difficulty_of, next_target,
+                      valid_target, valid_timestamp)
+import metrics
+from analytics import ChainAnalytics
+from pruning import PRUNE_ARCHIVE, PRUNE_TX_INDEX, BlockArchive, Compactor, Pruner
+from snapshots import SnapshotStore
+from stats import ChainStats
+from tx_index import TransactionIndex
+from write_queue import WriteQueue, serialized
 
 # ==========================================
 # CONFIGURACIÓN DE CREDENCIALES ADMINISTRATIVAS
@@ -17,6 +34,13 @@ from keys import Keys
 FOUNDER_PRIVATE_KEY = "84a1dad2fa1c17c90d67c28a7f2dc49634ee15bf0e22c02ced1209cebbbb8d7d"
 FOUNDER_ADDRESS = "04ce3540cbdc33541362e8715c279fa62c941fc34f7385dbd7244eb00cbe8f4f57dc000441801ec521f0063c51fed1e95a20b4943f3ebcf3af4c5716f95e2235d9"
 MINING_REWARD = 10 # Recompensa otorgada por bloque minado
+GENESIS_SUPPLY = 5000 # Emisión inicial asignada al Fundador en el Bloque Génesis
+# Versión 2: el hash del bloque cubre solo la cabecera (la raíz de Merkle compromete las transacciones).
+# Los bloques sin campo 'version' (v1) conservan el hash sobre el JSON completo.
+# Versión 3: la cabecera incluye el objetivo numérico de la prueba de trabajo ('target'), reajustado
+# cada RETARGET_INTERVAL bloques hacia TARGET_BLOCK_TIME (ver retarget.py). v1 y v2 exigen 4 ceros.
+# Los campos de cada versión de cabecera están en merkle.py.
+BLOCK_VERSION = 3
 
 print("*"*50)
 print(f"Llave PRIVADA Fundador (Admin): {FOUNDER_PRIVATE_KEY}")
@@ -25,83 +49,97 @@ print("*"*50)
 
 DB_NAME = 'Blockchain.db'
 
+# ==========================================
+# MÉTRICAS DE LAS RUTAS CRÍTICAS
+# ==========================================
+VERIFY_SECONDS = metrics.histogram('blockchain_verify_transaction_seconds', 'Duración de verify_transaction.')
+BALANCE_SECONDS = metrics.histogram('blockchain_get_balance_seconds', 'Duración de get_balance.')
+COMMIT_SECONDS = metrics.histogram('blockchain_block_commit_seconds',
+                                   'Persistencia y aplicación en memoria de un bloque nuevo (_commit_block).')
+
 class Blockchain:
     """
     Clase principal que gestiona la estructura de datos de la blockchain,
     la persistencia en base de datos SQLite y la lógica de consenso (PoW).
     """
 
-    def __init__(self):
-        # Inicialización de la conexión a la base de datos y estructuras en memoria
-        self.conn = self._connect_db()
-        self._create_tables()
-        self._chain = []
-        self._current_transactions = [] 
+    def __init__(self, db_path: str = DB_NAME, storage: Storage = None):
+        # Inicialización de la capa de persistencia (SQLite en modo WAL) y estructuras en memoria
+        self.storage = storage or Storage(db_path)
+        # Archivo comprimido donde se mueven los cuerpos de los bloques podados (opcional)
+        archive = BlockArchive(PRUNE_ARCHIVE, self.storage) if PRUNE_ARCHIVE else None
+        # Protege el estado en memoria (cadena, saldos y Mempool): el escritor lo toma solo mientras aplica
+        # cada cambio y los lectores para obtener una vista coherente. Nunca se mantiene durante E/S de la BD
+        # ni durante el PoW, de modo que las lecturas no esperan a las escrituras en disco.
+        self._lock = threading.RLock()
+        # Vista perezosa de la cadena: cabeceras + ventana de bloques recientes en memoria
+        self._chain = ChainStore(self.storage, self._hash, archive=archive, lock=self._lock)
+        # Validación incremental con puntos de control persistidos
+        self.validator = ChainValidator(self.storage, self._chain, self._hash)
+        # Estadísticas materializadas (ranking de mineros, actividad por dirección, saldos confirmados)
+        self.stats = ChainStats(self.storage)
+        # Índice de transacciones por txid y de historial por dirección
+        self.tx_index = TransactionIndex(self.storage)
+        # Instantáneas periódicas del estado (arranque y reorganizaciones sin recorrer toda la cadena)
+        self.snapshots = SnapshotStore(self.storage)
+        # Columnas NumPy del historial para la analítica agregada (se llenan en la primera consulta)
+        self.analytics = ChainAnalytics(self._chain)
+        # Mempool indexado por id de fila y por remitente (incluye los débitos pendientes)
+        self._mempool = Mempool()
+        # Nodos pares conocidos (URL base, p. ej. 'http://127.0.0.1:5001')
         self._nodes = set()
+        # Suscriptores a eventos del nodo ('block': nueva punta, 'transaction': transacción admitida,
+        # 'dropped': transacciones retiradas del Mempool sin minarse)
+        self._listeners = {'block': [], 'transaction': [], 'dropped': []}
+        # Las mutaciones (transacciones, bloques, reorganizaciones) se ejecutan de una en una en el hilo escritor
+        self._writes = WriteQueue()
+        # Poda de los cuerpos antiguos (PRUNE_KEEP_BLOCKS) y compactación en línea de la BD
+        self.pruner = Pruner(self.storage, self._chain, self._lock, archive=archive,
+                             tx_index=self.tx_index if PRUNE_TX_INDEX else None)
+        self.compactor = Compactor(self.storage)
+        self._prune_lock = threading.Lock()
+        # Índice de saldos confirmados (los débitos pendientes los lleva el Mempool)
+        self._balances = {}
         # Identificador único del nodo para la red
         self.node_id = str(uuid4()).replace('-', '')
+        # Motor de minado multiproceso (reparte el espacio de nonces entre núcleos)
+        self.miner = ParallelMiner()
 
         # Carga del estado inicial desde la persistencia
         self._load_chain_from_db()
+        self.tx_index.backfill(self._chain)
         self._load_mempool_from_db()
+        self._rebuild_ledger()
+        if self.pruner.enabled:
+            # Migración: las BD creadas sin auto_vacuum incremental se reescriben una vez para poder compactarlas
+            self.storage.enable_incremental_vacuum()
+            threading.Thread(target=self.prune, name='block-pruner', daemon=True).start()
+        self.compactor.start()
 
     # ==========================================
     #      GESTIÓN DE PERSISTENCIA (SQLITE)
     # ==========================================
     
-    def _connect_db(self):
-        """
-        Establece la conexión con la base de datos SQLite.
-        Configura el row_factory para acceder a columnas por nombre.
-        """
-        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    def _create_tables(self):
-        """
-        Inicializa el esquema de base de datos si no existe.
-        Crea tablas para almacenar bloques confirmados y el mempool.
-        """
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS blocks (
-                "index" INTEGER PRIMARY KEY,
-                block_data TEXT NOT NULL
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mempool (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tx_data TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
-
     def _load_chain_from_db(self):
         """
-        Recupera la cadena de bloques completa desde la base de datos.
-        Si la base de datos está vacía, inicializa el Bloque Génesis.
+        Carga las cabeceras de la cadena y los bloques más recientes desde la base de datos.
+        Los bloques antiguos se leen bajo demanda. Si la base de datos está vacía, inicializa el Bloque Génesis.
         """
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT block_data FROM blocks ORDER BY "index" ASC')
-        rows = cursor.fetchall()
+        self._chain.load()
         
-        if not rows:
+        if not len(self._chain):
             print("Base de datos vacia. Inicializando Bloque Genesis...")
             self._new_block(previous_hash='0' * 64, nonce=0, genesis=True)
         else:
-            print(f"Cargando {len(rows)} bloques desde la base de datos...")
-            self._chain = [json.loads(row['block_data']) for row in rows]
+            print(f"Cargando {len(self._chain)} bloques desde la base de datos...")
 
     def _load_mempool_from_db(self):
         """
         Recupera las transacciones pendientes (Mempool) desde la base de datos.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT tx_data FROM mempool")
-        rows = cursor.fetchall()
-        self._current_transactions = [json.loads(row['tx_data']) for row in rows]
+        rows = self.storage.query("SELECT id, tx_data FROM mempool ORDER BY id ASC")
+        for row in rows:
+            self._mempool.add(row['id'], json.loads(row['tx_data']))
 
     # ==========================================
     #        LÓGICA CORE DE BLOCKCHAIN
@@ -117,22 +155,42 @@ class Blockchain:
         payload_string = json.dumps(sorted_payload, separators=(',', ':')).encode()
         return hashlib.sha256(payload_string).hexdigest()
 
-    def _build_block_struct(self, index, timestamp, transactions, nonce, previous_hash):
+    @staticmethod
+    def _build_block_struct(index, timestamp, transactions, nonce, previous_hash, target=INITIAL_TARGET):
         """
         Método auxiliar para estandarizar la estructura de datos del bloque.
         Garantiza que el objeto bloque sea idéntico durante el minado y el guardado.
+        target es el objetivo numérico de la prueba de trabajo exigido a esta altura.
         """
         return {
+            'version': BLOCK_VERSION,
             'index': index,
             'timestamp': timestamp,
             'transactions': transactions,
             'nonce': nonce,
             'previous_hash': previous_hash,
+            'merkle_root': merkle_root([tx_hash(tx) for tx in transactions]),
+            'target': encode_target(target),
         }
 
-    def _new_block(self, previous_hash: str, nonce: int, genesis: bool = False, current_time: float = None):
+    @staticmethod
+    def _coinbase_transaction(miner_address: str) -> dict:
+        """
+        Transacción Coinbase (Recompensa de minado) para la dirección indicada.
+        """
+        return {
+            'sender': "SYSTEM", 
+            'recipient': miner_address,
+            'amount': MINING_REWARD, 
+            'signature': "SYSTEM_SIGNATURE"
+        }
+
+    @serialized
+    def _new_block(self, previous_hash: str, nonce: int, genesis: bool = False, current_time: float = None,
+                   miner_address: str = None, mempool_entries: list = None):
         """
         Crea un nuevo bloque, lo añade a la cadena y persiste el estado en la BD.
+        mempool_entries son pares (row_id, tx); por defecto se usa la selección del Mempool.
         """
         # 1. Construcción de transacciones del bloque
         transactions_in_block = []
@@ -142,19 +200,16 @@ class Blockchain:
             transactions_in_block.append({
                 'sender': "SYSTEM", 
                 'recipient': FOUNDER_ADDRESS, 
-                'amount': 5000, 
+                'amount': GENESIS_SUPPLY, 
                 'signature': "SYSTEM_SIGNATURE"
             })
+            mempool_entries = []
         else:
-            # Transacción Coinbase (Recompensa de minado)
-            transactions_in_block.append({
-                'sender': "SYSTEM", 
-                'recipient': self.node_id,
-                'amount': MINING_REWARD, 
-                'signature': "SYSTEM_SIGNATURE"
-            })
-            # Inclusión de transacciones del Mempool
-            transactions_in_block.extend(self._current_transactions)
+            transactions_in_block.append(self._coinbase_transaction(miner_address or self.node_id))
+            # Inclusión de transacciones del Mempool (acotadas por MAX_TXS_PER_BLOCK)
+            if mempool_entries is None:
+                mempool_entries = self._fundable(self._mempool.select())
+            transactions_in_block.extend(tx for _, tx in mempool_entries)
 
         # 2. Ensamblaje del bloque
         block = self._build_block_struct(
@@ -162,147 +217,463 @@ class Blockchain:
             timestamp=current_time or time(),
             transactions=transactions_in_block,
             nonce=nonce,
-            previous_hash=previous_hash or self._hash(self.last_block)
+            previous_hash=previous_hash or self._hash(self.last_block),
+            target=self._next_target()
         )
+        return self._commit_block(block, [row_id for row_id, _ in mempool_entries])
+
+    @metrics.timed(COMMIT_SECONDS)
+    def _commit_block(self, block: dict, mempool_row_ids: list):
+        """
+        Persiste un bloque ya construido y retira del Mempool solo las filas incluidas (por id).
+        La inserción del bloque y la limpieza del mempool se confirman en la misma transacción BD.
+        """
+        # Ningún remitente puede gastar más de su saldo confirmado (misma regla que _check_block)
+        balances = ChainMap({}, self._balances)
+        if not self._apply_transfers(block['transactions'], balances):
+            print("Bloque descartado: una transacción supera el saldo confirmado de su remitente.")
+            return None
 
         # 3. Persistencia atómica (Transacción BD)
-        block_string = json.dumps(block, sort_keys=True)
-        cursor = self.conn.cursor()
+        block_row = self._block_row(block)
+        block_hash = block_row[3]
         try:
-            # Insertar bloque
-            cursor.execute('INSERT INTO blocks ("index", block_data) VALUES (?, ?)',
-                           (block['index'], block_string))
-            
-            # Limpiar mempool si no es génesis
-            if not genesis:
-                cursor.execute("DELETE FROM mempool")
-            
-            self.conn.commit()
-            
-            # 4. Actualización del estado en memoria
-            self._current_transactions = []
-            self._chain.append(block)
-            return block
+            with self.storage.write() as cursor:
+                # Insertar bloque (con su cabecera y hash para la carga perezosa)
+                cursor.execute(SQL_INSERT_BLOCK, block_row)
+                self.stats.apply_block(cursor, block, block_hash)
+                self.tx_index.index_block(cursor, block)
+                
+                # Eliminar del mempool las transacciones incluidas (las recibidas durante el minado se conservan)
+                cursor.executemany(SQL_DELETE_MEMPOOL_BY_ID, [(row_id,) for row_id in mempool_row_ids])
             
         except sqlite3.IntegrityError:
             print("Error de integridad: El bloque ya existe en la BD.")
             return None
 
-    def new_transaction(self, sender_pub: str, recipient: str, amount: int, signature: str) -> tuple[bool, str]:
+        # 4. Actualización del estado en memoria
+        with self._lock:
+            self._mempool.remove(mempool_row_ids)
+            self._chain.append(block, block_hash)
+            self._balances.update(balances.maps[0])
+        self._revalidate_pending({tx['sender'] for tx in block['transactions']})
+        # Cualquier minado sobre la punta anterior queda obsoleto
+        self.miner.cancel()
+        self._notify('block', block)
+        if self.snapshots.due(block['index']):
+            self._schedule_snapshot()
+        return block
+
+    def _schedule_snapshot(self):
+        """
+        Guarda una instantánea del estado en segundo plano (no retrasa la confirmación de bloques).
+        """
+        threading.Thread(target=self._snapshot_and_prune, name='state-snapshot', daemon=True).start()
+
+    def _snapshot_and_prune(self):
+        self.create_snapshot()
+        # Cada instantánea nueva permite podar hasta ella cuando queda a PRUNE_KEEP_BLOCKS de la punta
+        if self.pruner.enabled:
+            self.prune()
+
+    def create_snapshot(self) -> dict:
+        """
+        Guarda una instantánea del estado confirmado. Retorna sus metadatos, o None si no fue posible.
+        """
+        return self.snapshots.create(self._chain)
+
+    def prune(self) -> dict:
+        """
+        Poda los cuerpos de los bloques hasta la instantánea más alta que deja PRUNE_KEEP_BLOCKS bloques completos.
+        Antes se valida la cadena, de modo que solo se podan bloques verificados. Cada fragmento se poda en el
+        hilo escritor (las mutaciones se intercalan y ninguna reorganización se cruza con la poda); al terminar
+        se compacta la BD para devolver el espacio liberado.
+
+        Retorna:
+            dict: {'pruned_height': altura podada, 'pruned_blocks': bloques podados en esta llamada}.
+        """
+        pruned = 0
+        with self._prune_lock:
+            if self.pruner.enabled and self.validator.validate()[0]:
+                snapshots = [meta for meta in self.snapshots.list()
+                             if meta['height'] <= len(self._chain)
+                             and self._chain.hash_at(meta['height'] - 1) == meta['tip_hash']]
+                target = self.pruner.target_height([meta['height'] for meta in snapshots])
+                if target:
+                    target_hash = self._chain.hash_at(target - 1)
+                    while True:
+                        step = self._prune_step(target, target_hash)
+                        if not step:
+                            break
+                        pruned += step
+            if pruned and self.compactor.interval > 0:
+                self.compactor.compact()
+        return {'pruned_height': self._chain.pruned_height, 'pruned_blocks': pruned}
+
+    @serialized
+    def _prune_step(self, target: int, target_hash: str) -> int:
+        """
+        Poda el siguiente fragmento si la instantánea de destino sigue perteneciendo a la cadena.
+        """
+        if target > len(self._chain) or self._chain.hash_at(target - 1) != target_hash:
+            return 0
+        return self.pruner.prune_chunk(target)
+
+    @staticmethod
+    def _block_row(block: dict) -> tuple:
+        """
+        Fila de la tabla 'blocks' para un bloque: (index, block_data, header_data, hash).
+        block_data va en el formato de codec.BLOCK_ENCODING (JSON o compacto).
+        """
+        return (block['index'], encode_block(block),
+                json.dumps(block_header(block), sort_keys=True), Blockchain._hash(block))
+
+    def new_transaction(self, sender_pub: str, recipient: str, amount: int, signature: str,
+                        timestamp: float = None) -> tuple[bool, str]:
         """
         Crea una nueva transacción, la valida y la añade al Mempool.
+        timestamp solo se indica al admitir una transacción recibida de otro nodo (conserva el original).
+        Retorna cuando la fila del mempool está confirmada en disco (group commit), fuera del hilo escritor
+        para no retrasar las demás mutaciones. Las readmisiones hechas desde el propio escritor (una
+        reorganización) no esperan: no hay ningún cliente al que confirmar.
+        """
+        success, message, row_id = self._admit_transaction(sender_pub, recipient, amount, signature, timestamp)
+        if row_id is not None and not self._writes.in_writer():
+            self.storage.wait_committed(row_id)
+        return success, message
+
+    @serialized
+    def _admit_transaction(self, sender_pub: str, recipient: str, amount: int, signature: str,
+                           timestamp: float = None) -> tuple[bool, str, int]:
+        """
+        Validación y admisión en el Mempool (ver new_transaction); retorna también el id de la fila encolada.
+        Se ejecuta en el hilo escritor: la comprobación de saldo y la admisión no se intercalan con otras mutaciones.
         """
         is_valid, message = self.verify_transaction(sender_pub, recipient, amount, signature)
-        
+
         if not is_valid:
-            return False, message
-        
-        # Estructura de la transacción con timestamp de recepción
-        tx_payload = {
+            return False, message, None
+
+        tx_payload = self._transaction_payload(sender_pub, recipient, amount, signature, timestamp)
+        # Una transacción difundida puede llegar por varios pares a la vez
+        if self._mempool.row_id_of(tx_hash(tx_payload)) is not None:
+            return False, "La transacción ya está en el Mempool.", None
+        self._make_room_in_mempool(1)
+
+        # Persistencia en la tabla mempool (confirmada por el escritor de group commit)
+        row_id = self.storage.queue_mempool_insert(json.dumps(tx_payload))
+        with self._lock:
+            self._mempool.add(row_id, tx_payload)
+        self._notify('transaction', tx_payload)
+        return True, "Transaccion verificada y anadida al Mempool.", row_id
+
+    def new_transactions_batch(self, transactions: list) -> list:
+        """
+        Valida y añade un lote de transacciones al Mempool.
+        Las firmas se verifican en paralelo (Keys.verify_many) fuera del hilo escritor; la admisión es
+        atómica y secuencial contra el estado de saldos, acumulando los débitos del propio lote para
+        que dos gastos del mismo lote no puedan sobregirar una cuenta.
+
+        Parámetros:
+            transactions (list): Tuplas (sender_pub, recipient, amount, signature).
+
+        Retorna:
+            list[tuple[bool, str]]: El resultado de cada transacción, en el mismo orden.
+        """
+        signatures_ok = Keys.verify_many([
+            (sender_pub, signature, self._transaction_digest(sender_pub, recipient, amount))
+            for sender_pub, recipient, amount, signature in transactions
+        ])
+        return self._admit_transactions(transactions, signatures_ok)
+
+    @serialized
+    def _admit_transactions(self, transactions: list, signatures_ok: list) -> list:
+        """
+        Admisión de un lote con las firmas ya verificadas (ver new_transactions_batch).
+        """
+        results = []
+        admitted = []
+        batch_debits = {}
+        for (sender_pub, recipient, amount, signature), signature_ok in zip(transactions, signatures_ok):
+            if not self._well_formed_transfer(sender_pub, amount):
+                results.append((False, "Transaccion malformada: el monto debe ser un entero positivo."))
+                continue
+            current_balance = self.get_balance(sender_pub) - batch_debits.get(sender_pub, 0)
+            if current_balance < amount:
+                results.append((False, f"Fondos insuficientes. Saldo actual: {current_balance}."))
+            elif not signature_ok:
+                results.append((False, "Verificacion de firma fallida. Firma invalida."))
+            else:
+                batch_debits[sender_pub] = batch_debits.get(sender_pub, 0) + amount
+                admitted.append(self._transaction_payload(sender_pub, recipient, amount, signature))
+                results.append((True, "Transaccion verificada y anadida al Mempool."))
+
+        # Todo el lote admitido se confirma en una sola transacción BD
+        if admitted:
+            self._make_room_in_mempool(len(admitted))
+            row_ids = self.storage.insert_mempool_batch([json.dumps(tx) for tx in admitted])
+            with self._lock:
+                for row_id, tx_payload in zip(row_ids, admitted):
+                    self._mempool.add(row_id, tx_payload)
+            for tx_payload in admitted:
+                self._notify('transaction', tx_payload)
+        return results
+
+    @staticmethod
+    def _transaction_payload(sender_pub: str, recipient: str, amount: int, signature: str,
+                             timestamp: float = None) -> dict:
+        """
+        Estructura de la transacción con timestamp de recepción.
+        """
+        return {
             'sender': sender_pub, 
             'recipient': recipient,
             'amount': amount, 
             'signature': signature,
-            'timestamp': time()
+            'timestamp': timestamp or time()
         }
-        
-        # Persistencia en la tabla mempool
-        tx_string = json.dumps(tx_payload)
-        cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO mempool (tx_data) VALUES (?)", (tx_string,))
-        self.conn.commit()
-
-        self._current_transactions.append(tx_payload)
-        return True, "Transaccion verificada y anadida al Mempool."
-    
-    def proof_of_work(self, last_block: dict, current_time: float = None) -> int:
+
+    def build_candidate_block(self, miner_address: str, current_time: float = None) -> tuple[dict, list]:
         """
-        Algoritmo de Consenso (PoW): Encuentra un número 'nonce' tal que el hash del bloque
-        comience con 4 ceros.
+        Construye el bloque candidato sobre la punta actual con una selección acotada del Mempool.
+
+        Retorna:
+            tuple[dict, list]: (bloque candidato con nonce 0, ids de las filas del mempool incluidas).
         """
-        nonce = 0
-        
-        # Reconstrucción exacta del bloque candidato para el cálculo del hash
-        transactions_in_block = []
-        transactions_in_block.append({
-            'sender': "SYSTEM", 
-            'recipient': self.node_id,
-            'amount': MINING_REWARD, 
-            'signature': "SYSTEM_SIGNATURE"
-        })
-        transactions_in_block.extend(self._current_transactions)
-        
-        previous_hash = self._hash(last_block)
-        
-        # Bucle de fuerza bruta
-        while True:
-            guess_block = self._build_block_struct(
+        with self._lock:
+            mempool_entries = self._fundable(self._mempool.select())
+            candidate = self._build_block_struct(
                 index=len(self._chain) + 1,
                 timestamp=current_time or time(),
-                transactions=transactions_in_block,
-                nonce=nonce,
-                previous_hash=previous_hash
+                transactions=[self._coinbase_transaction(miner_address)] + [tx for _, tx in mempool_entries],
+                nonce=0,
+                previous_hash=self._chain.hash_at(-1),
+                target=self._next_target()
             )
+        return candidate, [row_id for row_id, _ in mempool_entries]
+    
+    def mine_block(self, miner_address: str) -> tuple[dict, dict]:
+        """
+        Mina y confirma un bloque cuya recompensa se asigna a miner_address.
+        El PoW se ejecuta sin bloquear el estado; la confirmación pasa por el hilo escritor, que
+        comprueba que la punta no cambió.
 
-            guess_hash = self._hash(guess_block)
-            
-            # Verificación de dificultad (4 ceros iniciales)
-            if guess_hash[:4] == "0000":
-                return nonce
-            
-            nonce += 1
+        Retorna:
+            tuple[dict, dict]: (bloque confirmado o None, estadísticas del minado o None si se canceló).
+        """
+        candidate, mempool_row_ids = self.build_candidate_block(miner_address)
+        result = self.miner.mine(self._header_prefix(candidate), block_target(candidate))
+        if result is None:
+            return None, None
+
+        return self._commit_mined(candidate, mempool_row_ids, result['nonce']), result
+
+    @serialized
+    def _commit_mined(self, candidate: dict, mempool_row_ids: list, nonce: int):
+        """
+        Confirma un candidato minado si sigue extendiendo la punta; si no, retorna None.
+        """
+        # Otro bloque ocupó esta altura mientras se minaba: el candidato es obsoleto
+        if candidate['previous_hash'] != self._chain.hash_at(-1):
+            return None
+        candidate['nonce'] = nonce
+        return self._commit_block(candidate, mempool_row_ids)
     
+    # ==========================================
+    #        MANTENIMIENTO DEL MEMPOOL
+    # ==========================================
+
+    def _drop_from_mempool(self, row_ids: list):
+        """
+        Elimina filas del mempool (memoria y BD) que no se incluirán en ningún bloque.
+        """
+        if not row_ids:
+            return
+        with self.storage.write() as cursor:
+            cursor.executemany(SQL_DELETE_MEMPOOL_BY_ID, [(row_id,) for row_id in row_ids])
+        with self._lock:
+            dropped = self._mempool.remove(row_ids)
+        if dropped:
+            self._notify('dropped', dropped)
+
+    def _make_room_in_mempool(self, incoming: int):
+        """
+        Expira las transacciones que superaron el TTL y, si aún no hay espacio para 'incoming'
+        transacciones nuevas, desaloja las más antiguas.
+        """
+        self._drop_from_mempool(self._mempool.expired_row_ids(time()))
+        self._drop_from_mempool(self._mempool.overflow_row_ids(incoming))
+
+    def _revalidate_pending(self, senders):
+        """
+        Tras confirmar un bloque o reorganizar la cadena, descarta las transacciones pendientes más recientes
+        de los remitentes cuyo total pendiente ya no cubre su saldo confirmado (p. ej. si el bloque incluyó
+        una transacción que había sido desalojada del mempool y luego se volvió a gastar el mismo saldo, o
+        si el abono que la financiaba quedó en un bloque huérfano).
+        """
+        for sender in senders:
+            row_ids = self._mempool.sender_row_ids(sender)
+            dropped, dropped_txs = [], []
+            with self._lock:
+                while row_ids and self._mempool.pending_debit(sender) > self._balances.get(sender, 0):
+                    dropped.append(row_ids.pop())
+                    dropped_txs.extend(self._mempool.remove(dropped[-1:]))
+            if dropped:
+                with self.storage.write() as cursor:
+                    cursor.executemany(SQL_DELETE_MEMPOOL_BY_ID, [(row_id,) for row_id in dropped])
+            if dropped_txs:
+                self._notify('dropped', dropped_txs)
+
+    # ==========================================
+    #     ÍNDICE DE SALDOS (ESTADO DE CUENTAS)
+    # ==========================================
+
+    def _rebuild_ledger(self):
+        """
+        Carga el índice de saldos confirmados desde las estadísticas persistidas.
+        Solo si no corresponden a la punta actual (BD anterior a las estadísticas, o una reorganización
+        interrumpida) se recalculan desde la última instantánea de la cadena actual, recorriendo solo los
+        bloques posteriores (o toda la cadena si no hay ninguna). Después el índice se mantiene incrementalmente.
+        """
+        height, tip_hash = self.stats.state()
+        if height == len(self._chain) and tip_hash == self._chain.hash_at(-1):
+            self._balances = self.stats.balances()
+        else:
+            self._balances = self.stats.rebuild(self._chain, self.snapshots.latest_on(self._chain))
+
+    @staticmethod
+    def _apply_transfers(transactions: list, balances) -> bool:
+        """
+        Aplica en orden las transacciones de un bloque sobre balances. La primera (Coinbase o emisión del
+        Génesis) no se comprueba; retorna False en cuanto otro remitente gastaría más de su saldo
+        (balances queda aplicado hasta esa transacción).
+        """
+        for position, tx in enumerate(transactions):
+            amount = int(tx['amount'])
+            if position > 0 and balances.get(tx['sender'], 0) < amount:
+                return False
+            balances[tx['sender']] = balances.get(tx['sender'], 0) - amount
+            balances[tx['recipient']] = balances.get(tx['recipient'], 0) + amount
+        return True
+
+    def _fundable(self, mempool_entries: list) -> list:
+        """
+        De una selección del Mempool, los pares (row_id, tx) que se pueden aplicar en ese orden sobre los
+        saldos confirmados; las demás (p. ej. un gasto que depende de un abono encolado detrás) siguen
+        pendientes.
+        """
+        balances = ChainMap({}, self._balances)
+        fundable = []
+        for row_id, tx in mempool_entries:
+            amount = int(tx['amount'])
+            if balances.get(tx['sender'], 0) < amount:
+                continue
+            balances[tx['sender']] = balances.get(tx['sender'], 0) - amount
+            balances[tx['recipient']] = balances.get(tx['recipient'], 0) + amount
+            fundable.append((row_id, tx))
+        return fundable
+
+    def _scan_balance(self, public_key_address: str) -> int:
+        """
+        Calcula el saldo recorriendo todo el historial (implementación de referencia).
+        Solo se usa para auditar la consistencia del índice de saldos (en un nodo podado requiere el archivo).
+        """
+        balance = 0
+        for block in self._chain:
+            for tx in block['transactions']:
+                if tx['recipient'] == public_key_address:
+                    balance += int(tx['amount'])
+                if tx['sender'] == public_key_address:
+                    balance -= int(tx['amount'])
+
+        for tx in self._mempool:
+            if tx['sender'] == public_key_address:
+                balance -= int(tx['amount'])
+        return balance
+
+    def is_ledger_consistent(self) -> bool:
+        """
+        Compara el índice de saldos contra el recorrido completo de la cadena.
+        """
+        return all(
+            self.get_balance(address) == self._scan_balance(address)
+            for address in set(self._balances) | set(self._mempool.senders())
+        )
+
     # ==========================================
     #        MÉTODOS AUXILIARES Y DE LECTURA
     # ==========================================
 
+    @staticmethod
+    def _header_prefix(block: dict) -> bytes:
+        """
+        Serializa la cabecera del bloque sin el nonce.
+        El hash del bloque es SHA-256(prefijo + nonce), lo que permite precalcular el prefijo al minar.
+        En los bloques v2 la cabecera no incluye el objetivo (ver merkle.header_prefix).
+        """
+        return header_prefix(block)
+
     @staticmethod
     def _hash(block: dict) -> str:
         """
         Genera el hash SHA-256 de un bloque.
+        Los bloques v1 (sin 'version') se siguen hasheando sobre el JSON completo, de modo que
+        las filas existentes de Blockchain.db y sus enlaces previous_hash siguen siendo válidos.
+        """
+        if block.get('version', 1) < 2:
+            block_string = json.dumps(block, sort_keys=True).encode()
+            return hashlib.sha256(block_string).hexdigest()
+        return hashlib.sha256(Blockchain._header_prefix(block) + b'%d' % block['nonce']).hexdigest()
+
+    @staticmethod
+    def _transaction_digest(sender_pub: str, recipient: str, amount: int) -> str:
         """
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        Hash que firma el remitente.
+        El payload para firmar NO incluye timestamp, solo datos críticos.
+        """
+        payload = {
+            'amount': amount, 
+            'recipient': recipient, 
+            'sender': sender_pub
+        }
+        return Blockchain._stable_hash_payload(payload)
 
+    @staticmethod
+    def _well_formed_transfer(sender_pub: str, amount) -> bool:
+        """
+        Regla común a la admisión local y a la validación de bloques: una transferencia mueve un monto
+        entero positivo y no la emite SYSTEM (solo la Coinbase y el Génesis).
+        El tipo se exige exacto (ni bool, ni float, ni cadena numérica): la firma cubre el monto entero,
+        mientras que tx_hash y la raíz de Merkle cubren el valor tal como viene en la transacción.
+        """
+        return sender_pub != "SYSTEM" and type(amount) is int and amount > 0
+
+    @metrics.timed(VERIFY_SECONDS)
     def verify_transaction(self, sender_pub: str, recipient: str, amount: int, signature: str) -> tuple[bool, str]:
         """
         Verifica la validez criptográfica y financiera de una transacción.
         """
+        if not self._well_formed_transfer(sender_pub, amount):
+            return False, "Transaccion malformada: el monto debe ser un entero positivo."
         current_balance = self.get_balance(sender_pub)
         if current_balance < amount:
             return False, f"Fondos insuficientes. Saldo actual: {current_balance}."
 
-        # El payload para firmar NO incluye timestamp, solo datos críticos
-        payload = {
-            'amount': amount, 
-            'recipient': recipient, 
-            'sender': sender_pub
-        }
-        message_hash_hex = self._stable_hash_payload(payload)
+        message_hash_hex = self._transaction_digest(sender_pub, recipient, amount)
         
         if not Keys.verify_signature(sender_pub, signature, message_hash_hex):
             return False, "Verificacion de firma fallida. Firma invalida."
 
         return True, "Transaccion valida."
 
+    @metrics.timed(BALANCE_SECONDS)
     def get_balance(self, public_key_address: str) -> int:
         """
-        Calcula el saldo de una dirección recorriendo todo el historial de transacciones (UTXO simplificado).
+        Retorna el saldo de una dirección en O(1) usando el índice de saldos.
+        Descuenta los débitos pendientes del Mempool para reflejar el saldo en tiempo real.
         """
-        balance = 0
-        # Recorrido de bloques confirmados
-        for block in self._chain:
-            for tx in block['transactions']:
-                if tx['recipient'] == public_key_address:
-                    balance += int(tx['amount'])
-                if tx['sender'] == public_key_address:
-                    balance -= int(tx['amount'])
-        
-        # Recorrido de transacciones pendientes (Mempool) para saldo en tiempo real
-        for tx in self._current_transactions:
-            if tx['sender'] == public_key_address:
-                balance -= int(tx['amount'])
-        return balance
+        with self._lock:
+            return self._balances.get(public_key_address, 0) - self._mempool.pending_debit(public_key_address)
 
     def issue_faucet_funds(self, recipient_address: str, amount: int = 100) -> tuple[bool, str]:
         """
@@ -330,70 +701,419 @@ class Blockchain:
         """
         Retorna un diccionario con los saldos de todas las direcciones conocidas.
         """
-        all_addresses = set()
-        for block in self.chain:
-            for tx in block['transactions']:
-                if tx['sender'] != "SYSTEM":
-                    all_addresses.add(tx['sender'])
-                all_addresses.add(tx['recipient'])
-        
-        balances = {}
-        for address in all_addresses:
-            balances[address] = self.get_balance(address)
-        return balances
+        with self._lock:
+            return {
+                address: balance - self._mempool.pending_debit(address)
+                for address, balance in self._balances.items()
+                if address != "SYSTEM"
+            }
 
-    def get_leaders(self) -> dict:
+    def get_leaders(self, limit: int = None) -> dict:
         """
-        Calcula el ranking de mineros basado en las recompensas acumuladas.
+        Ranking de mineros por recompensas acumuladas (los limit primeros, o todos).
+        Se sirve desde la tabla materializada 'miner_stats', sin recorrer la cadena.
         """
-        leaders = {}
-        for block in self.chain:
-            for tx in block['transactions']:
-                # Filtra transacciones tipo Coinbase
-                if tx['sender'] == "SYSTEM" and tx['recipient'] != FOUNDER_ADDRESS:
-                    miner = tx['recipient']
-                    amount = int(tx['amount'])
-                    leaders[miner] = leaders.get(miner, 0) + amount
-        return leaders
-
-    def is_chain_valid(self) -> bool:
-        """
-        Verifica la integridad completa de la cadena de bloques.
-        Comprueba enlaces de hash y pruebas de trabajo.
-        """
-        last_block = self._chain[0]
-        current_index = 1
-        while current_index < len(self._chain):
-            block = self._chain[current_index]
-            
-            # Verificar enlace criptográfico (hash del bloque anterior)
-            if block['previous_hash'] != self._hash(last_block):
-                return False
-            
-            # Verificar prueba de trabajo
-            if not self._valid_proof(self._hash(last_block), block['nonce']):
-                return False
-            
-            last_block = block
-            current_index += 1
-        return True
+        return dict(self.stats.top_miners(limit))
+
+    def get_address_stats(self, address: str) -> dict:
+        """
+        Actividad de una dirección: saldo confirmado, nº de transacciones, alturas de primera y
+        última aparición y, si ha minado, sus recompensas. Retorna None si nunca apareció.
+        """
+        return self.stats.address(address)
+
+    def get_transaction(self, txid: str) -> dict:
+        """
+        Busca una transacción por su hash: primero en la cadena (índice 'transactions') y si no,
+        en el Mempool. Retorna None si es desconocida.
+        """
+        occurrences = self.tx_index.find(txid)
+        with self._lock:
+            # Las filas del índice se confirman antes de que el bloque llegue a la cadena en memoria:
+            # solo cuentan las apariciones en bloques que la cadena en memoria ya alcanza
+            occurrences = [found for found in occurrences if found['block_index'] <= len(self._chain)]
+            if occurrences:
+                found = occurrences[-1]
+                found.update(txid=txid, status='confirmed', confirmations=len(self._chain) - found['block_index'] + 1,
+                             block_hash=self._chain.hash_at(found['block_index'] - 1), occurrences=len(occurrences))
+                return found
+            row_id = self._mempool.row_id_of(txid)
+            if row_id is None:
+                return None
+            return {'txid': txid, 'status': 'pending', 'transaction': self._mempool.get(row_id)}
+
+    def get_address_history(self, address: str, before: tuple = None, limit: int = None) -> tuple[list, tuple]:
+        """
+        Transacciones confirmadas de una dirección, de la más reciente a la más antigua, por páginas
+        (ver TransactionIndex.history).
+        """
+        return self.tx_index.history(address, before, limit)
+
+    def get_merkle_proof(self, txid: str, headers: int = 1) -> tuple[dict, str]:
+        """
+        Prueba de inclusión para clientes ligeros (verificable con merkle.verify_inclusion): la transacción,
+        su ruta de Merkle (log2 n hashes) y las cabeceras desde su bloque hacia la punta (como máximo
+        'headers'). Si el txid aparece en varios bloques se prueba la aparición más reciente.
+
+        Retorna:
+            tuple[dict, str]: (prueba, o None si no se puede probar, mensaje).
+        """
+        occurrences = self.tx_index.find(txid)
+        if not occurrences:
+            if self._mempool.row_id_of(txid) is not None:
+                return None, "Transacción pendiente: aún no está en ningún bloque."
+            return None, "Transacción desconocida."
+        found = occurrences[-1]
+        with self._lock:
+            position = found['block_index'] - 1
+            if position >= len(self._chain):
+                return None, "Transacción desconocida."
+            block = self._chain[position]
+            if block.get('version', 1) < 2:
+                return None, "El bloque es v1 (sin raíz de Merkle): no admite pruebas de inclusión."
+            stop = min(len(self._chain), position + max(1, headers))
+            chain_headers = [self._chain.header(h) for h in range(position, stop)]
+            confirmations = len(self._chain) - position
+        proof = merkle_proof([tx_hash(tx) for tx in block['transactions']], found['position'])
+        return {
+            'txid': txid,
+            'transaction': found['transaction'],
+            'block_index': found['block_index'],
+            'position': found['position'],
+            'merkle_path': proof,
+            'headers': chain_headers,
+            'confirmations': confirmations
+        }, "Prueba generada."
+
+    def get_block(self, reference: str) -> dict:
+        """
+        Bloque por altura (base 1) o por hash, con su hash. Retorna None si no existe.
+        """
+        with self._lock:
+            if reference.isdigit():
+                position = int(reference) - 1
+                if not 0 <= position < len(self._chain):
+                    return None
+            else:
+                # La fila se confirma en SQLite antes de añadirse a la cadena en memoria: un bloque recién
+                # persistido puede tener una posición que la cadena en memoria aún no alcanza
+                position = self._chain.position_of(reference)
+                if position is None or position >= len(self._chain):
+                    return None
+            return dict(self._chain[position], hash=self._chain.hash_at(position))
+
+    def is_chain_valid(self, full: bool = False) -> bool:
+        """
+        Verifica la integridad de la cadena de bloques (enlaces de hash, raíces de Merkle y pruebas de trabajo).
+        Por defecto solo revisa los bloques por encima del último punto de control verificado;
+        con full=True audita la cadena completa en paralelo.
+        """
+        return self.validate_chain(full)[0]
+
+    def validate_chain(self, full: bool = False) -> tuple[bool, dict]:
+        """
+        Igual que is_chain_valid, pero retorna también el informe del validador.
+        """
+        return self.validator.validate(full)
 
     @staticmethod
-    def _valid_proof(last_hash: str, nonce: int, difficulty: int = 4) -> bool:
+    def _valid_proof(block_hash: str, target: int) -> bool:
         """
-        Valida si un nonce cumple con la dificultad objetivo.
+        Valida si el hash de un bloque cumple el objetivo numérico.
+        Es la misma regla contra la que mina ParallelMiner (hash de la cabecera con el nonce).
         """
-        guess = f'{last_hash}{nonce}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:difficulty] == "0" * difficulty
-    
+        return meets_target(block_hash, target)
+
+    def _header_at(self, height: int) -> dict:
+        """
+        Cabecera del bloque de altura height (base 1) de la cadena local.
+        """
+        return self._chain.header(height - 1)
+
+    def _next_target(self) -> int:
+        """
+        Objetivo de la prueba de trabajo exigido al siguiente bloque.
+        """
+        return next_target(self._header_at, len(self._chain) + 1)
+
+    # ==========================================
+    #      RED: NODOS, EVENTOS Y SINCRONIZACIÓN
+    # ==========================================
+
+    def register_node(self, address: str) -> tuple[bool, str]:
+        """
+        Añade un nodo par a partir de su dirección (p. ej. 'http://192.168.0.5:5000' o '192.168.0.5:5000').
+        """
+        parsed_url = urlparse(address if '//' in address else f'http://{address}')
+        if not parsed_url.netloc:
+            return False, f"Dirección de nodo inválida: {address}"
+        self._nodes.add(f"{parsed_url.scheme}://{parsed_url.netloc}")
+        return True, "Nodo registrado."
+
+    def unregister_node(self, address: str) -> bool:
+        """
+        Elimina un nodo par. Retorna False si no estaba registrado.
+        """
+        parsed_url = urlparse(address if '//' in address else f'http://{address}')
+        node = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        if node not in self._nodes:
+            return False
+        self._nodes.discard(node)
+        return True
+
+    def subscribe(self, event: str, callback):
+        """
+        Registra una función que se llama con el bloque, la transacción o la lista de transacciones
+        retiradas ('dropped') de cada evento.
+        Se invoca desde el hilo escritor: no debe bloquear (p. ej. solo encolar un envío).
+        """
+        self._listeners[event].append(callback)
+
+    def _notify(self, event: str, payload: dict):
+        for callback in self._listeners[event]:
+            callback(payload)
+
+    def block_locator(self) -> list:
+        """
+        Hashes de la cadena local desde la punta hacia atrás: los 10 últimos y después con paso
+        doble, terminando en el Génesis. Permite a un par encontrar el último bloque común con
+        O(log n) hashes en lugar de enviar la cadena completa.
+        """
+        locator = []
+        position, step = len(self._chain) - 1, 1
+        while position > 0:
+            locator.append(self._chain.hash_at(position))
+            if len(locator) >= 10:
+                step *= 2
+            position -= step
+        locator.append(self._chain.hash_at(0))
+        return locator
+
+    def blocks_after_locator(self, locator: list, limit: int) -> tuple[int, list]:
+        """
+        Busca el primer hash del localizador que pertenece a la cadena local.
+
+        Retorna:
+            tuple[int, list]: (número de bloques en común, como máximo limit bloques siguientes).
+        """
+        fork_height = 0
+        for block_hash in locator:
+            position = self._chain.position_of(block_hash)
+            if position is not None:
+                fork_height = position + 1
+                break
+        return fork_height, self.get_blocks(fork_height, limit)
+
+    @serialized
+    def add_block(self, block: dict) -> tuple[bool, str]:
+        """
+        Valida y añade un bloque recibido de otro nodo que extiende la punta local.
+        """
+        return self.replace_suffix(len(self._chain), [block])
+
+    @serialized
+    def replace_suffix(self, fork_height: int, blocks: list) -> tuple[bool, str]:
+        """
+        Regla de la cadena más larga: sustituye los bloques locales por encima de fork_height
+        por los bloques recibidos, si la cadena resultante es más larga y todos son válidos.
+        Las transacciones de los bloques descartados vuelven al Mempool si siguen siendo válidas.
+        """
+        height = len(self._chain)
+        if not blocks or not 0 <= fork_height <= height:
+            return False, "Punto de bifurcación desconocido."
+        if fork_height + len(blocks) <= height:
+            return False, "La cadena recibida no es más larga que la local."
+        if fork_height < self._chain.pruned_height:
+            return False, "La bifurcación es anterior a los bloques podados."
+
+        # Saldos confirmados en el punto de bifurcación: se deshacen los bloques a reemplazar
+        orphaned = list(self._chain.iter_blocks(fork_height))
+        # Las estadísticas no son reversibles bloque a bloque (primera/última aparición): se recalcularán
+        # desde la última instantánea anterior a la bifurcación, que en un nodo podado debe cubrir la poda
+        base = self.snapshots.latest_on(self._chain, fork_height) if orphaned else None
+        if orphaned and self._chain.pruned_height and (base is None or base['height'] < self._chain.pruned_height):
+            return False, "No hay una instantánea del estado posterior a la poda desde la que reorganizar."
+        balances = dict(self._balances)
+        for block in reversed(orphaned):
+            for tx in block['transactions']:
+                amount = int(tx['amount'])
+                balances[tx['sender']] = balances.get(tx['sender'], 0) + amount
+                balances[tx['recipient']] = balances.get(tx['recipient'], 0) - amount
+
+        previous_hash = self._chain.hash_at(fork_height - 1) if fork_height else None
+        rows = []
+        # Cabeceras de la cadena resultante: locales hasta fork_height y recibidas por encima
+        received = {}
+
+        def header_at(h):
+            return received[h] if h > fork_height else self._header_at(h)
+
+        for index, block in enumerate(blocks, start=fork_height + 1):
+            received[index] = block
+            valid, message = self._check_block(block, index, previous_hash, balances, header_at)
+            if not valid:
+                return False, f"Bloque {index} inválido: {message}"
+            rows.append(self._block_row(block))
+            previous_hash = rows[-1][3]
+
+        included = {tx_hash(tx) for block in blocks for tx in block['transactions']}
+        row_ids = [row_id for row_id in map(self._mempool.row_id_of, included) if row_id is not None]
+        with self.storage.write() as cursor:
+            cursor.execute(SQL_DELETE_BLOCKS_ABOVE, (fork_height,))
+            cursor.executemany(SQL_INSERT_BLOCK, rows)
+            self.tx_index.delete_above(cursor, fork_height)
+            for block in blocks:
+                self.tx_index.index_block(cursor, block)
+            cursor.executemany(SQL_DELETE_MEMPOOL_BY_ID, [(row_id,) for row_id in row_ids])
+            self.snapshots.delete_above(cursor, fork_height)
+            if not orphaned:
+                for block, row in zip(blocks, rows):
+                    self.stats.apply_block(cursor, block, row[3])
+
+        # Actualización del estado en memoria
+        with self._lock:
+            self._mempool.remove(row_ids)
+            self._chain.truncate(fork_height)
+            for block, row in zip(blocks, rows):
+                self._chain.append(block, row[3])
+            self._balances = balances
+        if orphaned:
+            self.stats.rebuild(self._chain, base)
+        self.validator.discard_from(fork_height + 1)
+        self.miner.cancel()
+
+        for block in orphaned:
+            for tx in block['transactions'][1:]:
+                if tx_hash(tx) not in included:
+                    self.new_transaction(tx['sender'], tx['recipient'], int(tx['amount']), tx['signature'],
+                                         timestamp=tx.get('timestamp'))
+        # Se revisan, ya readmitidas las huérfanas, los remitentes de los bloques nuevos y todas las
+        # direcciones de los descartados: quien cobró en un bloque huérfano puede tener gastos pendientes
+        # que su saldo confirmado ya no cubre (el abono readmitido queda detrás en el Mempool)
+        touched = {tx['sender'] for block in blocks for tx in block['transactions']}
+        for block in orphaned:
+            for tx in block['transactions']:
+                touched.update((tx['sender'], tx['recipient']))
+        self._revalidate_pending(touched)
+        self._notify('block', blocks[-1])
+        if any(self.snapshots.due(block['index']) for block in blocks):
+            self._schedule_snapshot()
+        return True, f"Cadena actualizada: {len(orphaned)} bloques reemplazados, {len(blocks)} añadidos."
+
+    def _check_block(self, block: dict, index: int, previous_hash: str, balances: dict,
+                     header_at) -> tuple[bool, str]:
+        """
+        Valida un bloque recibido en la posición index sobre los saldos indicados y, si es válido,
+        aplica sus transacciones a esos saldos. header_at(h) da las cabeceras de la cadena a la que
+        se incorpora (para el objetivo de dificultad y las reglas de tiempo).
+        """
+        try:
+            transactions = block['transactions']
+            if block['index'] != index:
+                return False, "Índice inesperado."
+            if not valid_target(header_at, index):
+                return False, "Objetivo de dificultad incorrecto."
+            if not valid_timestamp(header_at, index, time()):
+                return False, "Marca de tiempo fuera de rango."
+
+            # Génesis y Coinbase se comparan por tx_hash y no con ==, que daría por iguales 10 y 10.0
+            if index == 1:
+                genesis = {'sender': "SYSTEM", 'recipient': FOUNDER_ADDRESS, 'amount': GENESIS_SUPPLY,
+                           'signature': "SYSTEM_SIGNATURE"}
+                if [tx_hash(tx) for tx in transactions] != [tx_hash(genesis)]:
+                    return False, "Bloque Génesis no reconocido."
+            else:
+                if block['previous_hash'] != previous_hash:
+                    return False, "El bloque no enlaza con el anterior."
+                if block.get('version', 1) >= 2 and block['merkle_root'] != merkle_root(
+                        [tx_hash(tx) for tx in transactions]):
+                    return False, "La raíz de Merkle no corresponde a las transacciones."
+                # El hash cubre b'%d' % nonce: 5.0 o True darían el mismo hash que 5 o 1 (como con los montos)
+                if type(block['nonce']) is not int or block['nonce'] < 0:
+                    return False, "Nonce inválido."
+                if not self._valid_proof(self._hash(block), block_target(block)):
+                    return False, "Prueba de trabajo inválida."
+                if not transactions or tx_hash(transactions[0]) != tx_hash(
+                        self._coinbase_transaction(transactions[0].get('recipient'))):
+                    return False, "Transacción Coinbase inválida."
+
+                transfers = transactions[1:]
+                if not all(self._well_formed_transfer(tx['sender'], tx['amount']) for tx in transfers):
+                    return False, "Transacción malformada."
+                signatures_ok = Keys.verify_many([
+                    (tx['sender'], tx['signature'], self._transaction_digest(tx['sender'], tx['recipient'], tx['amount']))
+                    for tx in transfers
+                ])
+                if not all(signatures_ok):
+                    return False, "Firma de transacción inválida."
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False, "Estructura de bloque inválida."
+
+        # Aplicación secuencial: ningún remitente puede gastar más de su saldo confirmado
+        if not self._apply_transfers(transactions, balances):
+            return False, "Fondos insuficientes en una transacción del bloque."
+        return True, "Bloque válido."
+
+    # ==========================================
+    #        LECTURA PAGINADA DE LA CADENA
+    # ==========================================
+
+    def get_blocks(self, start: int = 0, limit: int = None) -> list:
+        """
+        Retorna los bloques a partir de la posición start (base 0), como máximo limit bloques.
+        """
+        stop = None if limit is None else start + limit
+        return list(self._chain.iter_blocks(start, stop))
+
+    def iter_block_strings(self, start: int = 0, limit: int = None):
+        """
+        Itera el JSON guardado de cada bloque a partir de la posición start, sin construir la lista.
+        Si hay bloques podados en el rango, BlockPrunedError se lanza aquí (antes de empezar a iterar).
+        """
+        if start < self._chain.available_from:
+            raise BlockPrunedError(f"Los bloques anteriores al {self._chain.available_from + 1} están podados.")
+        stop = None if limit is None else start + limit
+        return self._chain.iter_raw(start, stop)
+
+    def find_block_position(self, block_hash: str) -> int:
+        """
+        Posición (base 0) del bloque con el hash indicado, o None si es desconocido.
+        """
+        return self._chain.position_of(block_hash)
+
     # Propiedades para acceso de solo lectura
     @property
     def last_block(self) -> dict:
         return self._chain[-1]
     @property
+    def difficulty(self) -> float:
+        return round(difficulty_of(self._next_target()), 2)
+    @property
+    def height(self) -> int:
+        return len(self._chain)
+    @property
+    def tip_hash(self) -> str:
+        return self._chain.hash_at(-1)
+    @property
+    def pruned_height(self) -> int:
+        return self._chain.pruned_height
+    @property
+    def state_version(self) -> tuple:
+        # (altura, hash de la punta, generación del Mempool): cambia con cada bloque, reorganización
+        # o alta/baja en el Mempool, y con nada más (versión de las vistas derivadas en caché)
+        with self._lock:
+            return len(self._chain), self._chain.hash_at(-1), self._mempool.generation
+    @property
     def chain(self) -> list:
         return list(self._chain)
     @property
     def mempool(self) -> list:
-        return list(self._current_transactions)
+        with self._lock:
+            return list(self._mempool)
+    @property
+    def mempool_with_ids(self) -> list:
+        with self._lock:
+            return [dict(tx, txid=txid) for txid, tx in self._mempool.items()]
+    @property
+    def nodes(self) -> list:
+        return sorted(self._nodes)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+from codec import BlockHeader, decode_block, block_json
+
+# ==========================================
+# CONFIGURACIÓN DEL ALMACÉN DE LA CADENA
+# ==========================================
+# Bloques completos más recientes que se mantienen siempre en memoria
+CHAIN_TAIL_SIZE = int(os.environ.get('CHAIN_TAIL_SIZE', 256))
+# Bloques antiguos consultados recientemente (caché LRU)
+CHAIN_CACHE_SIZE = int(os.environ.get('CHAIN_CACHE_SIZE', 1024))
+# Tamaño de página al recorrer la cadena desde SQLite
+CHAIN_PAGE_SIZE = 500
+
+SQL_SELECT_HEADERS = 'SELECT "index", header_data, hash FROM blocks ORDER BY "index" ASC'
+SQL_SELECT_BLOCK_RANGE = 'SELECT block_data FROM blocks WHERE "index" BETWEEN ? AND ? ORDER BY "index" ASC'
+SQL_SELECT_INDEX_BY_HASH = 'SELECT "index" FROM blocks WHERE hash = ?'
+SQL_SELECT_PRUNED_HEIGHT = 'SELECT pruned_height FROM prune_state WHERE id = 1'
+
+
+class BlockPrunedError(LookupError):
+    """
+    El cuerpo del bloque fue podado (ver pruning.Pruner) y el nodo no guarda archivo de bloques.
+    """
+
+
+def block_header(block: dict) -> dict:
+    """
+    Cabecera de un bloque: todos sus campos excepto la lista de transacciones.
+    """
+    return {key: value for key, value in block.items() if key != 'transactions'}
+
+
+class ChainStore:
+    """
+    Vista perezosa de la cadena respaldada por la tabla 'blocks'.
+    Mantiene en memoria todas las cabeceras (con su hash, como BlockHeader) y una ventana con los últimos bloques;
+    los bloques antiguos se leen de SQLite bajo demanda a través de una caché LRU.
+    Se comporta como una secuencia: len(), índices (también negativos) e iteración paginada.
+    Los bloques de posición < pruned_height están podados: su fila solo conserva cabecera y hash, y el
+    cuerpo se lee del archivo de bloques si lo hay (si no, se lanza BlockPrunedError).
+    Las mutaciones (append, truncate, mark_pruned) se hacen con lock tomado; los lectores lo toman solo para
+    obtener una vista coherente de las cabeceras y de la ventana, nunca durante la lectura de SQLite.
+    """
+
+    def __init__(self, storage, hash_fn, tail_size: int = None, cache_size: int = None, archive=None,
+                 lock=None):
+        self.storage = storage
+        self._hash_fn = hash_fn
+        # Archivo de cuerpos podados (pruning.BlockArchive) o None
+        self.archive = archive
+        # Lock del estado en memoria del propietario (Blockchain._lock) o uno propio
+        self._lock = lock or threading.RLock()
+        self.pruned_height = 0
+        self._headers = []
+        self._tail = deque(maxlen=tail_size or CHAIN_TAIL_SIZE)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size or CHAIN_CACHE_SIZE
+        # Protege la caché LRU (los lectores la reordenan); la generación cambia al podar o truncar, de modo
+        # que un bloque leído antes no se guarda en la caché después
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+
+    def load(self):
+        """
+        Carga las cabeceras y la ventana de bloques recientes.
+        Las filas anteriores a esta versión (sin header_data) se completan una única vez.
+        """
+        self._backfill_headers()
+        rows = self.storage.query(SQL_SELECT_HEADERS)
+        self._headers = [BlockHeader(json.loads(row['header_data']), row['hash']) for row in rows]
+        pruned = self.storage.query(SQL_SELECT_PRUNED_HEIGHT)
+        self.pruned_height = pruned[0]['pruned_height'] if pruned else 0
+        self._tail.clear()
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+        start = max(0, self.pruned_height, len(self._headers) - self._tail.maxlen)
+        self._tail.extend(self.iter_blocks(start))
+
+    def _backfill_headers(self):
+        """
+        Migración: calcula cabecera y hash de los bloques guardados antes de existir esas columnas.
+        """
+        while True:
+            rows = self.storage.query(
+                'SELECT "index", block_data FROM blocks WHERE header_data IS NULL ORDER BY "index" LIMIT ?',
+                (CHAIN_PAGE_SIZE,)
+            )
+            if not rows:
+                return
+            updates = []
+            for row in rows:
+                block = decode_block(row['block_data'])
+                updates.append((json.dumps(block_header(block), sort_keys=True), self._hash_fn(block), row['index']))
+            with self.storage.write() as cursor:
+                cursor.executemany('UPDATE blocks SET header_data = ?, hash = ? WHERE "index" = ?', updates)
+
+    # ==========================================
+    #          INTERFAZ DE SECUENCIA
+    # ==========================================
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def __getitem__(self, position: int) -> dict:
+        with self._lock:
+            if position < 0:
+                position += len(self._headers)
+            if not 0 <= position < len(self._headers):
+                raise IndexError('índice de bloque fuera de rango')
+
+            tail_start = len(self._headers) - len(self._tail)
+            if position >= tail_start:
+                return self._tail[position - tail_start]
+
+        with self._cache_lock:
+            block = self._cache.get(position)
+            if block is not None:
+                self._cache.move_to_end(position)
+                return block
+            generation = self._cache_generation
+
+        block = decode_block(next(self._bodies(position, position + 1)))
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self._cache[position] = block
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return block
+
+    def __iter__(self):
+        return self.iter_blocks()
+
+    def iter_blocks(self, start: int = 0, stop: int = None):
+        """
+        Recorre los bloques [start, stop) leyendo de SQLite por páginas, sin cargar la cadena entera.
+        Los recorridos no alteran la caché LRU. La ventana se copia al empezar: los bloques que el escritor
+        añada durante el recorrido no desplazan las posiciones.
+        """
+        with self._lock:
+            length = len(self._headers)
+            tail = list(self._tail)
+        stop = length if stop is None else min(stop, length)
+        tail_start = length - len(tail)
+        position = start
+        while position < stop:
+            if position >= tail_start:
+                yield tail[position - tail_start]
+                position += 1
+                continue
+            page_stop = min(stop, tail_start, position + CHAIN_PAGE_SIZE)
+            for block_data in self._bodies(position, page_stop):
+                yield decode_block(block_data)
+            position = page_stop
+
+    def iter_raw(self, start: int = 0, stop: int = None):
+        """
+        Recorre los bloques [start, stop) como texto JSON; las filas guardadas en JSON se devuelven
+        tal cual, sin decodificarlas. Pensado para respuestas en streaming.
+        """
+        stop = len(self._headers) if stop is None else min(stop, len(self._headers))
+        for page_start in range(start, stop, CHAIN_PAGE_SIZE):
+            page_stop = min(stop, page_start + CHAIN_PAGE_SIZE)
+            for block_data in self._bodies(page_start, page_stop):
+                yield block_json(block_data)
+
+    def _bodies(self, start: int, stop: int):
+        """
+        block_data guardado de las posiciones [start, stop): de SQLite o, si están podadas, del archivo.
+        Una fila vacía (podada mientras se leía) también se busca en el archivo.
+        """
+        pruned_stop = min(stop, self.pruned_height)
+        if start < pruned_stop:
+            yield from self._archived(start, pruned_stop)
+            start = pruned_stop
+        for page_start in range(start, stop, CHAIN_PAGE_SIZE):
+            page_stop = min(stop, page_start + CHAIN_PAGE_SIZE)
+            rows = self.storage.query(SQL_SELECT_BLOCK_RANGE, (page_start + 1, page_stop))
+            for position, row in enumerate(rows, start=page_start):
+                yield row['block_data'] or self._archived(position, position + 1)[0]
+
+    def _archived(self, start: int, stop: int) -> list:
+        if self.archive is None:
+            raise BlockPrunedError(f"Bloques {start + 1}-{stop} podados: el nodo solo conserva sus cabeceras.")
+        return self.archive.bodies(start + 1, stop)
+
+    @property
+    def available_from(self) -> int:
+        """
+        Primera posición cuyo cuerpo puede leerse (0 salvo en un nodo podado sin archivo).
+        """
+        return 0 if self.archive is not None else self.pruned_height
+
+    def position_of(self, block_hash: str) -> int:
+        """
+        Posición (base 0) del bloque con el hash indicado, o None si no pertenece a la cadena.
+        """
+        rows = self.storage.query(SQL_SELECT_INDEX_BY_HASH, (block_hash,))
+        return rows[0]['index'] - 1 if rows else None
+
+    def append(self, block: dict, block_hash: str):
+        """
+        Añade a la vista un bloque ya persistido.
+        """
+        self._headers.append(BlockHeader(block_header(block), block_hash))
+        self._tail.append(block)
+
+    def mark_pruned(self, height: int):
+        """
+        Registra que los cuerpos de las posiciones < height se podaron (las filas ya deben estar actualizadas)
+        y los retira de la ventana de bloques recientes y de la caché.
+        """
+        self.pruned_height = height
+        tail_start = len(self._headers) - len(self._tail)
+        for _ in range(max(0, min(height, len(self._headers)) - tail_start)):
+            self._tail.popleft()
+        with self._cache_lock:
+            for position in [position for position in self._cache if position < height]:
+                del self._cache[position]
+            self._cache_generation += 1
+
+    def truncate(self, length: int):
+        """
+        Descarta de la vista los bloques de posición >= length (las filas ya deben haberse borrado de la BD).
+        La ventana de bloques recientes se rellena con los bloques anteriores leídos de SQLite.
+        """
+        if length >= len(self._headers):
+            return
+        tail_start = len(self._headers) - len(self._tail)
+        kept = list(self._tail)[:max(0, length - tail_start)]
+        del self._headers[length:]
+
+        refill_start = max(0, self.pruned_height, length - self._tail.maxlen)
+        self._tail.clear()
+        self._tail.extend(self.iter_blocks(refill_start, length - len(kept)))
+        self._tail.extend(kept)
+        with self._cache_lock:
+            for position in [position for position in self._cache if position >= length]:
+                del self._cache[position]
+            self._cache_generation += 1
+
+    # ==========================================
+    #            ACCESO A CABECERAS
+    # ==========================================
+
+    def header(self, position: int) -> dict:
+        return self._headers[position].to_dict()
+
+    def hash_at(self, position: int) -> str:
+        return self._headers[position].block_hash
+
+    @property
+    def headers(self) -> list:
+        return [header.to_dict() for header in self._headers]
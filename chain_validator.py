@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+from merkle import tx_hash, merkle_root
+from codec import decode_block
+from retarget import block_target, meets_target, valid_target
+from storage import read_only_uri
+
+# ==========================================
+# CONFIGURACIÓN DE LA VALIDACIÓN DE LA CADENA
+# ==========================================
+# Procesos usados en la auditoría completa (full=true)
+VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS', os.cpu_count() or 1))
+# Bloques que valida cada tarea del pool; cada proceso los lee directamente de SQLite
+VALIDATION_CHUNK_SIZE = int(os.environ.get('VALIDATION_CHUNK_SIZE', 5000))
+
+SQL_SELECT_BLOCKS_FOR_VALIDATION = (
+    'SELECT "index", block_data, hash FROM blocks WHERE "index" BETWEEN ? AND ? ORDER BY "index" ASC'
+)
+SQL_SELECT_CHECKPOINTS = 'SELECT height, hash FROM checkpoints ORDER BY height DESC'
+SQL_INSERT_CHECKPOINT = 'INSERT OR REPLACE INTO checkpoints (height, hash, verified_at) VALUES (?, ?, ?)'
+SQL_DELETE_CHECKPOINTS_FROM = 'DELETE FROM checkpoints WHERE height >= ?'
+
+# Pools de procesos por número de trabajadores, creados la primera vez que se necesitan
+_validation_pools = {}
+# Conexión de solo lectura de cada proceso del pool (una por URI de BD)
+_worker_connections = {}
+
+
+def _check_blocks(rows, previous_hash: str, hash_fn, target_fn) -> tuple:
+    """
+    Valida bloques consecutivos dados como filas (index, block_data, hash).
+    Cada hash se calcula una sola vez y se arrastra como previous_hash del bloque siguiente.
+    Si previous_hash es None no se comprueba el enlace del primer bloque (lo hace quien reparte los fragmentos).
+    La prueba de trabajo se comprueba contra target_fn(bloque); que el objetivo declarado sea el correcto
+    se verifica aparte sobre las cabeceras (ChainValidator._check_targets).
+
+    Retorna:
+        tuple: (índice del primer bloque inválido o None, previous_hash del primer bloque, hash del último).
+    """
+    first_previous_hash = None
+    for position, (index, block_data, stored_hash) in enumerate(rows):
+        block = decode_block(block_data)
+        block_hash = hash_fn(block)
+        if position == 0:
+            first_previous_hash = block['previous_hash']
+
+        # El hash indexado en la tabla debe corresponder al contenido del bloque
+        if stored_hash is not None and stored_hash != block_hash:
+            return index, first_previous_hash, block_hash
+
+        # El Génesis no tiene enlace ni prueba de trabajo
+        if index > 1:
+            if previous_hash is not None and block['previous_hash'] != previous_hash:
+                return index, first_previous_hash, block_hash
+            if block.get('version', 1) >= 2 and block['merkle_root'] != merkle_root(
+                    [tx_hash(tx) for tx in block['transactions']]):
+                return index, first_previous_hash, block_hash
+            # Nonce entero exacto: 5.0 o True darían el mismo hash que 5 o 1
+            if type(block['nonce']) is not int or block['nonce'] < 0:
+                return index, first_previous_hash, block_hash
+            if not meets_target(block_hash, target_fn(block)):
+                return index, first_previous_hash, block_hash
+
+        previous_hash = block_hash
+    return None, first_previous_hash, previous_hash
+
+
+def _validate_chunk(task: tuple) -> tuple:
+    """
+    Valida en un proceso del pool los bloques [first_index, last_index] leyéndolos de la BD.
+    """
+    uri, first_index, last_index, hash_fn, target_fn = task
+    conn = _worker_connections.get(uri)
+    if conn is None:
+        conn = _worker_connections[uri] = sqlite3.connect(uri, uri=True)
+    rows = conn.execute(SQL_SELECT_BLOCKS_FOR_VALIDATION, (first_index, last_index))
+    return _check_blocks(rows, None, hash_fn, target_fn)
+
+
+class ChainValidator:
+    """
+    Validador incremental de la cadena.
+    Guarda en la tabla 'checkpoints' la altura y el hash hasta donde la cadena ya fue verificada;
+    las validaciones siguientes solo revisan los bloques por encima del último punto de control.
+    La auditoría completa reparte la cadena por fragmentos entre un pool de procesos.
+    """
+
+    def __init__(self, storage, chain, hash_fn, target_fn=block_target, workers: int = None, chunk_size: int = None):
+        self.storage = storage
+        self._chain = chain
+        self._hash_fn = hash_fn
+        # Objetivo de la prueba de trabajo de cada bloque (función de módulo: viaja a los procesos del pool)
+        self._target_fn = target_fn
+        self.workers = workers or VALIDATION_WORKERS
+        self.chunk_size = chunk_size or VALIDATION_CHUNK_SIZE
+
+    def last_checkpoint(self) -> tuple:
+        """
+        Último punto de control que sigue perteneciendo a la cadena actual, como (altura, hash),
+        o (0, None) si no hay ninguno. Los puntos de control de una rama abandonada se descartan.
+        """
+        for row in self.storage.query(SQL_SELECT_CHECKPOINTS):
+            height = row['height']
+            if height <= len(self._chain) and self._chain.hash_at(height - 1) == row['hash']:
+                return height, row['hash']
+            self.discard_from(height)
+        return 0, None
+
+    def discard_from(self, height: int):
+        """
+        Elimina los puntos de control de altura >= height (p. ej. tras reemplazar la cadena).
+        """
+        with self.storage.write() as cursor:
+            cursor.execute(SQL_DELETE_CHECKPOINTS_FROM, (height,))
+
+    def validate(self, full: bool = False) -> tuple[bool, dict]:
+        """
+        Valida la cadena hasta la punta actual y, si es válida, registra un nuevo punto de control.
+
+        Parámetros:
+            full (bool): Si es True, ignora los puntos de control y audita la cadena completa en paralelo.
+
+        Retorna:
+            tuple[bool, dict]: (validez, informe con 'height', 'from_height', 'checked' e 'invalid_index';
+            en un nodo podado también 'pruned_height').
+        """
+        height = len(self._chain)
+        start, previous_hash = (0, None) if full else self.last_checkpoint()
+        report = {'height': height, 'from_height': start, 'checked': height - start,
+                  'full': full, 'invalid_index': None}
+        if start >= height:
+            return True, report
+
+        invalid_index = self._check_targets(start, height)
+        # Los cuerpos podados ya se validaron antes de podarlos: se revisan los enlaces desde la altura podada
+        pruned_height = self._chain.pruned_height
+        if start < pruned_height:
+            start, previous_hash = pruned_height, self._chain.hash_at(pruned_height - 1)
+            report.update(pruned_height=pruned_height, checked=height - start)
+        if invalid_index is None:
+            if full and self.workers > 1 and height - start > self.chunk_size and self.storage.path != ':memory:':
+                invalid_index = self._validate_parallel(start, height, previous_hash)
+            else:
+                invalid_index = self._validate_inline(start, height, previous_hash)
+
+        report['invalid_index'] = invalid_index
+        if invalid_index is not None:
+            return False, report
+
+        with self.storage.write() as cursor:
+            cursor.execute(SQL_INSERT_CHECKPOINT, (height, self._chain.hash_at(height - 1), time()))
+        return True, report
+
+    def _check_targets(self, start: int, stop: int):
+        """
+        Comprueba sobre las cabeceras en memoria que cada bloque de [start, stop) declare el objetivo
+        que dicta el reajuste de dificultad. Retorna el índice del primer bloque incorrecto o None.
+        """
+        def header_at(height):
+            return self._chain.header(height - 1)
+
+        for position in range(start, stop):
+            if not valid_target(header_at, position + 1):
+                return position + 1
+        return None
+
+    def _validate_inline(self, start: int, stop: int, previous_hash: str):
+        """
+        Valida en el hilo actual las posiciones [start, stop), página a página.
+        Retorna el índice del primer bloque inválido o None.
+        """
+        for page_start in range(start, stop, self.chunk_size):
+            page_stop = min(stop, page_start + self.chunk_size)
+            rows = self.storage.query(SQL_SELECT_BLOCKS_FOR_VALIDATION, (page_start + 1, page_stop))
+            invalid_index, _, previous_hash = _check_blocks(rows, previous_hash, self._hash_fn, self._target_fn)
+            if invalid_index is not None:
+                return invalid_index
+        return None
+
+    def _validate_parallel(self, start: int, stop: int, previous_hash: str = None):
+        """
+        Reparte las posiciones [start, stop) en fragmentos entre los procesos del pool.
+        Cada proceso verifica sus enlaces internos; aquí se comprueban las uniones entre fragmentos.
+        Retorna el índice del primer bloque inválido o None.
+        """
+        pool = _validation_pools.get(self.workers)
+        if pool is None:
+            pool = _validation_pools[self.workers] = ProcessPoolExecutor(max_workers=self.workers)
+
+        # La URI se construye aquí: la ruta queda resuelta con el directorio de trabajo de este proceso
+        uri = read_only_uri(self.storage.path)
+        tasks = [
+            (uri, first + 1, min(stop, first + self.chunk_size), self._hash_fn, self._target_fn)
+            for first in range(start, stop, self.chunk_size)
+        ]
+        for task, (invalid_index, first_previous_hash, last_hash) in zip(tasks, pool.map(_validate_chunk, tasks)):
+            if invalid_index is not None:
+                return invalid_index
+            if previous_hash is not None and first_previous_hash != previous_hash:
+                return task[1]
+            previous_hash = last_hash
+        return None
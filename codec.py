@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import re
+import struct
+
+# ==========================================
+# CODIFICACIÓN COMPACTA DE BLOQUES
+# ==========================================
+# Formato con el que se guardan los bloques nuevos en 'blocks.block_data':
+#   'json'    -> texto JSON (formato original)
+#   'compact' -> binario etiquetado: claves y cadenas hexadecimales (llaves públicas, firmas,
+#                hashes) como bytes crudos; aprox. un tercio del tamaño del JSON
+# Las filas se decodifican según su tipo (TEXT o BLOB), así que ambos formatos conviven en la misma BD.
+BLOCK_ENCODING = os.environ.get('BLOCK_ENCODING', 'json')
+
+COMPACT_MAGIC = b'CB\x01'
+
+# Etiquetas de tipo del formato compacto
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _HEX, _LIST, _DICT, _COMMON = range(10)
+# Claves y cadenas frecuentes, codificadas con un único byte (el orden es parte del formato: solo añadir al final)
+_COMMON_KEYS = ('amount', 'index', 'merkle_root', 'nonce', 'previous_hash', 'recipient', 'sender',
+                'signature', 'timestamp', 'transactions', 'version', 'target')
+_COMMON_STRINGS = ('SYSTEM', 'SYSTEM_SIGNATURE')
+_KEY_CODES = {key: code for code, key in enumerate(_COMMON_KEYS, start=1)}
+_STRING_CODES = {value: code for code, value in enumerate(_COMMON_STRINGS)}
+_HEX_RE = re.compile(r'(?:[0-9a-f]{2})+')
+_DOUBLE = struct.Struct('>d')
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_str(out: bytearray, value: str):
+    raw = value.encode()
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _encode_value(out: bytearray, value):
+    # bool antes que int: en Python True/False también son int
+    if value is None:
+        out.append(_NONE)
+    elif value is True or value is False:
+        out.append(_TRUE if value else _FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        code = _STRING_CODES.get(value)
+        if code is not None:
+            out.append(_COMMON)
+            out.append(code)
+        elif _HEX_RE.fullmatch(value):
+            # Solo hexadecimal en minúsculas y de longitud par: bytes.hex() lo reproduce exactamente
+            raw = bytes.fromhex(value)
+            out.append(_HEX)
+            _write_varint(out, len(raw))
+            out += raw
+        else:
+            out.append(_STR)
+            _write_str(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_value(out, item)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            code = _KEY_CODES.get(key)
+            if code is None:
+                out.append(0)
+                _write_str(out, key)
+            else:
+                out.append(code)
+            _encode_value(out, item)
+    else:
+        raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode_value(data: bytes, offset: int):
+    tag = data[offset]
+    offset += 1
+    if tag == _HEX:
+        length, offset = _read_varint(data, offset)
+        return data[offset:offset + length].hex(), offset + length
+    if tag == _INT:
+        value, offset = _read_varint(data, offset)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+    if tag == _DICT:
+        count, offset = _read_varint(data, offset)
+        result = {}
+        for _ in range(count):
+            code = data[offset]
+            offset += 1
+            if code:
+                key = _COMMON_KEYS[code - 1]
+            else:
+                length, offset = _read_varint(data, offset)
+                key = data[offset:offset + length].decode()
+                offset += length
+            result[key], offset = _decode_value(data, offset)
+        return result, offset
+    if tag == _LIST:
+        count, offset = _read_varint(data, offset)
+        result = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            result.append(item)
+        return result, offset
+    if tag == _COMMON:
+        return _COMMON_STRINGS[data[offset]], offset + 1
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, offset)[0], offset + 8
+    if tag == _STR:
+        length, offset = _read_varint(data, offset)
+        return data[offset:offset + length].decode(), offset + length
+    if tag == _NONE:
+        return None, offset
+    if tag in (_TRUE, _FALSE):
+        return tag == _TRUE, offset
+    raise ValueError(f"Etiqueta desconocida en bloque compacto: {tag}")
+
+
+def encode_compact(block: dict) -> bytes:
+    """
+    Serializa un bloque al formato compacto. La decodificación reproduce exactamente el mismo dict
+    (mismos tipos y orden de claves), por lo que el hash del bloque no cambia.
+    """
+    out = bytearray(COMPACT_MAGIC)
+    _encode_value(out, block)
+    return bytes(out)
+
+
+def decode_compact(data: bytes) -> dict:
+    if data[:len(COMPACT_MAGIC)] != COMPACT_MAGIC:
+        raise ValueError("Bloque compacto sin cabecera reconocida.")
+    return _decode_value(data, len(COMPACT_MAGIC))[0]
+
+
+def encode_block(block: dict, encoding: str = None):
+    """
+    Valor de la columna 'blocks.block_data' para un bloque según BLOCK_ENCODING:
+    texto JSON (str) o formato compacto (bytes, guardado como BLOB).
+    """
+    if (encoding or BLOCK_ENCODING) == 'compact':
+        return encode_compact(block)
+    return json.dumps(block, sort_keys=True)
+
+
+def decode_block(block_data) -> dict:
+    """
+    Decodifica una fila de 'blocks.block_data' en cualquiera de los dos formatos.
+    """
+    if isinstance(block_data, (bytes, memoryview)):
+        return decode_compact(bytes(block_data))
+    return json.loads(block_data)
+
+
+def block_json(block_data) -> str:
+    """
+    Texto JSON de una fila de 'blocks.block_data' (las filas JSON se devuelven tal cual, sin decodificar).
+    """
+    if isinstance(block_data, str):
+        return block_data
+    return json.dumps(decode_block(block_data), sort_keys=True)
+
+
+# ==========================================
+# CABECERAS EN MEMORIA
+# ==========================================
+# Solo las cabeceras usan una clase con __slots__: son lo único que se mantiene en memoria para toda la
+# cadena. Los bloques y transacciones siguen siendo dict: ChainStore solo guarda los recientes (cola y
+# caché LRU), y el resto del nodo los usa directamente como JSON (hashes, firmas, API, gossip y BD).
+
+class BlockHeader:
+    """
+    Cabecera de un bloque con su hash, tal como la mantiene ChainStore para toda la cadena.
+    Usa __slots__ y guarda los hashes como bytes (32 bytes frente a un str de 64 caracteres),
+    lo que reduce a menos de la mitad la memoria del índice de cabeceras. Los campos que el bloque
+    no tiene (p. ej. 'version' y 'merkle_root' en bloques v1) quedan sin asignar; los campos
+    desconocidos se conservan en 'extra'.
+    """
+    __slots__ = ('version', 'index', 'timestamp', 'nonce', 'previous_hash', 'merkle_root', 'target', 'hash', 'extra')
+    FIELDS = ('version', 'index', 'timestamp', 'nonce', 'previous_hash', 'merkle_root', 'target')
+    HEX_FIELDS = ('previous_hash', 'merkle_root', 'target', 'hash')
+
+    def __init__(self, header: dict, block_hash: str):
+        extra = None
+        for key, value in header.items():
+            if key in self.FIELDS:
+                setattr(self, key, _pack_hex(value) if key in self.HEX_FIELDS else value)
+            else:
+                extra = extra or {}
+                extra[key] = value
+        self.extra = extra
+        self.hash = _pack_hex(block_hash)
+
+    @property
+    def block_hash(self) -> str:
+        return _unpack_hex(self.hash)
+
+    def to_dict(self) -> dict:
+        header = {}
+        for key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                header[key] = _unpack_hex(value) if key in self.HEX_FIELDS else value
+        if self.extra:
+            header.update(self.extra)
+        return header
+
+
+_MISSING = object()
+
+
+def _pack_hex(value):
+    return bytes.fromhex(value) if isinstance(value, str) and _HEX_RE.fullmatch(value) else value
+
+
+def _unpack_hex(value):
+    return value.hex() if isinstance(value, bytes) else value
@@ -1,14 +1,127 @@
 # -*- coding: utf-8 -*-
 import ecdsa
+import ecdsa.der
+import ecdsa.ellipticcurve
 import ecdsa.util
 import hashlib
 import binascii
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuración de la curva elíptica y el algoritmo de hash
 # Se utiliza la curva SECP256k1 (la misma que Bitcoin) y SHA-256
 CURVE = ecdsa.SECP256k1
 HASH_ALGORITHM = hashlib.sha256
 
+# Verificación por lotes: procesos del pool y tamaño mínimo de lote para no verificar en línea
+VERIFY_WORKERS = int(os.environ.get('VERIFY_WORKERS', os.cpu_count() or 1))
+PARALLEL_VERIFY_THRESHOLD = 64
+
+# Pools de procesos por número de trabajadores, creados la primera vez que se necesitan
+_verify_pools = {}
+
+
+# Número máximo de llaves decodificadas que se conservan en cada caché
+KEY_CACHE_SIZE = int(os.environ.get('KEY_CACHE_SIZE', 4096))
+# Usos de una llave pública a partir de los cuales se precalcula su tabla de puntos.
+# La precomputación cuesta unas pocas verificaciones, así que solo compensa para remitentes recurrentes.
+PRECOMPUTE_AFTER_USES = int(os.environ.get('PRECOMPUTE_AFTER_USES', 4))
+
+
+def _verify_chunk(chunk: list) -> list:
+    """
+    Verifica en un proceso del pool un fragmento de tuplas (llave_publica, firma, hash).
+    """
+    return [Keys.verify_signature(*item) for item in chunk]
+
+
+class KeyCache:
+    """
+    Caché LRU acotada de objetos de llave ecdsa, indexada por la llave en hexadecimal.
+    Evita decodificar el hex y reconstruir el punto de la curva en cada firma o verificación.
+    Opcionalmente "promociona" una llave (p. ej. precalculando su tabla) tras cierto número de usos.
+    """
+
+    def __init__(self, factory, max_size: int = None, promote=None, promote_after: int = 0):
+        self._factory = factory
+        self._promote = promote
+        self._promote_after = promote_after
+        self.max_size = max_size or KEY_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_hex: str):
+        """
+        Retorna el objeto de llave para key_hex, construyéndolo si no está en caché.
+        Los errores de formato se propagan y la llave inválida no se almacena.
+        """
+        with self._lock:
+            entry = self._entries.get(key_hex)
+            if entry is not None:
+                self._entries.move_to_end(key_hex)
+                self.hits += 1
+                entry[1] += 1
+                promote = self._promote is not None and entry[1] == self._promote_after
+            else:
+                self.misses += 1
+
+        if entry is not None:
+            if promote:
+                self._promote(entry[0])
+            return entry[0]
+
+        key = self._factory(key_hex)
+        with self._lock:
+            self._entries[key_hex] = [key, 1]
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return key
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _load_verifying_key(public_key_hex: str) -> ecdsa.VerifyingKey:
+    return ecdsa.VerifyingKey.from_string(binascii.unhexlify(public_key_hex), curve=CURVE)
+
+
+def _precompute_verifying_key(public_key: ecdsa.VerifyingKey):
+    """
+    Precalcula la tabla de multiplicación del punto de una llave pública recurrente.
+    VerifyingKey.precompute() falla con puntos decodificados por from_string (no conservan el orden
+    de la curva), por lo que el punto se reconstruye explícitamente con el orden de CURVE.
+    """
+    point = public_key.pubkey.point
+    precomputed = ecdsa.ellipticcurve.PointJacobi(CURVE.curve, point.x(), point.y(), 1, CURVE.order, generator=True)
+    precomputed * 2  # fuerza el cálculo de la tabla antes de publicar el punto
+    public_key.pubkey.point = precomputed
+
+
+def _load_signing_key(private_key_hex: str) -> ecdsa.SigningKey:
+    return ecdsa.SigningKey.from_string(binascii.unhexlify(private_key_hex), curve=CURVE)
+
+
+VERIFYING_KEY_CACHE = KeyCache(_load_verifying_key, promote=_precompute_verifying_key,
+                               promote_after=PRECOMPUTE_AFTER_USES)
+SIGNING_KEY_CACHE = KeyCache(_load_signing_key)
+
 class Keys:
     """
     Clase utilitaria para la gestión de criptografía de curva elíptica (ECDSA).
@@ -46,8 +159,7 @@ class Keys:
         Retorna:
             str: La firma digital en formato hexadecimal (codificación DER).
         """
-        private_key_bytes = binascii.unhexlify(private_key_hex)
-        private_key = ecdsa.SigningKey.from_string(private_key_bytes, curve=CURVE)
+        private_key = SIGNING_KEY_CACHE.get(private_key_hex)
         
         message_bytes = message.encode('utf-8')
         # Se aplica hash SHA-256 al mensaje antes de la firma (estándar de seguridad)
@@ -70,8 +182,7 @@ class Keys:
             bool: True si la firma es válida y corresponde a la llave pública, False en caso contrario.
         """
         try:
-            public_key_bytes = binascii.unhexlify(public_key_hex)
-            public_key = ecdsa.VerifyingKey.from_string(public_key_bytes, curve=CURVE)
+            public_key = VERIFYING_KEY_CACHE.get(public_key_hex)
             
             signature_bytes = binascii.unhexlify(signature_hex)
             message_hash = binascii.unhexlify(message_hash_hex)
@@ -83,8 +194,11 @@ class Keys:
                 sigdecode=ecdsa.util.sigdecode_der
             )
             
-        except (ecdsa.BadSignatureError, binascii.Error, ValueError):
-            # Captura errores de formato o firmas inválidas sin romper la ejecución
+        except (ecdsa.BadSignatureError, ecdsa.MalformedPointError, ecdsa.der.UnexpectedDER, AssertionError,
+                binascii.Error, ValueError, TypeError):
+            # Captura errores de formato o firmas inválidas sin romper la ejecución: llaves hex que no son
+            # un punto de la curva (MalformedPointError deriva de AssertionError), firmas que no son DER
+            # o valores que no son texto
             return False
 
     @staticmethod
@@ -101,8 +215,7 @@ class Keys:
             str: La firma digital en formato hexadecimal, o cadena vacía en caso de error.
         """
         try:
-            private_key_bytes = binascii.unhexlify(private_key_hex)
-            private_key = ecdsa.SigningKey.from_string(private_key_bytes, curve=CURVE)
+            private_key = SIGNING_KEY_CACHE.get(private_key_hex)
             message_hash = binascii.unhexlify(digest_hex)
             
             # Firma del digest utilizando codificación DER para la salida
@@ -115,3 +228,42 @@ class Keys:
             
         except (binascii.Error, ValueError):
             return ""
+
+    @staticmethod
+    def key_cache_stats() -> dict:
+        """
+        Retorna los contadores de aciertos/fallos de las cachés de llaves de este proceso.
+        """
+        return {
+            'verifying_keys': VERIFYING_KEY_CACHE.stats(),
+            'signing_keys': SIGNING_KEY_CACHE.stats(),
+        }
+
+    @staticmethod
+    def verify_many(items: list, workers: int = None) -> list:
+        """
+        Verifica un lote de firmas repartiéndolo entre los procesos del pool.
+        Los lotes pequeños (o con un solo proceso) se verifican en el hilo actual.
+        
+        Parámetros:
+            items (list): Tuplas (public_key_hex, signature_hex, message_hash_hex).
+            workers (int): Número de procesos (por defecto VERIFY_WORKERS).
+            
+        Retorna:
+            list[bool]: El resultado de cada verificación, en el mismo orden que items.
+        """
+        workers = workers or VERIFY_WORKERS
+        if workers <= 1 or len(items) < PARALLEL_VERIFY_THRESHOLD:
+            return _verify_chunk(items)
+
+        pool = _verify_pools.get(workers)
+        if pool is None:
+            pool = _verify_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+
+        # Varios fragmentos por proceso para equilibrar la carga
+        chunk_size = max(1, len(items) // (workers * 4))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = []
+        for chunk_results in pool.map(_verify_chunk, chunks):
+            results.extend(chunk_results)
+        return results
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import heapq
+import os
+from collections import OrderedDict
+from itertools import islice
+
+from merkle import tx_hash
+
+# ==========================================
+# CONFIGURACIÓN DEL MEMPOOL
+# ==========================================
+# Máximo de transacciones pendientes; al superarlo se desalojan las más antiguas
+MEMPOOL_MAX_SIZE = int(os.environ.get('MEMPOOL_MAX_SIZE', 100000))
+# Segundos que una transacción puede esperar en el mempool antes de expirar (según su 'timestamp')
+MEMPOOL_TX_TTL = int(os.environ.get('MEMPOOL_TX_TTL', 24 * 3600))
+# Máximo de transacciones del mempool incluidas en un bloque (además de la Coinbase)
+MAX_TXS_PER_BLOCK = int(os.environ.get('MAX_TXS_PER_BLOCK', 500))
+
+
+class Mempool:
+    """
+    Conjunto de transacciones pendientes indexado por id de fila (orden de llegada), por remitente
+    y por hash de transacción.
+    Mantiene el total de débitos pendientes por remitente para que el saldo en tiempo real sea O(1),
+    y un montículo por (timestamp, row_id) para la expiración: el orden de llegada no es el de los
+    timestamps (las difundidas y las readmitidas tras una reorganización conservan el original).
+    La selección para un bloque sigue el orden de llegada: las transacciones no llevan comisión
+    firmada, y ese orden garantiza que los gastos de un mismo remitente se incluyan en secuencia.
+    """
+
+    def __init__(self, max_size: int = None, ttl: int = None):
+        self.max_size = max_size or MEMPOOL_MAX_SIZE
+        self.ttl = ttl or MEMPOOL_TX_TTL
+        self._entries = OrderedDict()
+        self._by_sender = {}
+        self._by_hash = {}
+        self._hash_of = {}
+        self._pending_debits = {}
+        # Montículo (timestamp, row_id); las filas retiradas se descartan al llegar a la cima o al compactar
+        self._expiry = []
+        # Contador que cambia con cada alta o baja (útil para invalidar vistas derivadas)
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def items(self):
+        """
+        Pares (hash de transacción, tx) en orden de llegada.
+        """
+        return ((self._hash_of[row_id], tx) for row_id, tx in self._entries.items())
+
+    def add(self, row_id: int, tx: dict):
+        """
+        Añade una transacción ya persistida con el id de su fila en la tabla 'mempool'.
+        """
+        self._entries[row_id] = tx
+        transaction_hash = tx_hash(tx)
+        self._by_hash[transaction_hash] = row_id
+        self._hash_of[row_id] = transaction_hash
+        self._by_sender.setdefault(tx['sender'], OrderedDict())[row_id] = None
+        self._pending_debits[tx['sender']] = self._pending_debits.get(tx['sender'], 0) + int(tx['amount'])
+        if 'timestamp' in tx:
+            heapq.heappush(self._expiry, (tx['timestamp'], row_id))
+        self.generation += 1
+
+    def remove(self, row_ids) -> list:
+        """
+        Retira las transacciones indicadas (las que ya no estén se ignoran).
+        Retorna las transacciones efectivamente retiradas.
+        """
+        removed = []
+        for row_id in row_ids:
+            tx = self._entries.pop(row_id, None)
+            if tx is None:
+                continue
+            self._by_hash.pop(self._hash_of.pop(row_id), None)
+            sender = tx['sender']
+            sender_ids = self._by_sender[sender]
+            del sender_ids[row_id]
+            if not sender_ids:
+                del self._by_sender[sender]
+            remaining = self._pending_debits[sender] - int(tx['amount'])
+            if remaining:
+                self._pending_debits[sender] = remaining
+            else:
+                del self._pending_debits[sender]
+            removed.append(tx)
+        if removed:
+            self.generation += 1
+            if len(self._expiry) > 2 * len(self._entries) + 1024:
+                self._expiry = [(tx['timestamp'], row_id) for row_id, tx in self._entries.items()
+                                if 'timestamp' in tx]
+                heapq.heapify(self._expiry)
+        return removed
+
+    def select(self, limit: int = None) -> list:
+        """
+        Elige las transacciones del próximo bloque por orden de llegada, como pares (row_id, tx).
+        El coste es proporcional al límite, no al tamaño del mempool.
+        """
+        limit = MAX_TXS_PER_BLOCK if limit is None else limit
+        return list(islice(self._entries.items(), limit))
+
+    def pending_debit(self, sender: str) -> int:
+        return self._pending_debits.get(sender, 0)
+
+    def sender_row_ids(self, sender: str) -> list:
+        """
+        Ids de las transacciones pendientes de un remitente, de la más antigua a la más reciente.
+        """
+        return list(self._by_sender.get(sender, ()))
+
+    def row_id_of(self, transaction_hash: str) -> int:
+        """
+        Id de la fila de la transacción con ese hash (merkle.tx_hash), o None si no está pendiente.
+        """
+        return self._by_hash.get(transaction_hash)
+
+    def get(self, row_id: int) -> dict:
+        return self._entries.get(row_id)
+
+    def senders(self):
+        return self._pending_debits.keys()
+
+    def expired_row_ids(self, now: float) -> list:
+        """
+        Ids de las transacciones cuyo 'timestamp' superó el TTL, de la más antigua a la más reciente,
+        sin importar su posición en el orden de llegada.
+        Recorre solo la parte del montículo por debajo del plazo (coste proporcional a las expiradas).
+        """
+        heap = self._expiry
+        while heap and heap[0][1] not in self._entries:
+            heapq.heappop(heap)
+        deadline = now - self.ttl
+        expired = []
+        # Recorrido en orden del subárbol de entradas con timestamp < deadline, sin modificar el montículo
+        frontier = [(heap[0], 0)] if heap and heap[0][0] < deadline else []
+        while frontier:
+            (_, row_id), position = heapq.heappop(frontier)
+            if row_id in self._entries:
+                expired.append(row_id)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap) and heap[child][0] < deadline:
+                    heapq.heappush(frontier, (heap[child], child))
+        return expired
+
+    def overflow_row_ids(self, incoming: int = 1) -> list:
+        """
+        Ids de las transacciones más antiguas que hay que desalojar para admitir 'incoming' nuevas.
+        """
+        excess = len(self._entries) + incoming - self.max_size
+        if excess <= 0:
+            return []
+        return list(islice(self._entries, excess))
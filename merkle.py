@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+
+def tx_hash(tx: dict) -> str:
+    """
+    Identificador (hash SHA-256) de una transacción.
+    Se serializa con claves ordenadas para que el resultado sea determinista.
+    """
+    tx_string = json.dumps(tx, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(tx_string).hexdigest()
+
+
+def _hash_pair(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(left + right).digest()
+
+
+def merkle_root(tx_hashes: list) -> str:
+    """
+    Calcula la raíz de Merkle de una lista de hashes de transacciones (hex).
+    Si un nivel tiene un número impar de nodos, el último se duplica (como en Bitcoin).
+    """
+    if not tx_hashes:
+        return '0' * 64
+
+    level = [bytes.fromhex(h) for h in tx_hashes]
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+# ==========================================
+# CABECERAS Y PRUEBAS DE INCLUSIÓN
+# ==========================================
+# Campos de la cabecera cubiertos por el hash del bloque (sin el nonce, que se añade al final).
+# v2: hash sobre la cabecera; v3 añade el objetivo de la prueba de trabajo. Los bloques v1 se
+# hashean sobre el JSON completo (con las transacciones) y no admiten pruebas de inclusión.
+HEADER_FIELDS = ('version', 'index', 'timestamp', 'previous_hash', 'merkle_root', 'target')
+HEADER_FIELDS_V2 = HEADER_FIELDS[:-1]
+
+
+def header_prefix(header: dict) -> bytes:
+    """
+    Serializa la cabecera de un bloque v2+ sin el nonce.
+    El hash del bloque es SHA-256(prefijo + nonce), lo que permite precalcular el prefijo al minar.
+    """
+    fields = HEADER_FIELDS if header['version'] >= 3 else HEADER_FIELDS_V2
+    return json.dumps({field: header[field] for field in fields}, sort_keys=True, separators=(',', ':')).encode()
+
+
+def header_hash(header: dict) -> str:
+    """
+    Hash de un bloque v2+ calculado solo a partir de su cabecera (sin las transacciones).
+    """
+    return hashlib.sha256(header_prefix(header) + b'%d' % header['nonce']).hexdigest()
+
+
+def merkle_proof(tx_hashes: list, position: int) -> list:
+    """
+    Ruta de inclusión de la hoja 'position': el hash hermano (hex) en cada nivel, de las hojas a la raíz.
+    Ocupa log2(n) hashes; el lado de cada hermano se deduce de los bits de 'position'.
+    """
+    proof = []
+    level = [bytes.fromhex(h) for h in tx_hashes]
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        proof.append(level[position ^ 1].hex())
+        level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        position >>= 1
+    return proof
+
+
+def verify_merkle_proof(leaf_hash: str, position: int, proof: list, root: str) -> bool:
+    """
+    Comprueba que la hoja 'leaf_hash' ocupa la posición 'position' del árbol con raíz 'root'.
+    """
+    try:
+        node = bytes.fromhex(leaf_hash)
+        for sibling in proof:
+            sibling = bytes.fromhex(sibling)
+            node = _hash_pair(sibling, node) if position & 1 else _hash_pair(node, sibling)
+            position >>= 1
+    except (TypeError, ValueError):
+        return False
+    return position == 0 and node.hex() == root
+
+
+def verify_inclusion(proof: dict, trusted_hash: str = None, checkpoint: dict = None) -> tuple[bool, str]:
+    """
+    Verificador para clientes ligeros de la respuesta de /proof/<txid>, sin descargar la cadena:
+      1. el hash de 'transaction' es 'txid' y su ruta de Merkle lleva a la raíz de la primera cabecera;
+      2. cada cabecera de 'headers' cumple su prueba de trabajo con un objetivo no mayor que MAX_TARGET
+         y enlaza con la anterior;
+      3. las cabeceras se anclan en un bloque de confianza obtenido por otra vía: trusted_hash debe ser
+         el hash de la última cabecera recibida, o checkpoint (una cabecera ya verificada por el cliente)
+         debe ser una de las cabeceras recibidas.
+    El objetivo lo declara cada cabecera, por lo que sin ese ancla cualquiera podría fabricar cabeceras
+    válidas: se exige trusted_hash o checkpoint.
+    Solo depende de hashlib, json y retarget.py, de modo que puede copiarse en un monedero o servicio externo.
+    """
+    from retarget import MAX_TARGET, block_target, meets_target
+    if trusted_hash is None and checkpoint is None:
+        return False, "Se requiere un hash de confianza o una cabecera de punto de control."
+    try:
+        txid = proof['txid']
+        if tx_hash(proof['transaction']) != txid:
+            return False, "El hash de la transacción no coincide con el txid."
+        headers = proof['headers']
+        if not headers or headers[0]['index'] != proof['block_index']:
+            return False, "Falta la cabecera del bloque que contiene la transacción."
+        if not verify_merkle_proof(txid, proof['position'], proof['merkle_path'], headers[0]['merkle_root']):
+            return False, "La ruta de Merkle no lleva a la raíz de la cabecera."
+
+        previous = None
+        hashes = set()
+        for header in headers:
+            if header.get('version', 1) < 2:
+                return False, "Las cabeceras v1 no permiten pruebas de inclusión."
+            target = block_target(header)
+            if target > MAX_TARGET:
+                return False, f"Objetivo de dificultad fuera de rango en el bloque {header['index']}."
+            block_hash = header_hash(header)
+            if not meets_target(block_hash, target):
+                return False, f"Prueba de trabajo inválida en el bloque {header['index']}."
+            if previous is not None and (header['index'] != previous[0] + 1 or header['previous_hash'] != previous[1]):
+                return False, f"La cabecera {header['index']} no enlaza con la anterior."
+            previous = (header['index'], block_hash)
+            hashes.add(block_hash)
+        checkpoint_hash = header_hash(checkpoint) if checkpoint is not None else None
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return False, "Estructura de prueba inválida."
+
+    if trusted_hash is not None and previous[1] != trusted_hash:
+        return False, "La última cabecera no corresponde al hash de confianza."
+    if checkpoint_hash is not None and checkpoint_hash not in hashes:
+        return False, "Ninguna cabecera recibida corresponde al punto de control."
+    return True, f"Transacción incluida en el bloque {proof['block_index']} con {len(headers)} cabeceras verificadas."
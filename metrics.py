@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter, sleep
+
+# ==========================================
+# CONFIGURACIÓN DE MÉTRICAS Y PERFILADO
+# ==========================================
+# Con METRICS_ENABLED=0 los decoradores devuelven la función original y las mediciones en línea
+# se omiten: la instrumentación no añade coste a las rutas críticas
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# El perfilador por muestreo (/debug/profile) solo se expone si se habilita explícitamente
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '0') == '1'
+# Intervalo de muestreo del perfilador y duración máxima de una ventana
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS', 60))
+
+# Límites (segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Contador monótono, opcionalmente con etiquetas.
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge:
+    """
+    Valor instantáneo. Puede fijarse con set() o calcularse al exportar con una función.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, function=None):
+        self.name = name
+        self.help = help_text
+        self.labels = ()
+        self._function = function
+        self._value = 0
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self) -> float:
+        return self._function() if self._function else self._value
+
+    def samples(self):
+        yield self.name, '', self.value()
+
+
+class Histogram:
+    """
+    Histograma acumulativo de Prometheus (cubetas 'le', _sum y _count), opcionalmente con etiquetas.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [contadores por cubeta (no acumulados)..., +Inf, suma]
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            # Primera cubeta con límite >= value (la última posición es +Inf)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(label_values, list(series)) for label_values, series in self._series.items()]
+        for label_values, series in items:
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (float('inf'),), series):
+                cumulative += observed
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield self.name + '_bucket', _format_labels(self.labels, label_values, f'le="{le}"'), cumulative
+            yield self.name + '_sum', _format_labels(self.labels, label_values), series[-1]
+            yield self.name + '_count', _format_labels(self.labels, label_values), cumulative
+
+
+class Registry:
+    """
+    Conjunto de métricas del proceso, exportadas en el formato de texto de Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Registrar dos veces el mismo nombre devuelve la métrica existente (p. ej. al recargar módulos)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels: tuple = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, function=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, function))
+
+
+def histogram(name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+
+def timed(metric: Histogram, *label_values):
+    """
+    Decorador que registra en el histograma la duración de cada llamada.
+    Con las métricas deshabilitadas devuelve la función sin envolver.
+    """
+    def decorator(function):
+        if not METRICS_ENABLED:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metric.observe(perf_counter() - started, *label_values)
+        return wrapper
+    return decorator
+
+
+# ==========================================
+# PERFILADOR POR MUESTREO
+# ==========================================
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo de todos los hilos del proceso durante una ventana de tiempo.
+    Cada PROFILER_INTERVAL_MS toma la pila de cada hilo (sys._current_frames) y acumula por función
+    las muestras propias y acumuladas y las relaciones llamador -> llamado. No intercepta llamadas
+    (a diferencia de cProfile, que además solo perfila el hilo que lo activa), por lo que el coste
+    sobre el nodo es bajo y nulo fuera de la ventana.
+    El resultado tiene el formato de pstats: se puede imprimir con pstats.Stats o guardar como .pstats.
+    """
+
+    def __init__(self, interval_ms: float = None):
+        self.interval = (interval_ms or PROFILER_INTERVAL_MS) / 1000
+        # Solo una ventana a la vez
+        self._running = threading.Lock()
+        self.stats = {}
+        self.samples = 0
+
+    def run(self, seconds: float) -> dict:
+        """
+        Muestrea durante 'seconds' segundos y retorna el diccionario en formato pstats
+        {(archivo, línea, función): (llamadas primitivas, llamadas, tiempo propio, tiempo acumulado, llamadores)}.
+        Lanza RuntimeError si ya hay una ventana en curso.
+        """
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("Ya hay una sesión de perfilado en curso.")
+        try:
+            own = {}
+            cumulative = {}
+            callers = {}
+            samples = 0
+            me = threading.get_ident()
+            deadline = perf_counter() + seconds
+            while perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == me:
+                        continue
+                    samples += 1
+                    seen = set()
+                    callee = None
+                    while frame is not None:
+                        code = frame.f_code
+                        key = (code.co_filename, code.co_firstlineno, code.co_name)
+                        if callee is None:
+                            own[key] = own.get(key, 0) + 1
+                        else:
+                            edges = callers.setdefault(callee, {})
+                            edges[key] = edges.get(key, 0) + 1
+                        # Las funciones recursivas cuentan una sola vez por muestra en el tiempo acumulado
+                        if key not in seen:
+                            seen.add(key)
+                            cumulative[key] = cumulative.get(key, 0) + 1
+                        callee = key
+                        frame = frame.f_back
+                sleep(self.interval)
+
+            interval = self.interval
+            self.stats = {
+                key: (count, count, own.get(key, 0) * interval, count * interval,
+                      {caller: (n, n, 0.0, n * interval) for caller, n in callers.get(key, {}).items()})
+                for key, count in cumulative.items()
+            }
+            self.samples = samples
+            return self.stats
+        finally:
+            self._running.release()
+
+    def report(self, sort: str = 'cumulative', limit: int = 40) -> str:
+        """
+        Resultado de la última ventana como texto de pstats. 'ncalls' es el número de muestras
+        y los tiempos son muestras x intervalo.
+        """
+        stream = io.StringIO()
+        stream.write(f"{self.samples} muestras cada {self.interval * 1000:g} ms\n")
+        pstats.Stats(_StatsHolder(self.stats), stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        """
+        Resultado de la última ventana serializado como un archivo .pstats (legible con pstats, snakeviz...).
+        """
+        return marshal.dumps(self.stats)
+
+
+class _StatsHolder:
+    """
+    Adaptador con la interfaz que pstats.Stats espera de un perfilador (create_stats + stats).
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = dict(stats)
+
+    def create_stats(self):
+        pass
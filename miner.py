@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import multiprocessing
+import os
+import threading
+from time import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import metrics
+
+# ==========================================
+# CONFIGURACIÓN DEL MOTOR DE MINADO
+# ==========================================
+# Número de procesos que reparten el espacio de nonces (por defecto, un proceso por núcleo)
+MINING_WORKERS = int(os.environ.get('MINING_WORKERS', os.cpu_count() or 1))
+# Cada cuántos intentos un proceso revisa si debe abandonar la búsqueda
+CANCEL_CHECK_INTERVAL = 4096
+
+# Métricas de la Prueba de Trabajo
+POW_SECONDS = metrics.histogram('blockchain_pow_seconds', 'Duración de cada búsqueda de nonce (PoW).', ('result',))
+POW_HASHES = metrics.counter('blockchain_pow_hashes_total', 'Hashes calculados en búsquedas de nonce completadas.')
+POW_HASHRATE = metrics.gauge('blockchain_pow_hashrate', 'Hashes por segundo de la última búsqueda completada.')
+
+# Evento de cancelación heredado por los procesos del pool (ver _init_worker)
+_cancel_event = None
+
+
+def _init_worker(cancel_event):
+    """
+    Inicializador de cada proceso del pool.
+    El evento de cancelación solo puede compartirse por herencia, no como argumento de una tarea.
+    """
+    global _cancel_event
+    _cancel_event = cancel_event
+
+
+def _search_nonce(header_prefix: bytes, start: int, step: int, target: int, cancel_event=None) -> tuple:
+    """
+    Recorre los nonces start, start + step, start + 2*step, ... hasta encontrar uno cuyo hash,
+    leído como entero de 256 bits, no supere el objetivo, o hasta que se solicite la cancelación.
+    El prefijo de la cabecera se procesa una sola vez; cada intento solo copia el estado
+    SHA-256 y añade los bytes del nonce, por lo que su coste no depende del mempool.
+
+    Retorna:
+        tuple: (nonce encontrado o None si fue cancelado, número de hashes calculados).
+    """
+    cancel_event = cancel_event or _cancel_event
+    prefix_state = hashlib.sha256(header_prefix)
+    nonce = start
+    attempts = 0
+    while True:
+        guess = prefix_state.copy()
+        guess.update(b'%d' % nonce)
+        attempts += 1
+        if int.from_bytes(guess.digest(), 'big') <= target:
+            return nonce, attempts
+        if attempts % CANCEL_CHECK_INTERVAL == 0 and cancel_event.is_set():
+            return None, attempts
+        nonce += step
+
+
+class ParallelMiner:
+    """
+    Motor de Prueba de Trabajo que reparte el espacio de nonces entre varios procesos.
+    El primer proceso que encuentra un nonce válido gana y el resto se cancela.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = max(1, workers or MINING_WORKERS)
+        self._cancel = multiprocessing.Event()
+        self._executor = None
+        self._lock = threading.Lock()
+        self._busy = False
+        self.last_result = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Crea el pool de procesos de forma perezosa y lo reutiliza entre bloques.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._cancel,)
+            )
+        return self._executor
+
+    def mine(self, header_prefix: bytes, target: int) -> dict:
+        """
+        Busca un nonce para la cabecera serializada del bloque candidato (sin el nonce)
+        cuyo hash no supere el objetivo numérico 'target'.
+
+        Retorna:
+            dict: {'nonce', 'hashes', 'elapsed', 'hashrate'}, o None si el minado fue cancelado.
+        """
+        with self._lock:
+            self._cancel.clear()
+            self._busy = True
+            started = time()
+            try:
+                if self.workers == 1:
+                    nonce, hashes = _search_nonce(header_prefix, 0, 1, target, self._cancel)
+                else:
+                    nonce, hashes = self._mine_parallel(header_prefix, target)
+            finally:
+                self._busy = False
+
+            elapsed = time() - started
+            if metrics.METRICS_ENABLED:
+                POW_SECONDS.observe(elapsed, 'found' if nonce is not None else 'cancelled')
+            if nonce is None:
+                return None
+            self.last_result = {
+                'nonce': nonce,
+                'hashes': hashes,
+                'elapsed': elapsed,
+                'hashrate': hashes / elapsed if elapsed > 0 else 0.0,
+            }
+            if metrics.METRICS_ENABLED:
+                POW_HASHES.inc(hashes)
+                POW_HASHRATE.set(self.last_result['hashrate'])
+            return self.last_result
+
+    def _mine_parallel(self, header_prefix: bytes, target: int) -> tuple:
+        """
+        Lanza un proceso por trabajador con nonces intercalados y espera al primer ganador.
+        """
+        executor = self._get_executor()
+        pending = {
+            executor.submit(_search_nonce, header_prefix, worker, self.workers, target)
+            for worker in range(self.workers)
+        }
+        winner = None
+        hashes = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                nonce, attempts = future.result()
+                hashes += attempts
+                if nonce is not None and (winner is None or nonce < winner):
+                    winner = nonce
+            if winner is not None:
+                # Detener al resto de procesos; terminan en el siguiente punto de control
+                self._cancel.set()
+        return winner, hashes
+
+    def cancel(self):
+        """
+        Aborta el minado en curso (por ejemplo, al llegar un bloque nuevo a la cadena).
+        """
+        if self._busy:
+            self._cancel.set()
+
+    def shutdown(self):
+        """
+        Libera el pool de procesos.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
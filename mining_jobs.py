@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from time import time
+from uuid import uuid4
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# CONFIGURACIÓN DE TRABAJOS DE MINADO
+# ==========================================
+# Hilos que ejecutan trabajos (el PoW en sí se reparte entre procesos en ParallelMiner)
+MINING_JOB_WORKERS = int(os.environ.get('MINING_JOB_WORKERS', 1))
+# Número máximo de trabajos terminados que se conservan para consulta
+MAX_FINISHED_JOBS = 1000
+
+
+class MiningJobManager:
+    """
+    Cola de trabajos de minado asíncronos.
+    Las peticiones concurrentes para la misma altura se agrupan en un único trabajo,
+    de modo que solo se produce un bloque por altura.
+    """
+
+    def __init__(self, blockchain, on_complete=None, workers: int = None):
+        self.blockchain = blockchain
+        self.on_complete = on_complete
+        self._executor = ThreadPoolExecutor(max_workers=workers or MINING_JOB_WORKERS,
+                                            thread_name_prefix='mining-job')
+        self._jobs = OrderedDict()
+        self._active_by_height = {}
+        self._lock = threading.Lock()
+
+    def submit(self, miner_address: str) -> tuple[dict, bool]:
+        """
+        Encola un trabajo de minado para la siguiente altura.
+
+        Retorna:
+            tuple[dict, bool]: (estado del trabajo, True si se agrupó con un trabajo ya activo).
+        """
+        height = self.blockchain.height + 1
+        with self._lock:
+            active_id = self._active_by_height.get(height)
+            if active_id is not None:
+                return dict(self._jobs[active_id]), True
+
+            job = {
+                'id': uuid4().hex,
+                'status': 'queued',
+                'miner': miner_address,
+                'height': height,
+                'submitted_at': time(),
+                'started_at': None,
+                'finished_at': None,
+                'hashes': 0,
+                'hashrate': 0.0,
+                'result': None,
+                'error': None,
+            }
+            self._jobs[job['id']] = job
+            self._active_by_height[height] = job['id']
+            self._trim_finished()
+
+        self._executor.submit(self._run, job['id'])
+        return dict(job), False
+
+    def get(self, job_id: str) -> dict:
+        """
+        Retorna una copia del estado de un trabajo, o None si no existe.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job_id: str):
+        """
+        Ejecuta un trabajo en un hilo del pool y notifica su finalización.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = time()
+
+        try:
+            block, stats = self.blockchain.mine_block(job['miner'])
+            status = 'done' if block else ('stale' if stats else 'cancelled')
+            result = self._summarize(block) if block else None
+            error = None
+        except Exception as exc:
+            block, stats, status, result, error = None, None, 'failed', None, str(exc)
+
+        with self._lock:
+            job['status'] = status
+            job['finished_at'] = time()
+            job['result'] = result
+            job['error'] = error
+            if stats:
+                job['hashes'] = stats['hashes']
+                job['hashrate'] = stats['hashrate']
+            self._active_by_height.pop(job['height'], None)
+            snapshot = dict(job)
+
+        if self.on_complete:
+            self.on_complete(snapshot, block)
+
+    def _summarize(self, block: dict) -> dict:
+        """
+        Detalles técnicos del bloque minado (mismo formato que la antigua respuesta de /mine).
+        """
+        return {
+            'message': "Nuevo bloque minado exitosamente.",
+            'index': block['index'],
+            'nonce': block['nonce'],
+            'previous_hash': block['previous_hash'],
+            'transactions': block['transactions'],
+            'hash': self.blockchain._hash(block)
+        }
+
+    def _trim_finished(self):
+        """
+        Descarta los trabajos terminados más antiguos para acotar la memoria.
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Blueprint, Response, jsonify, request
+
+from merkle import tx_hash
+
+# ==========================================
+# CONFIGURACIÓN DE LA RED ENTRE NODOS
+# ==========================================
+# URL pública con la que este nodo se anuncia a sus pares (p. ej. 'http://10.0.0.5:5000')
+NODE_URL = os.environ.get('NODE_URL')
+# Envíos simultáneos como máximo hacia los pares (y tamaño del pool de conexiones HTTP)
+PEER_MAX_CONCURRENCY = int(os.environ.get('PEER_MAX_CONCURRENCY', 8))
+# Segundos de espera máxima por petición a un par (conexión y lectura)
+PEER_TIMEOUT = float(os.environ.get('PEER_TIMEOUT', 3))
+# Bloques por página al descargar el sufijo de la cadena de un par
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+# Bloques que se retienen en memoria durante una sincronización: un sufijo mayor se valida y aplica por
+# tramos de este tamaño (una bifurcación más profunda que este valor no puede adoptarse)
+SYNC_MAX_BLOCKS = int(os.environ.get('SYNC_MAX_BLOCKS', 20000))
+# Hashes de bloques y transacciones ya vistos que se recuerdan para no reenviarlos en bucle
+SEEN_CACHE_SIZE = 10000
+
+
+class HttpTransport:
+    """
+    Cliente HTTP hacia los pares con conexiones persistentes reutilizadas (keep-alive) y timeouts.
+    """
+
+    def __init__(self, timeout: float = None, pool_size: int = None):
+        self.timeout = timeout or PEER_TIMEOUT
+        pool_size = pool_size or PEER_MAX_CONCURRENCY
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, peer: str, path: str, payload: dict = None) -> tuple[int, dict]:
+        """
+        Retorna (código HTTP, cuerpo JSON). Los errores de red se reportan con código 0.
+        """
+        try:
+            response = self.session.request(method, peer + path, json=payload, timeout=self.timeout)
+            return response.status_code, response.json() if response.content else {}
+        except (requests.RequestException, ValueError) as exc:
+            return 0, {'message': str(exc)}
+
+
+class LocalTransport:
+    """
+    Transporte en proceso: entrega las peticiones al cliente de pruebas de cada aplicación Flask.
+    Permite levantar varios nodos en un mismo proceso sin red real.
+    """
+
+    def __init__(self):
+        self._clients = {}
+
+    def attach(self, peer: str, app):
+        self._clients[peer] = app.test_client()
+
+    def request(self, method: str, peer: str, path: str, payload: dict = None) -> tuple[int, dict]:
+        client = self._clients.get(peer)
+        if client is None:
+            return 0, {'message': f"Nodo inalcanzable: {peer}"}
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class PeerNetwork:
+    """
+    Difusión (gossip) de bloques y transacciones entre nodos pares y resolución de conflictos.
+    Los envíos se hacen en segundo plano con concurrencia acotada; la sincronización descarga
+    solo el sufijo que falta a partir del último bloque común (localizador de bloques).
+    """
+
+    def __init__(self, blockchain, node_url: str = None, transport=None, workers: int = None,
+                 on_remote_block=None, on_remote_transaction=None):
+        self.blockchain = blockchain
+        self.node_url = node_url or NODE_URL
+        self.transport = transport or HttpTransport()
+        self.on_remote_block = on_remote_block
+        self.on_remote_transaction = on_remote_transaction
+        self._executor = ThreadPoolExecutor(max_workers=workers or PEER_MAX_CONCURRENCY,
+                                            thread_name_prefix='peer-gossip')
+        # hash -> nodo del que se recibió (None si es propio); evita reenvíos y bucles de difusión
+        self._seen = OrderedDict()
+        # hash -> nodo de origen de los bloques y transacciones recibidos que aún se están validando
+        self._arriving = {}
+        self._seen_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # Sincronizaciones en segundo plano pendientes (URL del par, o None para todos los pares) y su hilo
+        self._sync_requests = set()
+        self._sync_thread = None
+        self._sync_requests_lock = threading.Lock()
+
+        blockchain.subscribe('block', self._on_block)
+        blockchain.subscribe('transaction', self._on_transaction)
+
+    # ==========================================
+    #            DIFUSIÓN (GOSSIP)
+    # ==========================================
+
+    def _mark_seen(self, key: str, origin: str = None) -> bool:
+        """
+        Registra un hash como visto. Retorna False si ya lo estaba.
+        """
+        with self._seen_lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = origin
+            if len(self._seen) > SEEN_CACHE_SIZE:
+                self._seen.popitem(last=False)
+            return True
+
+    def _is_seen(self, key: str) -> bool:
+        with self._seen_lock:
+            return key in self._seen
+
+    def _origin_of(self, key: str) -> str:
+        with self._seen_lock:
+            return self._seen.get(key, self._arriving.get(key))
+
+    def broadcast(self, path: str, payload: dict, exclude: str = None):
+        """
+        Envía payload a todos los pares (salvo exclude) en segundo plano.
+        """
+        payload = dict(payload, origin=self.node_url)
+        for peer in self.blockchain.nodes:
+            if peer != exclude:
+                self._executor.submit(self.transport.request, 'POST', peer, path, payload)
+
+    def _on_block(self, block: dict):
+        """
+        Nueva punta local (minada o recibida): se anuncia a los pares, excepto al que la envió.
+        """
+        key = self.blockchain._hash(block)
+        origin = self._origin_of(key)
+        self._mark_seen(key)
+        self.broadcast('/network/block', {'block': block}, exclude=origin)
+
+    def _on_transaction(self, tx: dict):
+        key = tx_hash(tx)
+        origin = self._origin_of(key)
+        self._mark_seen(key)
+        self.broadcast('/network/transaction', {'transaction': tx}, exclude=origin)
+
+    def receive_block(self, block: dict, origin: str = None) -> tuple[bool, str]:
+        """
+        Procesa un bloque difundido por un par. Si no enlaza con la punta local (falta algún bloque
+        o hay una bifurcación), se sincroniza el sufijo en segundo plano: con el nodo de origen si es
+        un par registrado y, si no, con los pares registrados (el origen lo declara el remitente y no
+        se contacta una URL que no se haya registrado).
+        El bloque solo se marca como visto cuando add_block lo acepta (en _on_block): desde la v2 el hash
+        cubre solo la cabecera, y una copia con el cuerpo alterado comparte hash con el bloque auténtico.
+        """
+        key = self.blockchain._hash(block)
+        if self._is_seen(key):
+            return True, "Bloque ya conocido."
+
+        height = self.blockchain.height
+        if block['index'] <= height:
+            return True, "Bloque ignorado: la cadena local es igual o más larga."
+        if block['index'] == height + 1 and block['previous_hash'] == self.blockchain.tip_hash:
+            with self._seen_lock:
+                self._arriving[key] = origin
+            try:
+                success, message = self.blockchain.add_block(block)
+            finally:
+                with self._seen_lock:
+                    self._arriving.pop(key, None)
+            if not success and self._is_seen(key):
+                # Otra copia del mismo bloque se aceptó mientras se validaba esta
+                return True, "Bloque ya conocido."
+            if success and self.on_remote_block:
+                self.on_remote_block(block)
+            return success, message
+        peers = self.blockchain.nodes
+        if origin in peers:
+            self._schedule_sync(origin)
+            return True, "Bloque fuera de secuencia: sincronización iniciada."
+        if peers:
+            self._schedule_sync()
+            return True, "Bloque fuera de secuencia: sincronización con los pares registrados iniciada."
+        return False, "Bloque fuera de secuencia y sin pares registrados."
+
+    def _schedule_sync(self, peer: str = None):
+        """
+        Sincroniza en segundo plano con peer (o con todos los pares si es None) en un único hilo dedicado.
+        No se usa el pool de difusión: resolve_conflicts consulta a los pares a través de él y esperaría
+        a sus propios hilos. Las peticiones que llegan durante una sincronización se agrupan en la siguiente.
+        """
+        with self._sync_requests_lock:
+            self._sync_requests.add(peer)
+            if self._sync_thread is None:
+                self._sync_thread = threading.Thread(target=self._sync_worker, name='peer-sync', daemon=True)
+                self._sync_thread.start()
+
+    def _sync_worker(self):
+        while True:
+            with self._sync_requests_lock:
+                if not self._sync_requests:
+                    self._sync_thread = None
+                    return
+                pending, self._sync_requests = self._sync_requests, set()
+            try:
+                if None in pending:
+                    self.resolve_conflicts()
+                else:
+                    for peer in pending:
+                        self.sync_with(peer)
+            except Exception as exc:
+                print(f"Error en la sincronización en segundo plano: {exc}")
+
+    def receive_transaction(self, tx: dict, origin: str = None) -> tuple[bool, str]:
+        """
+        Procesa una transacción difundida por un par conservando su timestamp original.
+        Como los bloques, solo se marca como vista cuando el Mempool la admite (en _on_transaction):
+        una transacción rechazada por un motivo pasajero (p. ej. aún no llegó el bloque que la financia)
+        se vuelve a evaluar si un par la reenvía.
+        """
+        key = tx_hash(tx)
+        if self._is_seen(key):
+            return True, "Transacción ya conocida."
+        with self._seen_lock:
+            self._arriving[key] = origin
+        try:
+            success, message = self.blockchain.new_transaction(
+                tx['sender'], tx['recipient'], tx['amount'], tx['signature'], timestamp=tx.get('timestamp'))
+        finally:
+            with self._seen_lock:
+                self._arriving.pop(key, None)
+        if not success and self._is_seen(key):
+            # Otra copia de la misma transacción se admitió mientras se validaba esta
+            return True, "Transacción ya conocida."
+        if success and self.on_remote_transaction:
+            self.on_remote_transaction(tx)
+        return success, message
+
+    # ==========================================
+    #       CONSENSO: CADENA MÁS LARGA
+    # ==========================================
+
+    def status(self) -> dict:
+        return {
+            'node': self.node_url,
+            'height': self.blockchain.height,
+            'tip_hash': self.blockchain.tip_hash,
+            'pruned_height': self.blockchain.pruned_height,
+            'peers': self.blockchain.nodes
+        }
+
+    def resolve_conflicts(self) -> tuple[bool, str]:
+        """
+        Consulta en paralelo la altura de los pares y adopta el sufijo del par más largo cuya cadena sea válida.
+        """
+        peers = self.blockchain.nodes
+        statuses = self._executor.map(lambda peer: self.transport.request('GET', peer, '/network/status'), peers)
+        candidates = sorted(
+            ((body['height'], peer) for peer, (code, body) in zip(peers, statuses)
+             if code == 200 and isinstance(body, dict) and type(body.get('height')) is int),
+            reverse=True
+        )
+        failures = []
+        for height, peer in candidates:
+            if height <= self.blockchain.height:
+                break
+            success, message = self.sync_with(peer)
+            if success:
+                return True, message
+            failures.append(message)
+        if failures:
+            # Había pares más largos, pero ninguna de sus cadenas pudo adoptarse
+            return False, " ".join(failures)
+        return False, "La cadena local es la de mayor longitud válida."
+
+    def sync_with(self, peer: str) -> tuple[bool, str]:
+        """
+        Descarga por páginas los bloques del par posteriores al último bloque común y, si su cadena
+        es más larga, reemplaza el sufijo local. Como mucho se retienen SYNC_MAX_BLOCKS bloques: un
+        sufijo mayor se aplica por tramos, reanudando cada uno desde la nueva punta local.
+        """
+        with self._sync_lock:
+            while True:
+                success, message, complete = self._sync_round(peer)
+                if not success or complete:
+                    return success, message
+
+    @staticmethod
+    def _valid_sync_reply(body: dict) -> bool:
+        """
+        Forma de la respuesta de /network/sync: alturas enteras y una lista de bloques (dicts).
+        El contenido de cada bloque lo valida después replace_suffix.
+        """
+        blocks = body.get('blocks')
+        return (type(body.get('fork_height')) is int and body['fork_height'] >= 0
+                and type(body.get('height')) is int
+                and isinstance(blocks, list) and all(isinstance(block, dict) for block in blocks))
+
+    def _sync_round(self, peer: str) -> tuple[bool, str, bool]:
+        """
+        Descarga y aplica un tramo de como mucho SYNC_MAX_BLOCKS bloques.
+
+        Retorna:
+            tuple[bool, str, bool]: (éxito, mensaje, True si no quedan bloques del par por descargar).
+        """
+        locator = self.blockchain.block_locator()
+        fork_height, blocks, exhausted = None, [], False
+        while len(blocks) < SYNC_MAX_BLOCKS:
+            limit = min(SYNC_PAGE_SIZE, SYNC_MAX_BLOCKS - len(blocks))
+            code, body = self.transport.request('POST', peer, '/network/sync', {'locator': locator, 'limit': limit})
+            if not isinstance(body, dict):
+                return False, f"{peer} envió una respuesta de sincronización inválida.", True
+            if code != 200:
+                return False, f"Error al sincronizar con {peer}: {body.get('message')}", True
+            if not self._valid_sync_reply(body):
+                return False, f"{peer} envió una respuesta de sincronización inválida.", True
+            page = body['blocks']
+            if len(page) > limit:
+                return False, f"{peer} envió más bloques de los solicitados.", True
+            if fork_height is None:
+                fork_height = body['fork_height']
+            elif body['fork_height'] != fork_height + len(blocks):
+                return False, f"La cadena de {peer} cambió durante la sincronización.", True
+            blocks.extend(page)
+            if not page or fork_height + len(blocks) >= body['height']:
+                exhausted = True
+                break
+            # Página siguiente: el último bloque recibido ya es común con el par
+            try:
+                locator = [self.blockchain._hash(blocks[-1])]
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return False, f"{peer} envió un bloque con una estructura inválida.", True
+
+        if fork_height + len(blocks) <= self.blockchain.height:
+            if not exhausted:
+                return False, f"La bifurcación con {peer} supera los {SYNC_MAX_BLOCKS} bloques sincronizables.", True
+            return False, f"La cadena de {peer} no es más larga que la local.", True
+        success, message = self.blockchain.replace_suffix(fork_height, blocks)
+        if not success:
+            return False, f"La cadena de {peer} es inválida: {message}", True
+        if self.on_remote_block:
+            self.on_remote_block(blocks[-1])
+        return success, message, exhausted
+
+
+def create_network_blueprint(network: PeerNetwork) -> Blueprint:
+    """
+    Rutas de gestión de pares, difusión y sincronización para registrar en una aplicación Flask.
+    """
+    blueprint = Blueprint('network', __name__)
+    blockchain = network.blockchain
+
+    @blueprint.route('/nodes', methods=['GET'])
+    def list_nodes():
+        """ Retorna los nodos pares registrados. """
+        return jsonify({'nodes': blockchain.nodes}), 200
+
+    @blueprint.route('/nodes/register', methods=['POST'])
+    def register_nodes():
+        """
+        Registra uno o varios nodos pares: {"nodes": ["http://127.0.0.1:5001", ...]}.
+        """
+        values = request.get_json(silent=True) or {}
+        nodes = values.get('nodes')
+        if not isinstance(nodes, list) or not nodes:
+            return jsonify({'message': 'Error: Se requiere una lista de nodos.'}), 400
+        for address in nodes:
+            success, msg = blockchain.register_node(str(address))
+            if not success: return jsonify({'message': msg}), 400
+        return jsonify({'message': 'Nodos registrados.', 'total_nodes': blockchain.nodes}), 201
+
+    @blueprint.route('/nodes', methods=['DELETE'])
+    def unregister_nodes():
+        """
+        Elimina nodos pares: {"nodes": ["http://127.0.0.1:5001", ...]}.
+        """
+        values = request.get_json(silent=True) or {}
+        removed = [address for address in values.get('nodes') or [] if blockchain.unregister_node(str(address))]
+        return jsonify({'removed': removed, 'total_nodes': blockchain.nodes}), 200
+
+    @blueprint.route('/nodes/resolve', methods=['GET'])
+    def consensus():
+        """
+        Algoritmo de consenso: adopta la cadena válida más larga entre los pares.
+        """
+        replaced, msg = network.resolve_conflicts()
+        return jsonify({'replaced': replaced, 'message': msg, 'length': blockchain.height,
+                        'tip_hash': blockchain.tip_hash}), 200
+
+    @blueprint.route('/network/status', methods=['GET'])
+    def network_status():
+        return jsonify(network.status()), 200
+
+    @blueprint.route('/network/sync', methods=['POST'])
+    def network_sync():
+        """
+        Retorna los bloques posteriores al último hash común del localizador recibido.
+        """
+        values = request.get_json(silent=True) or {}
+        locator = values.get('locator')
+        limit = values.get('limit', SYNC_PAGE_SIZE)
+        if not isinstance(locator, list) or not isinstance(limit, int) or limit < 1:
+            return jsonify({'message': 'Error: Localizador o límite inválido.'}), 400
+        fork_height, blocks = blockchain.blocks_after_locator(locator, min(limit, SYNC_PAGE_SIZE))
+        return jsonify({'fork_height': fork_height, 'blocks': blocks, 'height': blockchain.height}), 200
+
+    @blueprint.route('/network/block', methods=['POST'])
+    def receive_block():
+        values = request.get_json(silent=True) or {}
+        block = values.get('block')
+        try:
+            success, msg = network.receive_block(block, values.get('origin'))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return jsonify({'message': 'Error: Bloque inválido.'}), 400
+        return jsonify({'message': msg}), 200 if success else 400
+
+    @blueprint.route('/network/transaction', methods=['POST'])
+    def receive_transaction():
+        values = request.get_json(silent=True) or {}
+        tx = values.get('transaction')
+        try:
+            success, msg = network.receive_transaction(tx, values.get('origin'))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'message': 'Error: Transacción malformada.'}), 400
+        return jsonify({'message': msg}), 200 if success else 400
+
+    @blueprint.route('/network/snapshots', methods=['GET'])
+    def list_snapshots():
+        """ Metadatos de las instantáneas del estado disponibles (altura, hash de la punta y del contenido). """
+        return jsonify({'snapshots': blockchain.snapshots.list(), 'height': blockchain.height}), 200
+
+    @blueprint.route('/network/snapshots/<reference>', methods=['GET'])
+    def get_snapshot(reference):
+        """
+        Instantánea del estado a una altura (o 'latest') como JSON comprimido con zlib.
+        X-Snapshot-Hash es el SHA-256 del contenido descomprimido (snapshots.decode_snapshot lo verifica).
+        """
+        if reference == 'latest':
+            available = blockchain.snapshots.list()
+            reference = str(available[0]['height']) if available else '0'
+        if not reference.isdigit():
+            return jsonify({'message': 'Error: Altura inválida.'}), 400
+        meta, data = blockchain.snapshots.raw(int(reference))
+        if meta is None:
+            return jsonify({'message': 'Error: Instantánea no disponible.'}), 404
+        return Response(data, mimetype='application/octet-stream', headers={
+            'X-Snapshot-Height': str(meta['height']),
+            'X-Snapshot-Tip': meta['tip_hash'],
+            'X-Snapshot-Hash': meta['state_hash'],
+        })
+
+    return blueprint
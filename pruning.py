@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import metrics
+
+# ==========================================
+# PODA DE BLOQUES Y COMPACTACIÓN
+# ==========================================
+# Bloques recientes que conservan su cuerpo completo (0 = nodo completo, sin poda). Por debajo solo se
+# guardan cabeceras y hashes; el estado anterior lo aporta una instantánea (ver snapshots.py).
+PRUNE_KEEP_BLOCKS = int(os.environ.get('PRUNE_KEEP_BLOCKS', 0))
+# Archivo donde se mueven comprimidos los cuerpos podados ('' = se descartan)
+PRUNE_ARCHIVE = os.environ.get('PRUNE_ARCHIVE', '')
+# Podar también el índice de transacciones de esos bloques (/tx y el historial dejan de cubrirlos)
+PRUNE_TX_INDEX = os.environ.get('PRUNE_TX_INDEX', '0').lower() in ('1', 'true', 'yes')
+# Bloques por fragmento del archivo (unidad de compresión y de lectura)
+ARCHIVE_CHUNK_BLOCKS = int(os.environ.get('ARCHIVE_CHUNK_BLOCKS', 256))
+# Fragmentos descomprimidos que se mantienen en memoria (caché LRU)
+ARCHIVE_CACHE_CHUNKS = 8
+# Cada cuántos segundos se compacta la BD (0 = desactivado) y páginas liberadas en cada escritura corta
+COMPACT_INTERVAL = float(os.environ.get('COMPACT_INTERVAL', 300))
+COMPACT_PAGES = int(os.environ.get('COMPACT_PAGES', 256))
+
+SQL_SELECT_PRUNE_RANGE = 'SELECT "index", block_data, header_data, hash FROM blocks WHERE "index" BETWEEN ? AND ? ORDER BY "index"'
+SQL_DELETE_BLOCK_RANGE = 'DELETE FROM blocks WHERE "index" BETWEEN ? AND ?'
+SQL_INSERT_PRUNED_BLOCK = '''INSERT INTO blocks ("index", block_data, header_data, hash) VALUES (?, '', ?, ?)'''
+SQL_UPSERT_PRUNED_HEIGHT = '''
+    INSERT INTO prune_state (id, pruned_height) VALUES (1, ?)
+    ON CONFLICT(id) DO UPDATE SET pruned_height = excluded.pruned_height
+'''
+SQL_INSERT_ARCHIVE_CHUNK = 'INSERT OR REPLACE INTO archive_chunks (first_height, last_height, file_offset, length) VALUES (?, ?, ?, ?)'
+SQL_SELECT_ARCHIVE_CHUNKS = '''
+    SELECT first_height, last_height, file_offset, length FROM archive_chunks
+    WHERE first_height <= ? AND last_height >= ? ORDER BY first_height
+'''
+
+# Cabecera de cada cuerpo dentro de un fragmento: tipo (0 = texto JSON, 1 = BLOB compacto) y longitud
+_BODY = struct.Struct('>BI')
+
+PRUNED_BLOCKS = metrics.counter('blockchain_pruned_blocks_total', 'Bloques cuyo cuerpo se ha podado.')
+COMPACTED_PAGES = metrics.counter('sqlite_compacted_pages_total',
+                                  'Páginas devueltas al sistema de archivos por la compactación incremental.')
+
+
+def _pack_bodies(bodies: list) -> bytes:
+    out = bytearray()
+    for body in bodies:
+        raw = body.encode() if isinstance(body, str) else bytes(body)
+        out += _BODY.pack(0 if isinstance(body, str) else 1, len(raw))
+        out += raw
+    return bytes(out)
+
+
+def _unpack_bodies(data: bytes) -> list:
+    bodies, offset = [], 0
+    while offset < len(data):
+        kind, length = _BODY.unpack_from(data, offset)
+        offset += _BODY.size
+        raw = data[offset:offset + length]
+        bodies.append(raw.decode() if kind == 0 else raw)
+        offset += length
+    return bodies
+
+
+class BlockArchive:
+    """
+    Archivo de solo adición con los cuerpos de los bloques podados, tal como estaban en 'blocks.block_data'
+    (JSON o formato compacto). Se escribe por fragmentos de bloques consecutivos comprimidos con zlib;
+    la tabla 'archive_chunks' guarda el rango de alturas, la posición y la longitud de cada fragmento.
+    Las lecturas son bajo demanda (os.pread, sin compartir el cursor del archivo) con una caché LRU de fragmentos.
+    Si el proceso se interrumpe entre la escritura de un fragmento y su registro en la BD, los bytes
+    quedan huérfanos al final del archivo pero nunca se referencian.
+    """
+
+    def __init__(self, path: str, storage):
+        self.path = path
+        self.storage = storage
+        self._file = open(path, 'ab')
+        self._fd = os.open(path, os.O_RDONLY)
+        self._lock = threading.Lock()
+        self._chunks = OrderedDict()
+
+    def append(self, bodies: list) -> tuple[int, int]:
+        """
+        Añade un fragmento comprimido y lo lleva a disco. Retorna (posición, longitud) para registrarlo.
+        """
+        data = zlib.compress(_pack_bodies(bodies), 6)
+        with self._lock:
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return offset, len(data)
+
+    @staticmethod
+    def register(cursor, first_height: int, last_height: int, offset: int, length: int):
+        """
+        Registra un fragmento dentro de la transacción BD que poda sus bloques.
+        """
+        cursor.execute(SQL_INSERT_ARCHIVE_CHUNK, (first_height, last_height, offset, length))
+
+    def bodies(self, first_height: int, last_height: int) -> list:
+        """
+        block_data de las alturas [first_height, last_height] leído del archivo.
+        """
+        bodies = []
+        for row in self.storage.query(SQL_SELECT_ARCHIVE_CHUNKS, (last_height, first_height)):
+            chunk = self._chunk(row['first_height'], row['file_offset'], row['length'])
+            low = max(first_height, row['first_height']) - row['first_height']
+            high = min(last_height, row['last_height']) - row['first_height'] + 1
+            bodies.extend(chunk[low:high])
+        if len(bodies) != last_height - first_height + 1:
+            raise LookupError(f"El archivo de bloques no contiene las alturas {first_height}-{last_height}.")
+        return bodies
+
+    def _chunk(self, first_height: int, offset: int, length: int) -> list:
+        with self._lock:
+            chunk = self._chunks.get(first_height)
+            if chunk is not None:
+                self._chunks.move_to_end(first_height)
+                return chunk
+        chunk = _unpack_bodies(zlib.decompress(os.pread(self._fd, length, offset)))
+        with self._lock:
+            self._chunks[first_height] = chunk
+            if len(self._chunks) > ARCHIVE_CACHE_CHUNKS:
+                self._chunks.popitem(last=False)
+        return chunk
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def close(self):
+        self._file.close()
+        os.close(self._fd)
+
+
+class Pruner:
+    """
+    Poda de cuerpos de bloques: por debajo de la altura podada, las filas de 'blocks' conservan solo
+    cabecera y hash (block_data vacío), y sus cuerpos se mueven al BlockArchive si lo hay.
+    Se poda siempre hasta la altura de una instantánea del estado, de modo que las estadísticas pueden
+    reconstruirse sin leer cuerpos podados. El índice de transacciones se conserva salvo que se indique
+    tx_index, en cuyo caso también se borran sus filas de los bloques podados.
+    Las filas de cada fragmento se borran y se reinsertan sin cuerpo: reducir una fila en su sitio no
+    libera páginas, reinsertarlas de forma contigua sí (la compactación las devuelve después al sistema).
+    """
+
+    def __init__(self, storage, chain, chain_lock, keep: int = None, archive: BlockArchive = None,
+                 tx_index=None, chunk_size: int = None):
+        self.storage = storage
+        self._chain = chain
+        # Candado del estado en memoria del nodo (la ventana de bloques recientes cambia al podar)
+        self._chain_lock = chain_lock
+        self.keep = PRUNE_KEEP_BLOCKS if keep is None else keep
+        self.archive = archive
+        self.tx_index = tx_index
+        self.chunk_size = chunk_size or ARCHIVE_CHUNK_BLOCKS
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep > 0
+
+    def target_height(self, snapshot_heights: list) -> int:
+        """
+        Altura hasta la que se puede podar: la instantánea más alta que deja al menos 'keep' bloques completos
+        (0 si ninguna lo permite).
+        """
+        limit = len(self._chain) - self.keep
+        return max([height for height in snapshot_heights if height <= limit], default=0)
+
+    def prune_chunk(self, target: int) -> int:
+        """
+        Poda el siguiente fragmento (como máximo chunk_size bloques) por debajo de target, en una transacción.
+        Retorna el número de bloques podados (0 si ya no queda nada por podar).
+        """
+        first = self._chain.pruned_height + 1
+        last = min(target, first + self.chunk_size - 1, len(self._chain) - max(1, self.keep))
+        if last < first:
+            return 0
+        rows = self.storage.query(SQL_SELECT_PRUNE_RANGE, (first, last))
+        if len(rows) != last - first + 1 or any(row['hash'] != self._chain.hash_at(row['index'] - 1) for row in rows):
+            return 0
+
+        archived = self.archive.append([row['block_data'] for row in rows]) if self.archive else None
+        with self.storage.write() as cursor:
+            cursor.execute(SQL_DELETE_BLOCK_RANGE, (first, last))
+            cursor.executemany(SQL_INSERT_PRUNED_BLOCK, [(row['index'], row['header_data'], row['hash']) for row in rows])
+            if archived:
+                self.archive.register(cursor, first, last, *archived)
+            if self.tx_index is not None:
+                self.tx_index.delete_range(cursor, first, last)
+            cursor.execute(SQL_UPSERT_PRUNED_HEIGHT, (last,))
+        with self._chain_lock:
+            self._chain.mark_pruned(last)
+        PRUNED_BLOCKS.inc(len(rows))
+        return len(rows)
+
+
+class Compactor:
+    """
+    Compactación en línea de la BD: cada 'interval' segundos devuelve al sistema de archivos las páginas
+    libres (filas borradas del Mempool, cuerpos podados, instantáneas antiguas) con PRAGMA incremental_vacuum.
+    Cada paso libera como máximo 'pages' páginas en una escritura corta, así que las mutaciones del nodo
+    se intercalan entre pasos y las lecturas (WAL) no se detienen.
+    """
+
+    def __init__(self, storage, interval: float = None, pages: int = None):
+        self.storage = storage
+        self.interval = COMPACT_INTERVAL if interval is None else interval
+        self.pages = pages or COMPACT_PAGES
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0 and self.storage.path != ':memory:' and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sqlite-compactor', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Libera todas las páginas libres, paso a paso. Retorna el número de páginas devueltas.
+        """
+        freed = 0
+        while not self._stop.is_set():
+            step = self.storage.incremental_vacuum(self.pages)
+            if not step:
+                break
+            freed += step
+            COMPACTED_PAGES.inc(step)
+        if freed:
+            self.storage.checkpoint()
+        return freed
+
+    def stop(self):
+        self._stop.set()
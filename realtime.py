@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from time import perf_counter
+
+from merkle import tx_hash
+from chain_store import block_header
+import metrics
+
+# ==========================================
+# CONFIGURACIÓN DE EVENTOS EN TIEMPO REAL
+# ==========================================
+# Ventana (ms) en la que los eventos se acumulan y se envían juntos en un único mensaje
+DELTA_DEBOUNCE_MS = int(os.environ.get('DELTA_DEBOUNCE_MS', 200))
+# Prefijo de las salas Socket.IO por dirección
+ADDRESS_ROOM_PREFIX = 'addr:'
+
+# Métricas de los eventos Socket.IO emitidos
+SOCKETIO_EMITS = metrics.counter('socketio_emits_total', 'Eventos Socket.IO emitidos.', ('event',))
+SOCKETIO_EMIT_SECONDS = metrics.histogram('socketio_emit_seconds', 'Duración de cada emisión Socket.IO.', ('event',))
+
+
+def address_room(address: str) -> str:
+    return ADDRESS_ROOM_PREFIX + address
+
+
+def compact_transaction(tx: dict, txid: str = None) -> dict:
+    """
+    Transacción sin firma, identificada por su hash (la firma no aporta nada a la interfaz).
+    """
+    return {
+        'txid': txid or tx_hash(tx),
+        'sender': tx['sender'],
+        'recipient': tx['recipient'],
+        'amount': tx['amount'],
+        'timestamp': tx.get('timestamp')
+    }
+
+
+def _instrumented_emit(emit):
+    """
+    Envuelve la función de emisión para contar y cronometrar los eventos por nombre.
+    """
+    def instrumented(event, *args, **kwargs):
+        started = perf_counter()
+        try:
+            return emit(event, *args, **kwargs)
+        finally:
+            SOCKETIO_EMITS.inc(1, event)
+            SOCKETIO_EMIT_SECONDS.observe(perf_counter() - started, event)
+    return instrumented
+
+
+class DeltaPublisher:
+    """
+    Convierte los eventos de la Blockchain en deltas compactos para los clientes WebSocket.
+    Los eventos de una ventana de DELTA_DEBOUNCE_MS se agrupan: un mensaje 'actualizacion_mempool'
+    con las transacciones nuevas y los ids de las retiradas sin minarse (expiradas, desalojadas o
+    invalidadas), un 'bloque_minado' con cabeceras e ids de transacción, y los saldos que cambiaron
+    (globalmente y en la sala de cada dirección afectada).
+    """
+
+    def __init__(self, blockchain, emit, debounce_ms: int = None):
+        self.blockchain = blockchain
+        self._emit = _instrumented_emit(emit) if metrics.METRICS_ENABLED else emit
+        self.interval = (DELTA_DEBOUNCE_MS if debounce_ms is None else debounce_ms) / 1000
+        self._lock = threading.Lock()
+        self._timer = None
+        self._transactions = []
+        self._removed = []
+        self._blocks = []
+        self._dirty_addresses = set()
+        self._resync = False
+        self._last_tip = blockchain.tip_hash
+
+        blockchain.subscribe('block', self._on_block)
+        blockchain.subscribe('transaction', self._on_transaction)
+        blockchain.subscribe('dropped', self._on_dropped)
+
+    def _on_transaction(self, tx: dict):
+        with self._lock:
+            self._transactions.append(compact_transaction(tx))
+            self._dirty_addresses.update((tx['sender'], tx['recipient']))
+            self._schedule()
+
+    def _on_dropped(self, transactions: list):
+        with self._lock:
+            for tx in transactions:
+                self._removed.append(tx_hash(tx))
+                self._dirty_addresses.add(tx['sender'])
+            self._schedule()
+
+    def _on_block(self, block: dict):
+        block_hash = self.blockchain._hash(block)
+        with self._lock:
+            # Si el bloque no extiende la última punta anunciada hubo una reorganización:
+            # los clientes deben recargar el estado completo una vez
+            if block['previous_hash'] != self._last_tip:
+                self._resync = True
+            self._last_tip = block_hash
+            transactions = block['transactions']
+            self._blocks.append(dict(
+                block_header(block),
+                hash=block_hash,
+                txids=[tx_hash(tx) for tx in transactions],
+                miner=transactions[0]['recipient'] if transactions else None,
+                reward=int(transactions[0]['amount']) if transactions else 0
+            ))
+            for tx in transactions:
+                self._dirty_addresses.update((tx['sender'], tx['recipient']))
+            self._schedule()
+
+    def _schedule(self):
+        """
+        Programa el envío al final de la ventana actual (requiere el candado tomado).
+        """
+        if self.interval <= 0:
+            threading.Thread(target=self.flush, daemon=True).start()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """
+        Emite los deltas acumulados.
+        """
+        with self._lock:
+            self._timer = None
+            transactions, self._transactions = self._transactions, []
+            removed, self._removed = self._removed, []
+            blocks, self._blocks = self._blocks, []
+            addresses, self._dirty_addresses = self._dirty_addresses, set()
+            resync, self._resync = self._resync, False
+
+        if resync:
+            self._emit('estado_reiniciado', {'height': self.blockchain.height, 'tip_hash': self.blockchain.tip_hash})
+            return
+
+        addresses.discard("SYSTEM")
+        balances = {address: self.blockchain.get_balance(address) for address in addresses}
+
+        if blocks:
+            tip = blocks[-1]
+            self._emit('bloque_minado', {
+                'index': tip['index'],
+                'miner': tip['miner'],
+                'blocks': blocks,
+                'transactions': transactions,
+                'removed': removed,
+                'balances': balances
+            })
+        elif transactions or removed:
+            self._emit('actualizacion_mempool', {
+                'msg': f'{len(transactions)} transacciones pendientes nuevas, {len(removed)} retiradas',
+                'transactions': transactions,
+                'removed': removed,
+                'balances': balances
+            })
+
+        # Sala de cada dirección: su saldo y solo las transacciones que la involucran (agrupadas en una pasada)
+        related = {}
+        for tx in transactions:
+            related.setdefault(tx['sender'], []).append(tx)
+            if tx['recipient'] != tx['sender']:
+                related.setdefault(tx['recipient'], []).append(tx)
+        for address, balance in balances.items():
+            self._emit('saldo_actualizado', {'address': address, 'balance': balance,
+                                             'transactions': related.get(address, [])},
+                       to=address_room(address))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# ==========================================
+# CACHÉ DE RESPUESTAS VERSIONADA
+# ==========================================
+# Memoria máxima de las respuestas guardadas (bytes ya codificados) y tamaño máximo de una respuesta
+# cacheable: las mayores (p. ej. /chain completa de una cadena larga) se sirven sin guardarse.
+RESPONSE_CACHE_BYTES = int(os.environ.get('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ITEM_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ITEM_BYTES', 8 * 1024 * 1024))
+
+CACHE_LOOKUPS = metrics.counter('response_cache_lookups_total', 'Consultas a la caché de respuestas por resultado.',
+                                ('endpoint', 'result'))
+
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas ya serializadas (bytes JSON), acotada en memoria.
+    Cada entrada se guarda con la versión del estado del que se derivó: una consulta con otra versión es
+    un fallo y la reemplaza, así que una mutación invalida exactamente las respuestas que dependen de ella
+    y nunca conviven dos versiones de la misma respuesta. La versión debe leerse antes de construir la
+    respuesta: si entre medias hay una mutación, la entrada queda bajo una versión ya superada.
+    """
+
+    def __init__(self, max_bytes: int = None, max_item_bytes: int = None):
+        self.max_bytes = RESPONSE_CACHE_BYTES if max_bytes is None else max_bytes
+        self.max_item_bytes = RESPONSE_CACHE_MAX_ITEM_BYTES if max_item_bytes is None else max_item_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Aciertos y fallos por endpoint: {endpoint: [aciertos, fallos]}
+        self._lookups = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(self, endpoint: str, key, version, build) -> bytes:
+        """
+        Respuesta guardada para (endpoint, key) en esta versión del estado; si no la hay, se construye con
+        build() (que retorna los bytes) y se guarda.
+        """
+        cache_key = (endpoint, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            lookups = self._lookups.setdefault(endpoint, [0, 0])
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(cache_key)
+                lookups[0] += 1
+                if metrics.METRICS_ENABLED:
+                    CACHE_LOOKUPS.inc(1, endpoint, 'hit')
+                return entry[1]
+            lookups[1] += 1
+        if metrics.METRICS_ENABLED:
+            CACHE_LOOKUPS.inc(1, endpoint, 'miss')
+        body = build()
+        self.put(cache_key, version, body)
+        return body
+
+    def put(self, cache_key: tuple, version, body: bytes):
+        with self._lock:
+            previous = self._entries.pop(cache_key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            if len(body) > self.max_item_bytes:
+                return
+            self._entries[cache_key] = (version, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Entradas, memoria ocupada y aciertos/fallos por endpoint (con su tasa de aciertos).
+        """
+        with self._lock:
+            endpoints = {
+                endpoint: {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 4)}
+                for endpoint, (hits, misses) in self._lookups.items()
+            }
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'endpoints': endpoints}
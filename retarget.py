@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import math
+import os
+
+# ==========================================
+# CONFIGURACIÓN DEL AJUSTE DE DIFICULTAD
+# ==========================================
+# Tiempo objetivo entre bloques (segundos)
+TARGET_BLOCK_TIME = float(os.environ.get('TARGET_BLOCK_TIME', 10))
+# Cada cuántos bloques se recalcula el objetivo
+RETARGET_INTERVAL = int(os.environ.get('RETARGET_INTERVAL', 10))
+# Factor máximo de ajuste por ventana (en ambos sentidos), como en Bitcoin
+MAX_ADJUSTMENT = 4
+# El timestamp de un bloque debe superar la mediana de los de los MEDIAN_TIME_SPAN bloques anteriores
+# (median-time-past) y no adelantarse más de MAX_FUTURE_BLOCK_TIME segundos al reloj del nodo que lo
+# recibe. Sin estas reglas un par podría estirar el intervalo de una ventana y dividir la dificultad.
+MEDIAN_TIME_SPAN = 11
+MAX_FUTURE_BLOCK_TIME = float(os.environ.get('MAX_FUTURE_BLOCK_TIME', 120))
+
+# Los bloques anteriores a la versión 3 exigían 4 ceros hexadecimales iniciales: hash < 16^60
+LEGACY_DIFFICULTY = 4
+LEGACY_TARGET = 16 ** (64 - LEGACY_DIFFICULTY) - 1
+# Objetivo del Génesis y de la primera ventana (equivale a la dificultad histórica)
+INITIAL_TARGET = LEGACY_TARGET
+# Objetivo más fácil admitido (límite de la prueba de trabajo: al menos un byte inicial a cero)
+MAX_TARGET = 2 ** 248 - 1
+
+
+def encode_target(target: int) -> str:
+    """
+    Representación del objetivo en la cabecera: 64 caracteres hexadecimales (256 bits).
+    """
+    return f"{target:064x}"
+
+
+def block_target(header: dict) -> int:
+    """
+    Objetivo que debe cumplir el hash de un bloque: el declarado en su cabecera (v3)
+    o el objetivo histórico de 4 ceros (v1/v2).
+    """
+    if header.get('version', 1) >= 3:
+        return int(header['target'], 16)
+    return LEGACY_TARGET
+
+
+def meets_target(block_hash: str, target: int) -> bool:
+    """
+    Comparación numérica del hash (como entero de 256 bits) contra el objetivo.
+    """
+    return int(block_hash, 16) <= target
+
+
+def difficulty_of(target: int) -> float:
+    """
+    Dificultad expresada en ceros hexadecimales iniciales equivalentes (4.0 para el objetivo histórico).
+    """
+    return 64 - math.log2(target + 1) / 4
+
+
+def next_target(header_at, height: int) -> int:
+    """
+    Objetivo exigido al bloque de altura 'height' (base 1); header_at(h) retorna la cabecera de la altura h.
+    Se mantiene el del bloque anterior salvo cada RETARGET_INTERVAL bloques, donde se escala por el
+    tiempo real de la última ventana frente a RETARGET_INTERVAL * TARGET_BLOCK_TIME (con el cambio
+    acotado a MAX_ADJUSTMENT). Solo usa enteros y los timestamps de las cabeceras, por lo que todos
+    los nodos obtienen el mismo resultado.
+    """
+    if height <= 1:
+        return INITIAL_TARGET
+    last_height = height - 1
+    last = header_at(last_height)
+    target = block_target(last)
+    if last_height % RETARGET_INTERVAL or last_height <= RETARGET_INTERVAL:
+        return target
+
+    first = header_at(last_height - RETARGET_INTERVAL)
+    expected = RETARGET_INTERVAL * TARGET_BLOCK_TIME
+    span = min(max(last['timestamp'] - first['timestamp'], expected / MAX_ADJUSTMENT), expected * MAX_ADJUSTMENT)
+    return max(1, min(MAX_TARGET, target * int(span * 1000) // int(expected * 1000)))
+
+
+def valid_target(header_at, height: int) -> bool:
+    """
+    Reglas de dificultad de la cabecera de altura 'height' (la prueba de trabajo se comprueba aparte):
+    la versión no puede retroceder (una vez adoptada la v3 no se aceptan bloques con el objetivo fijo)
+    y el objetivo declarado en un bloque v3 debe ser el que dicta next_target.
+    """
+    header = header_at(height)
+    version = header.get('version', 1)
+    if height > 1 and version < header_at(height - 1).get('version', 1):
+        return False
+    if version < 3:
+        return True
+    return block_target(header) == next_target(header_at, height)
+
+
+def median_time_past(header_at, height: int) -> float:
+    """
+    Mediana de los timestamps de los MEDIAN_TIME_SPAN bloques anteriores a la altura 'height' (> 1).
+    """
+    timestamps = sorted(header_at(h)['timestamp'] for h in range(max(1, height - MEDIAN_TIME_SPAN), height))
+    return timestamps[len(timestamps) // 2]
+
+
+def valid_timestamp(header_at, height: int, now: float) -> bool:
+    """
+    Reglas de tiempo de la cabecera de altura 'height': un número finito, posterior a la mediana de los
+    bloques anteriores y no más de MAX_FUTURE_BLOCK_TIME segundos por delante de 'now'.
+    """
+    timestamp = header_at(height)['timestamp']
+    if type(timestamp) not in (int, float) or not math.isfinite(timestamp):
+        return False
+    if timestamp > now + MAX_FUTURE_BLOCK_TIME:
+        return False
+    return height <= 1 or timestamp > median_time_past(header_at, height)
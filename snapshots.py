@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import zlib
+from time import time
+
+from stats import ChainStats
+
+# ==========================================
+# INSTANTÁNEAS DEL ESTADO
+# ==========================================
+# Cada cuántos bloques se guarda una instantánea del estado (0 = desactivado)
+SNAPSHOT_INTERVAL = int(os.environ.get('SNAPSHOT_INTERVAL', 1000))
+# Número de instantáneas que se conservan (las más antiguas se borran)
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 3))
+SNAPSHOT_FORMAT = 1
+
+SQL_INSERT_SNAPSHOT = '''
+    INSERT OR REPLACE INTO snapshots (height, tip_hash, state_hash, created_at, data) VALUES (?, ?, ?, ?, ?)
+'''
+SQL_SELECT_SNAPSHOTS = '''
+    SELECT height, tip_hash, state_hash, created_at, LENGTH(data) AS size FROM snapshots ORDER BY height DESC
+'''
+SQL_SELECT_SNAPSHOT = 'SELECT height, tip_hash, state_hash, created_at, data FROM snapshots WHERE height = ?'
+# La instantánea en la altura podada nunca se borra: es la base de las estadísticas si hay que reconstruirlas
+SQL_DELETE_OLD_SNAPSHOTS = '''
+    DELETE FROM snapshots WHERE height NOT IN (SELECT height FROM snapshots ORDER BY height DESC LIMIT ?)
+        AND height IS NOT (SELECT pruned_height FROM prune_state WHERE id = 1)
+'''
+SQL_DELETE_SNAPSHOTS_ABOVE = 'DELETE FROM snapshots WHERE height > ?'
+
+
+def decode_snapshot(data: bytes, state_hash: str = None) -> dict:
+    """
+    Descomprime una instantánea y, si se indica state_hash, comprueba que es el SHA-256 de su contenido.
+    Lanza ValueError si los datos están corruptos o el hash no coincide.
+    """
+    try:
+        raw = zlib.decompress(data)
+    except zlib.error as exc:
+        raise ValueError(f"Instantánea corrupta: {exc}")
+    if state_hash is not None and hashlib.sha256(raw).hexdigest() != state_hash:
+        raise ValueError("El hash de la instantánea no coincide con su contenido.")
+    return json.loads(raw)
+
+
+class SnapshotStore:
+    """
+    Instantáneas periódicas del estado derivado de la cadena en la tabla 'snapshots': saldos y actividad
+    por dirección, estadísticas de mineros y la cabecera de la punta a esa altura.
+    El contenido es JSON canónico comprimido con zlib; 'state_hash' es el SHA-256 del JSON sin comprimir,
+    de modo que quien la descargue (GET /network/snapshots/<altura>) puede verificarla antes de usarla.
+    Al arrancar (o tras una reorganización) las estadísticas se reconstruyen desde la última instantánea
+    local que pertenece a la cadena actual, recorriendo solo los bloques posteriores.
+    Alcance: solo se usan las instantáneas propias. Un nodo nuevo no arranca desde la instantánea de un
+    par; sigue descargando y validando la cadena completa (PeerNetwork.sync_with) y las estadísticas se
+    derivan de esos bloques.
+    """
+
+    def __init__(self, storage, interval: int = None, keep: int = None):
+        self.storage = storage
+        self.interval = SNAPSHOT_INTERVAL if interval is None else interval
+        self.keep = keep or SNAPSHOT_KEEP
+
+    def due(self, height: int) -> bool:
+        """
+        True si al alcanzar esta altura corresponde guardar una instantánea.
+        """
+        return self.interval > 0 and height > 0 and height % self.interval == 0
+
+    def create(self, chain) -> dict:
+        """
+        Guarda una instantánea de las estadísticas confirmadas. Se leen en una sola transacción de lectura,
+        así que es coherente aunque entre tanto se añadan bloques; su altura es la de esas estadísticas.
+        Retorna sus metadatos, o None si las estadísticas no corresponden a la cadena en memoria
+        (p. ej. por una reorganización en curso).
+        """
+        with self.storage.snapshot() as conn:
+            row = conn.execute('SELECT height, tip_hash FROM stats_state WHERE id = 1').fetchone()
+            if row is None:
+                return None
+            height, tip_hash = row
+            addresses, miners = ChainStats.export(conn)
+        if not 0 < height <= len(chain) or chain.hash_at(height - 1) != tip_hash:
+            return None
+
+        payload = {
+            'format': SNAPSHOT_FORMAT,
+            'height': height,
+            'tip_hash': tip_hash,
+            'tip_header': chain.header(height - 1),
+            'addresses': addresses,
+            'miners': miners,
+        }
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+        meta = {'height': height, 'tip_hash': tip_hash, 'state_hash': hashlib.sha256(raw).hexdigest(),
+                'created_at': time()}
+        data = zlib.compress(raw, 6)
+        with self.storage.write() as cursor:
+            cursor.execute(SQL_INSERT_SNAPSHOT, (height, tip_hash, meta['state_hash'], meta['created_at'], data))
+            cursor.execute(SQL_DELETE_OLD_SNAPSHOTS, (self.keep,))
+        meta['size'] = len(data)
+        return meta
+
+    def list(self) -> list:
+        """
+        Metadatos de las instantáneas guardadas, de la más reciente a la más antigua.
+        """
+        return [dict(row) for row in self.storage.query(SQL_SELECT_SNAPSHOTS)]
+
+    def raw(self, height: int) -> tuple[dict, bytes]:
+        """
+        (metadatos, datos comprimidos) de la instantánea de esa altura, o (None, None).
+        """
+        rows = self.storage.query(SQL_SELECT_SNAPSHOT, (height,))
+        if not rows:
+            return None, None
+        meta = {key: rows[0][key] for key in ('height', 'tip_hash', 'state_hash', 'created_at')}
+        return meta, bytes(rows[0]['data'])
+
+    def latest_on(self, chain, max_height: int = None) -> dict:
+        """
+        Contenido de la instantánea más reciente (como máximo de altura max_height) cuyo bloque pertenece
+        a la cadena indicada, ya verificado contra su hash. None si no hay ninguna utilizable.
+        """
+        for meta in self.list():
+            height = meta['height']
+            if max_height is not None and height > max_height:
+                continue
+            if height > len(chain) or chain.hash_at(height - 1) != meta['tip_hash']:
+                continue
+            try:
+                return decode_snapshot(self.raw(height)[1], meta['state_hash'])
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def delete_above(cursor, height: int):
+        """
+        Borra, dentro de la transacción BD indicada, las instantáneas por encima de una altura
+        (sus bloques dejan de pertenecer a la cadena al reorganizarla).
+        """
+        cursor.execute(SQL_DELETE_SNAPSHOTS_ABOVE, (height,))
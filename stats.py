@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+# ==========================================
+# ESTADÍSTICAS MATERIALIZADAS DE LA CADENA
+# ==========================================
+SQL_UPSERT_ADDRESS_STATS = '''
+    INSERT INTO address_stats (address, balance, tx_count, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(address) DO UPDATE SET
+        balance = balance + excluded.balance,
+        tx_count = tx_count + excluded.tx_count,
+        last_seen = excluded.last_seen
+'''
+SQL_UPSERT_MINER_STATS = '''
+    INSERT INTO miner_stats (miner, rewards, blocks, first_block, last_block) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(miner) DO UPDATE SET
+        rewards = rewards + excluded.rewards,
+        blocks = blocks + excluded.blocks,
+        last_block = excluded.last_block
+'''
+SQL_UPDATE_STATS_STATE = 'INSERT OR REPLACE INTO stats_state (id, height, tip_hash) VALUES (1, ?, ?)'
+SQL_SELECT_STATS_STATE = 'SELECT height, tip_hash FROM stats_state WHERE id = 1'
+SQL_SELECT_BALANCES = 'SELECT address, balance FROM address_stats'
+SQL_SELECT_TOP_MINERS = 'SELECT miner, rewards FROM miner_stats ORDER BY rewards DESC, miner ASC LIMIT ?'
+SQL_SELECT_ADDRESS_STATS = 'SELECT address, balance, tx_count, first_seen, last_seen FROM address_stats WHERE address = ?'
+SQL_SELECT_MINER_STATS = 'SELECT rewards, blocks, first_block, last_block FROM miner_stats WHERE miner = ?'
+SQL_SELECT_ALL_ADDRESS_STATS = 'SELECT address, balance, tx_count, first_seen, last_seen FROM address_stats'
+SQL_SELECT_ALL_MINER_STATS = 'SELECT miner, rewards, blocks, first_block, last_block FROM miner_stats'
+
+
+def _block_deltas(block: dict) -> tuple[dict, tuple]:
+    """
+    Cambios que aporta un bloque: {dirección: [saldo, nº de transacciones]} y la recompensa
+    de minado como (minero, monto), o None en el Génesis.
+    """
+    addresses = {}
+    for tx in block['transactions']:
+        amount = int(tx['amount'])
+        for address, delta in ((tx['sender'], -amount), (tx['recipient'], amount)):
+            entry = addresses.setdefault(address, [0, 0])
+            entry[0] += delta
+        addresses[tx['sender']][1] += 1
+        if tx['recipient'] != tx['sender']:
+            addresses[tx['recipient']][1] += 1
+
+    reward = None
+    coinbase = block['transactions'][0] if block['transactions'] else None
+    if block['index'] > 1 and coinbase and coinbase['sender'] == "SYSTEM":
+        reward = (coinbase['recipient'], int(coinbase['amount']))
+    return addresses, reward
+
+
+class ChainStats:
+    """
+    Estadísticas de la cadena persistidas en SQLite y actualizadas bloque a bloque:
+    recompensas y bloques por minero (tabla 'miner_stats', indexada por recompensas) y, por
+    dirección, saldo confirmado, número de transacciones y alturas de primera/última aparición
+    (tabla 'address_stats'). 'stats_state' guarda hasta qué bloque están aplicadas.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        # Cambia con cada recálculo completo (p. ej. tras una reorganización, que actualiza la cadena en memoria
+        # antes de recalcular): junto con la punta, versiona las vistas derivadas de estas tablas
+        self.generation = 0
+
+    def apply_block(self, cursor, block: dict, block_hash: str):
+        """
+        Aplica un bloque dentro de la transacción BD abierta por quien lo persiste.
+        """
+        height = block['index']
+        addresses, reward = _block_deltas(block)
+        cursor.executemany(SQL_UPSERT_ADDRESS_STATS, [
+            (address, balance, tx_count, height, height) for address, (balance, tx_count) in addresses.items()
+        ])
+        if reward:
+            cursor.execute(SQL_UPSERT_MINER_STATS, (reward[0], reward[1], 1, height, height))
+        cursor.execute(SQL_UPDATE_STATS_STATE, (height, block_hash))
+
+    def rebuild(self, chain, base: dict = None) -> dict:
+        """
+        Recalcula todas las estadísticas recorriendo la cadena (al migrar o tras una reorganización).
+        Con base (una instantánea de snapshots.SnapshotStore, de un bloque de esta misma cadena) se parte
+        de su estado y solo se recorren los bloques posteriores a su altura.
+        Retorna los saldos confirmados por dirección.
+        """
+        if base is None:
+            addresses, miners, start = {}, {}, 0
+        else:
+            addresses = {address: list(entry) for address, entry in base['addresses'].items()}
+            miners = {miner: list(entry) for miner, entry in base['miners'].items()}
+            start = base['height']
+        for block in chain.iter_blocks(start):
+            height = block['index']
+            block_addresses, reward = _block_deltas(block)
+            for address, (balance, tx_count) in block_addresses.items():
+                entry = addresses.get(address)
+                if entry is None:
+                    addresses[address] = [balance, tx_count, height, height]
+                else:
+                    entry[0] += balance
+                    entry[1] += tx_count
+                    entry[3] = height
+            if reward:
+                entry = miners.get(reward[0])
+                if entry is None:
+                    miners[reward[0]] = [reward[1], 1, height, height]
+                else:
+                    entry[0] += reward[1]
+                    entry[1] += 1
+                    entry[3] = height
+
+        with self.storage.write() as cursor:
+            cursor.execute('DELETE FROM address_stats')
+            cursor.execute('DELETE FROM miner_stats')
+            cursor.executemany(SQL_UPSERT_ADDRESS_STATS, [(address, *entry) for address, entry in addresses.items()])
+            cursor.executemany(SQL_UPSERT_MINER_STATS, [(miner, *entry) for miner, entry in miners.items()])
+            if len(chain):
+                cursor.execute(SQL_UPDATE_STATS_STATE, (len(chain), chain.hash_at(-1)))
+        self.generation += 1
+        return {address: entry[0] for address, entry in addresses.items()}
+
+    @staticmethod
+    def export(conn) -> tuple[dict, dict]:
+        """
+        Contenido completo de las tablas con la conexión indicada (p. ej. la de Storage.snapshot()):
+        ({dirección: [saldo, nº tx, primera, última]}, {minero: [recompensas, bloques, primero, último]}).
+        """
+        addresses = {row[0]: list(row[1:]) for row in conn.execute(SQL_SELECT_ALL_ADDRESS_STATS)}
+        miners = {row[0]: list(row[1:]) for row in conn.execute(SQL_SELECT_ALL_MINER_STATS)}
+        return addresses, miners
+
+    def state(self) -> tuple:
+        """
+        (altura, hash) del último bloque aplicado, o (0, None) si las tablas están vacías.
+        """
+        rows = self.storage.query(SQL_SELECT_STATS_STATE)
+        return (rows[0]['height'], rows[0]['tip_hash']) if rows else (0, None)
+
+    def balances(self) -> dict:
+        """
+        Saldos confirmados de todas las direcciones.
+        """
+        return {row['address']: row['balance'] for row in self.storage.query(SQL_SELECT_BALANCES)}
+
+    def top_miners(self, limit: int = None) -> list:
+        """
+        Mineros ordenados por recompensas (recorre el índice idx_miner_stats_rewards, sin escanear la cadena).
+        """
+        return [(row['miner'], row['rewards']) for row in self.storage.query(SQL_SELECT_TOP_MINERS, (limit or -1,))]
+
+    def address(self, address: str) -> dict:
+        """
+        Estadísticas de una dirección (y de su actividad como minero), o None si nunca apareció.
+        Ambas tablas se leen en la misma instantánea, aunque entre medias se confirme un bloque.
+        """
+        with self.storage.snapshot() as conn:
+            rows = conn.execute(SQL_SELECT_ADDRESS_STATS, (address,)).fetchall()
+            if not rows:
+                return None
+            stats = dict(rows[0])
+            miner_rows = conn.execute(SQL_SELECT_MINER_STATS, (address,)).fetchall()
+        stats['mining'] = dict(miner_rows[0]) if miner_rows else None
+        return stats
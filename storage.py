@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from urllib.parse import quote
+from time import perf_counter
+
+import metrics
+
+# ==========================================
+# CONFIGURACIÓN DE LA CAPA DE PERSISTENCIA
+# ==========================================
+# Nivel de sincronización de SQLite: OFF | NORMAL | FULL | EXTRA
+# En modo WAL, NORMAL solo pierde las últimas transacciones ante un corte de energía, nunca corrompe la BD.
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+# Group commit del mempool: se vacía la cola cada N milisegundos o al acumular M filas.
+# Con GROUP_COMMIT_INTERVAL_MS=0 cada inserción se confirma de inmediato (comportamiento clásico).
+# Cada admisión responde cuando su lote está confirmado (Storage.wait_committed), no al encolarse.
+GROUP_COMMIT_INTERVAL_MS = int(os.environ.get('GROUP_COMMIT_INTERVAL_MS', 10))
+GROUP_COMMIT_MAX_ROWS = int(os.environ.get('GROUP_COMMIT_MAX_ROWS', 256))
+# Conexiones de solo lectura que se mantienen abiertas para las consultas. En modo WAL cada lectura ve
+# una instantánea confirmada y no espera a la conexión de escritura. Con 0 todas las consultas usan la
+# conexión compartida (comportamiento clásico; también en las BD ':memory:').
+SQLITE_READ_CONNECTIONS = int(os.environ.get('SQLITE_READ_CONNECTIONS', 8))
+
+# Sentencias SQL reutilizadas: sqlite3 mantiene en caché la sentencia preparada de cada texto idéntico
+SQL_INSERT_BLOCK = 'INSERT INTO blocks ("index", block_data, header_data, hash) VALUES (?, ?, ?, ?)'
+SQL_INSERT_MEMPOOL = 'INSERT INTO mempool (id, tx_data) VALUES (?, ?)'
+SQL_DELETE_MEMPOOL_BY_ID = "DELETE FROM mempool WHERE id = ?"
+SQL_DELETE_BLOCKS_ABOVE = 'DELETE FROM blocks WHERE "index" > ?'
+
+# Duración de las operaciones SQLite (operation: query | write, incluye la espera del candado y el commit)
+SQLITE_SECONDS = metrics.histogram('sqlite_operation_seconds', 'Duración de las operaciones SQLite.', ('operation',))
+
+
+def read_only_uri(path: str) -> str:
+    """
+    URI de SQLite para abrir la BD en solo lectura. La ruta se hace absoluta y se escapa, de modo que
+    no depende del directorio de trabajo y los caracteres '?', '#' o '%' del nombre no se lean como
+    parámetros de la URI.
+    """
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
+
+
+class Storage:
+    """
+    Capa de persistencia SQLite de la blockchain.
+    Usa journaling WAL, sentencias preparadas reutilizadas y un escritor de group commit que
+    agrupa las inserciones del mempool en una sola transacción (un solo fsync por lote).
+    Las escrituras pasan por una única conexión; las consultas usan un conjunto de conexiones de
+    solo lectura, de modo que una lectura larga no bloquea a los escritores ni al revés.
+    """
+
+    def __init__(self, path: str, journal_mode: str = None, synchronous: str = None,
+                 group_commit_ms: int = None, group_commit_rows: int = None, read_connections: int = None):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        # Las BD nuevas se crean con auto_vacuum incremental: las páginas liberadas (Mempool vaciado, bloques
+        # podados) se devuelven al sistema de archivos poco a poco (ver incremental_vacuum). Debe fijarse
+        # antes que el modo WAL; en una BD existente no tiene efecto hasta enable_incremental_vacuum().
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode or SQLITE_JOURNAL_MODE}")
+        self.conn.execute(f"PRAGMA synchronous={synchronous or SQLITE_SYNCHRONOUS}")
+
+        self.group_commit_interval = (GROUP_COMMIT_INTERVAL_MS if group_commit_ms is None else group_commit_ms) / 1000
+        self.group_commit_rows = group_commit_rows or GROUP_COMMIT_MAX_ROWS
+
+        # Conexión de escritura compartida: todo acceso a self.conn pasa por este candado
+        self._lock = threading.RLock()
+        self._pending_mempool = []
+        self._wakeup = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._create_tables()
+        row = self.conn.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM mempool").fetchone()
+        # Los ids del mempool se asignan aquí, de modo que se conocen antes del group commit
+        self._next_mempool_id = row['max_id'] + 1
+        # Mayor id del mempool confirmado en disco (los ids se confirman en orden); ver wait_committed
+        self._committed_mempool_id = row['max_id']
+        self._committed = threading.Condition(self._lock)
+
+        read_connections = SQLITE_READ_CONNECTIONS if read_connections is None else read_connections
+        # Las lecturas concurrentes solo son posibles en modo WAL y sobre un archivo
+        if path == ':memory:' or (journal_mode or SQLITE_JOURNAL_MODE).upper() != 'WAL':
+            read_connections = 0
+        self._readers = LifoQueue()
+        self._reader_slots = threading.Semaphore(read_connections)
+        self._read_connections = read_connections
+
+        self._writer = None
+        if self.group_commit_interval > 0:
+            self._writer = threading.Thread(target=self._writer_loop, name='sqlite-group-commit', daemon=True)
+            self._writer.start()
+            # Al salir del proceso se confirma lo que quede en cola
+            atexit.register(self.flush)
+
+    def _create_tables(self):
+        """
+        Inicializa el esquema de base de datos si no existe.
+        Crea tablas para almacenar bloques confirmados (con su cabecera y hash), el mempool, las estadísticas,
+        las instantáneas del estado, los puntos de control y el estado de la poda de bloques.
+        """
+        with self.write() as cursor:
+            # block_data: texto JSON, o BLOB en el formato compacto de codec.py
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS blocks (
+                    "index" INTEGER PRIMARY KEY,
+                    block_data TEXT NOT NULL,
+                    header_data TEXT,
+                    hash TEXT
+                )
+            ''')
+            # Migración: las BD anteriores solo tenían block_data (ChainStore completa las columnas nuevas)
+            columns = {row['name'] for row in cursor.execute("PRAGMA table_info(blocks)")}
+            for column in ('header_data', 'hash'):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE blocks ADD COLUMN {column} TEXT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_blocks_hash ON blocks(hash)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS mempool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tx_data TEXT NOT NULL
+                )
+            ''')
+            # Estadísticas materializadas (ver stats.ChainStats)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS miner_stats (
+                    miner TEXT PRIMARY KEY,
+                    rewards INTEGER NOT NULL,
+                    blocks INTEGER NOT NULL,
+                    first_block INTEGER NOT NULL,
+                    last_block INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_miner_stats_rewards ON miner_stats(rewards DESC, miner)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS address_stats (
+                    address TEXT PRIMARY KEY,
+                    balance INTEGER NOT NULL,
+                    tx_count INTEGER NOT NULL,
+                    first_seen INTEGER NOT NULL,
+                    last_seen INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_address_stats_tx_count ON address_stats(tx_count DESC)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    height INTEGER NOT NULL,
+                    tip_hash TEXT NOT NULL
+                )
+            ''')
+            # Índice normalizado de transacciones confirmadas y de direcciones (ver tx_index.TransactionIndex)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS transactions (
+                    block_index INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    txid TEXT NOT NULL,
+                    sender TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    amount INTEGER NOT NULL,
+                    signature TEXT,
+                    timestamp REAL,
+                    PRIMARY KEY (block_index, position)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_txid ON transactions(txid)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS address_tx (
+                    address TEXT NOT NULL,
+                    block_index INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (address, block_index, position)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_address_tx_block ON address_tx(block_index)")
+            # Instantáneas del estado (ver snapshots.SnapshotStore): JSON comprimido y su SHA-256
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    height INTEGER PRIMARY KEY,
+                    tip_hash TEXT NOT NULL,
+                    state_hash TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    data BLOB NOT NULL
+                )
+            ''')
+            # Puntos de control de la validación incremental (altura y hash de la punta verificada)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    height INTEGER PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    verified_at REAL NOT NULL
+                )
+            ''')
+            # Poda (ver pruning.Pruner): los bloques de altura <= pruned_height solo conservan cabecera y hash
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS prune_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    pruned_height INTEGER NOT NULL
+                )
+            ''')
+            # Índice del archivo de bloques podados (ver pruning.BlockArchive): un fragmento comprimido por fila
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive_chunks (
+                    first_height INTEGER PRIMARY KEY,
+                    last_height INTEGER NOT NULL,
+                    file_offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                )
+            ''')
+
+    # ==========================================
+    #        TRANSACCIONES Y CONSULTAS
+    # ==========================================
+
+    @contextmanager
+    def write(self):
+        """
+        Abre una transacción de escritura atómica.
+        Antes de ejecutar la escritura se vuelcan las inserciones de mempool encoladas, de forma que
+        la inserción de un bloque y la limpieza del mempool siempre ven el mempool completo.
+        """
+        started = perf_counter()
+        with self._lock:
+            cursor = self.conn.cursor()
+            flushed, self._pending_mempool = self._pending_mempool, []
+            try:
+                if flushed:
+                    cursor.executemany(SQL_INSERT_MEMPOOL, flushed)
+                yield cursor
+                self.conn.commit()
+                if flushed:
+                    self._committed_mempool_id = flushed[-1][0]
+                    self._committed.notify_all()
+            except BaseException:
+                self.conn.rollback()
+                # Las inserciones revertidas vuelven a la cola para el siguiente lote
+                self._pending_mempool = flushed + self._pending_mempool
+                raise
+            finally:
+                if metrics.METRICS_ENABLED:
+                    SQLITE_SECONDS.observe(perf_counter() - started, 'write')
+
+    def query(self, sql: str, params: tuple = ()) -> list:
+        """
+        Ejecuta una consulta de lectura y retorna todas las filas.
+        Cada consulta ve el último estado confirmado (las inserciones de mempool aún en cola no).
+        """
+        if not metrics.METRICS_ENABLED:
+            with self._reader() as conn:
+                return conn.execute(sql, params).fetchall()
+        started = perf_counter()
+        with self._reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        SQLITE_SECONDS.observe(perf_counter() - started, 'query')
+        return rows
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Transacción de lectura: todas las consultas hechas con la conexión entregada ven la misma
+        instantánea de la BD, aunque entre medias se confirmen escrituras.
+        """
+        with self._reader() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+
+    @contextmanager
+    def _reader(self):
+        """
+        Presta una conexión de solo lectura (se abren bajo demanda, hasta SQLITE_READ_CONNECTIONS).
+        Sin conexiones de lectura se usa la conexión compartida con su candado.
+        """
+        if not self._read_connections:
+            with self._lock:
+                yield self.conn
+            return
+        with self._reader_slots:
+            try:
+                conn = self._readers.get_nowait()
+            except Empty:
+                conn = sqlite3.connect(read_only_uri(self.path), uri=True, check_same_thread=False,
+                                       cached_statements=256)
+                conn.row_factory = sqlite3.Row
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+
+    # ==========================================
+    #              COMPACTACIÓN EN LÍNEA
+    # ==========================================
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Migración: activa auto_vacuum incremental en una BD creada sin él. Requiere un VACUUM completo
+        (reescribe la BD una única vez y bloquea las escrituras mientras dura). Retorna True si se aplicó.
+        """
+        if self.path == ':memory:':
+            return False
+        self.flush()
+        with self._lock:
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+            return True
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        Devuelve al sistema de archivos como máximo 'pages' páginas libres, en una escritura corta.
+        Retorna las páginas liberadas (0 si no queda ninguna o la BD no usa auto_vacuum incremental).
+        """
+        with self.write() as cursor:
+            before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            if not before:
+                return 0
+            cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return before - cursor.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def checkpoint(self):
+        """
+        Checkpoint pasivo del WAL: copia a la BD las páginas confirmadas sin esperar a los lectores.
+        En modo WAL el archivo de la BD solo se acorta (tras incremental_vacuum) al hacer checkpoint.
+        """
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+
+    def disk_usage(self) -> dict:
+        """
+        Tamaño en bytes de la BD y de su WAL, y páginas libres pendientes de compactar.
+        """
+        usage = {'database': 0, 'wal': 0}
+        if self.path != ':memory:':
+            for key, suffix in (('database', ''), ('wal', '-wal')):
+                if os.path.exists(self.path + suffix):
+                    usage[key] = os.path.getsize(self.path + suffix)
+        rows = self.query("PRAGMA freelist_count")
+        usage['free_pages'] = rows[0][0]
+        return usage
+
+    # ==========================================
+    #           GROUP COMMIT DEL MEMPOOL
+    # ==========================================
+
+    def queue_mempool_insert(self, tx_string: str) -> int:
+        """
+        Encola la inserción de una transacción en el mempool y retorna el id asignado.
+        La fila se confirma en el siguiente lote del escritor (o de inmediato si no hay group commit):
+        quien deba confirmar la inserción como duradera espera con wait_committed.
+        """
+        with self._lock:
+            row_id = self._next_mempool_id
+            self._next_mempool_id += 1
+            self._pending_mempool.append((row_id, tx_string))
+            queued = len(self._pending_mempool)
+
+        if self._writer is None:
+            self.flush()
+        elif queued >= self.group_commit_rows:
+            with self._wakeup:
+                self._wakeup.notify()
+        return row_id
+
+    def wait_committed(self, row_id: int):
+        """
+        Espera a que la fila del mempool row_id (y todas las anteriores) esté confirmada en disco.
+        Es la espera del group commit: cada llamante vuelve cuando se confirma el lote que contiene su fila.
+        """
+        with self._committed:
+            self._committed.wait_for(lambda: self._committed_mempool_id >= row_id)
+
+    def insert_mempool_batch(self, tx_strings: list) -> list:
+        """
+        Inserta varias transacciones en el mempool dentro de una única transacción BD.
+        Retorna los ids asignados.
+        """
+        with self._lock:
+            row_ids = list(range(self._next_mempool_id, self._next_mempool_id + len(tx_strings)))
+            self._next_mempool_id += len(tx_strings)
+            self._pending_mempool.extend(zip(row_ids, tx_strings))
+            with self.write():
+                pass
+        return row_ids
+
+    def flush(self):
+        """
+        Confirma en disco todas las inserciones de mempool encoladas.
+        """
+        with self._lock:
+            if not self._pending_mempool:
+                return
+            with self.write():
+                pass
+
+    def _writer_loop(self):
+        """
+        Hilo escritor: vacía la cola cada intervalo o cuando se alcanza el tamaño de lote.
+        """
+        while not self._closed:
+            with self._wakeup:
+                self._wakeup.wait(self.group_commit_interval)
+            self.flush()
+
+    def close(self):
+        """
+        Detiene el escritor, confirma lo pendiente y cierra la conexión.
+        """
+        self._closed = True
+        if self._writer is not None:
+            with self._wakeup:
+                self._wakeup.notify()
+            self._writer.join()
+        self.flush()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self.conn.close()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from blockchain import Blockchain
+from keys import Keys
+
+
+@pytest.fixture
+def blockchain(tmp_path):
+    """
+    Nodo sobre una BD temporal (solo el Bloque Génesis).
+    """
+    node = Blockchain(db_path=str(tmp_path / 'chain.db'))
+    yield node
+    node.miner.shutdown()
+    node.storage.close()
+
+
+@pytest.fixture
+def funded_key(blockchain):
+    """
+    Par de llaves (privada, pública) con 100 unidades confirmadas del Faucet.
+    """
+    private_key, public_key = Keys.generate_key_pair()
+    assert blockchain.issue_faucet_funds(public_key, 100)[0]
+    blockchain.mine_block('test-miner')
+    return private_key, public_key
+
+
+def signed(private_key: str, public_key: str, recipient: str, amount: int) -> tuple:
+    """
+    (sender_pub, recipient, amount, signature) firmada como la firmaría un cliente.
+    """
+    digest = Blockchain._transaction_digest(public_key, recipient, amount)
+    return public_key, recipient, amount, Keys.sign_digest(private_key, digest)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from blockchain import Blockchain, FOUNDER_ADDRESS, GENESIS_SUPPLY, MINING_REWARD
+from conftest import signed
+
+
+@pytest.fixture
+def history(blockchain, funded_key):
+    """
+    Bloque 2: Faucet de 100 (minado por 'test-miner'); bloque 3: 30 a 'bob' (minado por 'alice');
+    bloque 4: vacío (minado por 'alice'). Retorna la llave pública con fondos.
+    """
+    assert blockchain.new_transaction(*signed(*funded_key, 'bob', 30))[0]
+    blockchain.mine_block('alice')
+    blockchain.mine_block('alice')
+    return funded_key[1]
+
+
+def test_summary(blockchain, history):
+    summary = blockchain.analytics.summary()
+    assert blockchain.analytics.height == 4
+    assert {key: summary[key] for key in ('first_height', 'height', 'blocks', 'transactions', 'addresses')} == {
+        'first_height': 1, 'height': 4, 'blocks': 4, 'transactions': 2, 'addresses': 5}
+    assert (summary['volume'], summary['rewards']) == (130, 3 * MINING_REWARD)
+    assert summary['issued'] == GENESIS_SUPPLY + 3 * MINING_REWARD
+    assert summary['first_timestamp'] <= summary['last_timestamp'] == blockchain.last_block['timestamp']
+
+
+def test_volume_series(blockchain, history):
+    assert blockchain.analytics.volume_series(blocks_per_bucket=2) == {
+        'start': [1, 3], 'blocks': [2, 2], 'transactions': [1, 1], 'volume': [100, 30],
+        'rewards': [MINING_REWARD, 2 * MINING_REWARD]}
+    assert blockchain.analytics.volume_series(blocks_per_bucket=1, start=3, stop=3) == {
+        'start': [3], 'blocks': [1], 'transactions': [1], 'volume': [30], 'rewards': [MINING_REWARD]}
+    assert blockchain.analytics.volume_series(blocks_per_bucket=1, start=5)['blocks'] == []
+    # Un intervalo de tiempo que abarca toda la historia agrega todos los bloques
+    series = blockchain.analytics.volume_series(seconds_per_bucket=3600)
+    assert (series['blocks'], series['volume']) == ([4], [130])
+
+
+def test_top_addresses_by_each_criterion(blockchain, history):
+    top = blockchain.analytics.top_addresses
+    assert top('sent') == [(FOUNDER_ADDRESS, 100), (history, 30)]
+    assert top('received', 1) == [(FOUNDER_ADDRESS, GENESIS_SUPPLY)]
+    assert top('rewards') == [('alice', 2 * MINING_REWARD), ('test-miner', MINING_REWARD)]
+    assert top('transactions') == sorted([(history, 2), (FOUNDER_ADDRESS, 1), ('bob', 1)],
+                                         key=lambda item: (-item[1], item[0]))
+    assert dict(top('balance')) == {address: balance for address, balance in blockchain.stats.balances().items()
+                                    if balance > 0}
+    with pytest.raises(ValueError):
+        top('fees')
+
+
+def test_rollback_after_reorganisation(blockchain, history, tmp_path):
+    assert blockchain.analytics.top_addresses('rewards')[0][0] == 'alice'
+    peer = Blockchain(db_path=str(tmp_path / 'peer.db'))
+    try:
+        for _ in range(5):
+            peer.mine_block('peer-miner')
+        assert blockchain.replace_suffix(0, peer.get_blocks(0))[0]
+        assert blockchain.analytics.summary() == peer.analytics.summary()
+        assert blockchain.analytics.top_addresses('rewards') == [('peer-miner', 5 * MINING_REWARD)]
+        assert blockchain.analytics.top_addresses('sent') == []
+    finally:
+        peer.miner.shutdown()
+        peer.storage.close()
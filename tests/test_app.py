@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from merkle import tx_hash, verify_inclusion
+
+
+@pytest.fixture(scope='module')
+def node(tmp_path_factory):
+    """
+    Módulo app.py (nodo completo), con su BD en un directorio temporal.
+    """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp('node'))
+        import app
+        yield app
+        app.blockchain.miner.shutdown()
+        app.blockchain.storage.close()
+
+
+@pytest.fixture
+def client(node):
+    return node.app.test_client()
+
+
+@pytest.mark.parametrize('seconds', ['nan', 'inf', '-inf', '0', '-5', 'abc'])
+def test_analytics_volume_rejects_invalid_seconds(client, seconds):
+    response = client.get(f'/analytics/volume?seconds={seconds}')
+    assert response.status_code == 400
+    assert 'inválido' in response.get_json()['message']
+
+
+def test_analytics_volume_by_seconds(client):
+    response = client.get('/analytics/volume?seconds=60')
+    assert response.status_code == 200
+    assert response.get_json()['bucket'] == 'seconds'
+
+
+def test_chain_etag_depends_on_negotiated_format(node, client):
+    node.blockchain.mine_block('miner')
+    as_json = client.get('/chain')
+    as_ndjson = client.get('/chain', headers={'Accept': 'application/x-ndjson'})
+    assert as_ndjson.mimetype == 'application/x-ndjson'
+    assert as_json.headers['ETag'] != as_ndjson.headers['ETag']
+    assert 'Accept' in as_json.headers['Vary'] and 'Accept' in as_ndjson.headers['Vary']
+    # El ETag de la representación JSON no valida la NDJSON (ni al revés)
+    response = client.get('/chain', headers={'Accept': 'application/x-ndjson', 'If-None-Match': as_json.headers['ETag']})
+    assert response.status_code == 200
+    response = client.get('/chain', headers={'If-None-Match': as_json.headers['ETag']})
+    assert response.status_code == 304 and 'Accept' in response.headers['Vary']
+
+
+def test_chain_body_matches_the_tip_of_its_etag(node, client, monkeypatch):
+    node.blockchain.mine_block('miner')
+    length, tip_hash, generation = node.blockchain.state_version
+    node.blockchain.mine_block('miner')
+    # Simula un bloque confirmado entre la lectura de la punta y la de los bloques
+    monkeypatch.setattr(type(node.blockchain), 'state_version', property(lambda self: (length, tip_hash, generation)))
+
+    response = client.get('/chain?from=1')
+    body = response.get_json()
+    assert response.headers['ETag'].strip('"').startswith(tip_hash)
+    assert len(body['chain']) == body['length'] == length
+    assert body['next_from'] is None
+    lines = client.get('/chain?format=ndjson').get_data(as_text=True).splitlines()
+    assert len(lines) == length
+
+
+def test_proof_endpoint(node, client):
+    assert node.blockchain.issue_faucet_funds('light-client', 5)[0]
+    block, _ = node.blockchain.mine_block('miner')
+    node.blockchain.mine_block('miner')
+    txid = tx_hash(block['transactions'][1])
+
+    response = client.get(f'/proof/{txid}?headers=2')
+    assert response.status_code == 200
+    proof = response.get_json()
+    assert len(proof['headers']) == 2
+    assert verify_inclusion(proof, trusted_hash=node.blockchain.tip_hash)[0]
+    assert client.get(f'/proof/{txid}?headers=x').status_code == 400
+    assert client.get(f"/proof/{'ff' * 32}").status_code == 404
+
+
+def test_cached_endpoints_follow_every_change(node, client, tmp_path):
+    from blockchain import Blockchain
+    from keys import Keys
+
+    balances = client.get('/balances').get_json()
+    assert client.get('/mempool').get_json() == client.get('/mempool').get_json()
+
+    # Transacción nueva: cambia el mempool y, al minarse, los saldos, la cadena y los líderes
+    _, public_key = Keys.generate_key_pair()
+    assert node.blockchain.issue_faucet_funds(public_key, 7)[0]
+    assert any(tx['recipient'] == public_key for tx in client.get('/mempool').get_json())
+    length = client.get('/chain').get_json()['length']
+    node.blockchain.mine_block('cache-miner')
+    assert client.get('/mempool').get_json() == []
+    assert client.get('/balances').get_json()[public_key] == 7
+    assert client.get('/balances').get_json() != balances
+    assert client.get('/chain').get_json()['length'] == length + 1
+    assert 'cache-miner' in client.get('/leaders').get_json()
+
+    # Reorganización hacia una cadena más larga de otro nodo
+    peer = Blockchain(db_path=str(tmp_path / 'peer.db'))
+    try:
+        for _ in range(node.blockchain.state_version[0] + 1):
+            peer.mine_block('peer-miner')
+        assert node.blockchain.replace_suffix(0, peer.get_blocks(0))[0]
+        assert client.get('/leaders').get_json() == peer.get_leaders()
+        assert client.get('/chain').get_json()['length'] == peer.state_version[0]
+        assert client.get('/balances').get_json().get(public_key, 0) == 0
+    finally:
+        peer.miner.shutdown()
+        peer.storage.close()
+
+    # Registro de alias
+    assert 'cache-alias' not in client.get('/aliases').get_json()
+    response = client.post('/register_alias', json={'alias': 'cache-alias', 'public_key': public_key})
+    assert response.status_code == 201
+    assert client.get('/aliases').get_json()['cache-alias'] == public_key
+
+
+def test_metrics_endpoint(client):
+    client.get('/health')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    text = response.get_data(as_text=True)
+    assert '# TYPE blockchain_block_commit_seconds histogram' in text
+    assert 'route="/health"' in text
+
+
+def test_profile_endpoint(node, client, monkeypatch):
+    monkeypatch.setattr(node.metrics, 'PROFILER_ENABLED', False)
+    assert client.get('/debug/profile?seconds=0.01').status_code == 404
+
+    monkeypatch.setattr(node.metrics, 'PROFILER_ENABLED', True)
+    for seconds in ('0', '-1', str(node.metrics.PROFILER_MAX_SECONDS + 1)):
+        assert client.get(f'/debug/profile?seconds={seconds}').status_code == 400
+    response = client.get('/debug/profile?seconds=0.02&format=pstats')
+    assert response.status_code == 200 and response.mimetype == 'application/octet-stream'
+    assert client.get('/debug/profile?seconds=0.02&sort=nada').status_code == 400
+
+    # Ya hay una ventana en curso
+    node.profiler._running.acquire()
+    try:
+        response = client.get('/debug/profile?seconds=0.01')
+        assert response.status_code == 409 and 'en curso' in response.get_json()['message']
+    finally:
+        node.profiler._running.release()
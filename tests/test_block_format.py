@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import sqlite3
+
+import pytest
+
+from blockchain import FOUNDER_ADDRESS, GENESIS_SUPPLY, MINING_REWARD, Blockchain
+from merkle import header_hash
+
+GENESIS_TX = {'sender': "SYSTEM", 'recipient': FOUNDER_ADDRESS, 'amount': GENESIS_SUPPLY, 'signature': "SYSTEM_SIGNATURE"}
+
+# Bloques de referencia con su hash fijado: si cambia la serialización de alguna versión de cabecera,
+# los enlaces previous_hash de las BD existentes dejan de ser válidos
+V1_BLOCK = {'index': 1, 'timestamp': 1700000000.5, 'nonce': 0, 'previous_hash': '0' * 64,
+            'transactions': [{'sender': 'SYSTEM', 'recipient': 'founder', 'amount': 5000,
+                              'signature': 'SYSTEM_SIGNATURE'}]}
+V2_BLOCK = dict(V1_BLOCK, version=2, index=2, timestamp=1700000010.25, nonce=12345, previous_hash='ab' * 32,
+                merkle_root='cd' * 32)
+V3_BLOCK = dict(V2_BLOCK, version=3, target='0000' + 'f' * 60)
+REFERENCE_HASHES = [
+    (V1_BLOCK, '228e0ab46f42ee46980be2a74593f6c8370ab57eded0a6abd482ea9207885eb7'),
+    (V2_BLOCK, 'eb603812a9a90dcaffc2ba2b6e30a5cc73aa02571bb09ff6fe5745a48f20536a'),
+    (V3_BLOCK, '2328a7a260ec39c42a5f6b3a610dde6b6b43e4b55e8e454a1b154bca16b8343f'),
+]
+
+
+def legacy_hash(block: dict) -> str:
+    """
+    Hash de un bloque del formato original: SHA-256 del JSON completo con claves ordenadas.
+    """
+    return hashlib.sha256(json.dumps(block, sort_keys=True).encode()).hexdigest()
+
+
+@pytest.mark.parametrize('block, expected', REFERENCE_HASHES)
+def test_block_hash_is_unchanged(block, expected):
+    assert Blockchain._hash(block) == expected
+    if 'version' in block:
+        assert header_hash(block) == expected
+        # Las transacciones no forman parte del hash de una cabecera v2+
+        assert Blockchain._hash(dict(block, transactions=[])) == expected
+    else:
+        assert legacy_hash(block) == expected
+
+
+def test_header_prefix_matches_documented_fields():
+    fields = ('version', 'index', 'timestamp', 'previous_hash', 'merkle_root')
+    prefix = json.dumps({field: V2_BLOCK[field] for field in fields}, sort_keys=True, separators=(',', ':'))
+    assert Blockchain._header_prefix(V2_BLOCK) == prefix.encode()
+    prefix = json.dumps({field: V3_BLOCK[field] for field in fields + ('target',)}, sort_keys=True,
+                        separators=(',', ':'))
+    assert Blockchain._header_prefix(V3_BLOCK) == prefix.encode()
+
+
+def mine_legacy_block(index: int, previous_hash: str, timestamp: float) -> dict:
+    """
+    Bloque minado como lo hacía el nodo original: nonce tal que el hash del JSON completo empiece por 4 ceros.
+    """
+    block = {'index': index, 'timestamp': timestamp, 'nonce': 0, 'previous_hash': previous_hash,
+             'transactions': [{'sender': "SYSTEM", 'recipient': 'legacy-miner', 'amount': MINING_REWARD,
+                               'signature': "SYSTEM_SIGNATURE"}]}
+    while not legacy_hash(block).startswith('0000'):
+        block['nonce'] += 1
+    return block
+
+
+@pytest.fixture
+def legacy_db(tmp_path) -> tuple[str, list]:
+    """
+    BD con el esquema original (solo block_data) y una cadena v1 de 3 bloques.
+    """
+    genesis = {'index': 1, 'timestamp': 1700000000.0, 'transactions': [GENESIS_TX], 'nonce': 0,
+               'previous_hash': '0' * 64}
+    blocks = [genesis]
+    for index in (2, 3):
+        blocks.append(mine_legacy_block(index, legacy_hash(blocks[-1]), 1700000000.0 + index * 10))
+
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE blocks ("index" INTEGER PRIMARY KEY, block_data TEXT NOT NULL)')
+    conn.execute('CREATE TABLE mempool (id INTEGER PRIMARY KEY AUTOINCREMENT, tx_data TEXT NOT NULL)')
+    conn.executemany('INSERT INTO blocks ("index", block_data) VALUES (?, ?)',
+                     [(block['index'], json.dumps(block, sort_keys=True)) for block in blocks])
+    conn.commit()
+    conn.close()
+    return path, blocks
+
+
+def test_legacy_database_keeps_its_hashes(legacy_db):
+    path, blocks = legacy_db
+    node = Blockchain(db_path=path)
+    try:
+        assert node.height == 3
+        assert [node.get_block(str(index))['hash'] for index in (1, 2, 3)] == [legacy_hash(b) for b in blocks]
+        assert node.tip_hash == legacy_hash(blocks[-1])
+        assert node.get_balance('legacy-miner') == 2 * MINING_REWARD
+        assert node.validate_chain(full=True)[0]
+
+        # Los bloques nuevos (v3) enlazan con la punta v1 y la cadena mixta sigue siendo válida
+        block, _ = node.mine_block('miner')
+        assert block['version'] == 3 and block['previous_hash'] == legacy_hash(blocks[-1])
+        assert node.validate_chain(full=True)[0]
+    finally:
+        node.miner.shutdown()
+        node.storage.close()
+
+    # Tras reabrir (cabeceras ya migradas) los hashes siguen siendo los mismos
+    node = Blockchain(db_path=path)
+    try:
+        assert [node.get_block(str(index))['hash'] for index in (1, 2, 3)] == [legacy_hash(b) for b in blocks]
+        assert node.height == 4 and node.validate_chain(full=True)[0]
+    finally:
+        node.miner.shutdown()
+        node.storage.close()
+
+
+def test_legacy_block_with_altered_contents_is_invalid(legacy_db):
+    path, blocks = legacy_db
+    # En v1 el hash cubre las transacciones: cambiar una rompe el enlace con el bloque siguiente
+    tampered = dict(blocks[1], transactions=[dict(blocks[1]['transactions'][0], recipient='thief')])
+    conn = sqlite3.connect(path)
+    conn.execute('UPDATE blocks SET block_data = ? WHERE "index" = 2', (json.dumps(tampered, sort_keys=True),))
+    conn.commit()
+    conn.close()
+    node = Blockchain(db_path=path)
+    try:
+        valid, report = node.validate_chain(full=True)
+        assert not valid and report['invalid_index'] in (2, 3)
+    finally:
+        node.miner.shutdown()
+        node.storage.close()
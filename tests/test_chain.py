@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import json
+
+from blockchain import Blockchain
+from chain_store import ChainStore
+from conftest import signed
+from keys import Keys
+from merkle import tx_hash
+from storage import SQL_INSERT_BLOCK
+
+
+def test_get_block_by_height_and_hash(blockchain):
+    block, _ = blockchain.mine_block('miner')
+    tip_hash = blockchain.tip_hash
+    assert blockchain.get_block('2')['hash'] == tip_hash
+    assert blockchain.get_block(tip_hash)['index'] == block['index']
+    assert blockchain.get_block('3') is None
+    assert blockchain.get_block('ff' * 32) is None
+
+
+def test_get_block_committed_but_not_yet_in_memory(blockchain):
+    # Simula la ventana entre la confirmación en SQLite y la actualización de la cadena en memoria
+    candidate, _ = blockchain.build_candidate_block('miner')
+    row = blockchain._block_row(candidate)
+    with blockchain.storage.write() as cursor:
+        cursor.execute(SQL_INSERT_BLOCK, row)
+    assert blockchain.get_block(row[3]) is None
+
+
+def test_parallel_validation_with_relative_path_and_uri_characters(tmp_path, monkeypatch):
+    # Los procesos del pool abren la BD por URI: la ruta relativa y los caracteres '#', '?' y '%'
+    # deben llegar escapados para no leerse como fragmento o parámetros
+    monkeypatch.chdir(tmp_path)
+    node = Blockchain(db_path='cadena #1?%20.db')
+    try:
+        for _ in range(4):
+            node.mine_block('miner')
+        node.validator.workers, node.validator.chunk_size = 2, 2
+        valid, report = node.validate_chain(full=True)
+        assert valid and report['invalid_index'] is None and report['checked'] == 5
+    finally:
+        node.miner.shutdown()
+        node.storage.close()
+
+
+def test_get_transaction_committed_but_not_yet_in_memory(blockchain):
+    # Las Coinbase de un mismo minero repiten txid: la aparición aún no visible en memoria se ignora
+    block, _ = blockchain.mine_block('miner')
+    txid = tx_hash(block['transactions'][0])
+    candidate, _ = blockchain.build_candidate_block('miner')
+    with blockchain.storage.write() as cursor:
+        cursor.execute(SQL_INSERT_BLOCK, blockchain._block_row(candidate))
+        blockchain.tx_index.index_block(cursor, candidate)
+    found = blockchain.get_transaction(txid)
+    assert found['block_index'] == 2 and found['occurrences'] == 1
+    assert found['block_hash'] == blockchain.tip_hash
+
+    unseen = blockchain._coinbase_transaction('other-miner')
+    candidate = dict(candidate, index=4, transactions=[unseen])
+    with blockchain.storage.write() as cursor:
+        blockchain.tx_index.index_block(cursor, candidate)
+    assert blockchain.get_transaction(tx_hash(unseen)) is None
+
+
+def test_iteration_is_not_shifted_by_concurrent_appends(blockchain):
+    for _ in range(4):
+        blockchain.mine_block('miner')
+    blocks = blockchain.get_blocks(0)
+    store = ChainStore(blockchain.storage, Blockchain._hash, tail_size=2)
+    store.load()
+    iterator = store.iter_blocks(0)
+    assert next(iterator) == blocks[0]
+    # El escritor añade bloques (la ventana desplaza sus posiciones) mientras el recorrido sigue en curso
+    for _ in range(2):
+        block, _ = blockchain.mine_block('miner')
+        store.append(block, Blockchain._hash(block))
+    assert [blocks[0]] + list(iterator) == blocks
+    assert list(store.iter_blocks(0)) == blockchain.get_blocks(0)
+
+
+def test_mined_block_never_overdraws(blockchain, funded_key):
+    # Gasto de una cuenta sin saldo confirmado encolado delante del abono que lo financiaría
+    private_key, public_key = Keys.generate_key_pair()
+    spend = Blockchain._transaction_payload(*signed(private_key, public_key, 'bob', 60))
+    row_id = blockchain.storage.queue_mempool_insert(json.dumps(spend))
+    blockchain._mempool.add(row_id, spend)
+    assert blockchain.new_transaction(*signed(*funded_key, public_key, 100))[0]
+
+    candidate, row_ids = blockchain.build_candidate_block('miner')
+    assert row_id not in row_ids and len(candidate['transactions']) == 2
+    block, _ = blockchain.mine_block('miner')
+    assert [tx['recipient'] for tx in block['transactions'][1:]] == [public_key]
+    assert blockchain.get_balance(public_key) == 100 - 60
+    # Con el abono confirmado, el gasto pendiente ya se puede incluir
+    block, _ = blockchain.mine_block('miner')
+    assert [tx['recipient'] for tx in block['transactions'][1:]] == ['bob']
+    assert blockchain.is_ledger_consistent()
+
+    # Un bloque que sobregira se rechaza también al confirmarlo
+    overdraw = Blockchain._transaction_payload(*signed(private_key, public_key, 'bob', 1000))
+    height = blockchain.height
+    assert blockchain._new_block(None, 0, miner_address='miner', mempool_entries=[(None, overdraw)]) is None
+    assert blockchain.height == height
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import struct
+
+import pytest
+
+from blockchain import Blockchain
+from codec import (COMPACT_MAGIC, BlockHeader, block_json, decode_block, decode_compact, encode_block,
+                   encode_compact)
+from conftest import signed
+
+EDGE_INTS = [0, 1, -1, 63, 64, -64, -65, 127, 128, -128, 2 ** 31, -2 ** 31, 2 ** 63 - 1, -2 ** 63, 2 ** 64,
+             2 ** 256 - 1, -(2 ** 256)]
+
+
+def round_trip(value):
+    """
+    Valor decodificado tras codificar {'v': value} en formato compacto.
+    """
+    return decode_compact(encode_compact({'v': value}))['v']
+
+
+@pytest.mark.parametrize('value', [None, True, False] + EDGE_INTS)
+def test_scalars_keep_value_and_type(value):
+    decoded = round_trip(value)
+    assert decoded == value and type(decoded) is type(value)
+
+
+@pytest.mark.parametrize('value', [0.0, -0.0, 1.5, -2.25, 1700000000.123456, 5e-324, 1.7976931348623157e308,
+                                   float('inf'), float('-inf')])
+def test_floats_are_bit_exact(value):
+    decoded = round_trip(value)
+    assert type(decoded) is float
+    assert struct.pack('>d', decoded) == struct.pack('>d', value)
+
+
+def test_nan_round_trip():
+    assert math.isnan(round_trip(float('nan')))
+
+
+@pytest.mark.parametrize('value', [
+    '', 'a', 'SYSTEM', 'SYSTEM_SIGNATURE', 'system',
+    'ab', '00' * 32, 'ff' * 65,                    # hexadecimal: se guarda como bytes crudos
+    'abc', 'AB', 'aB', '0x00', 'zz',               # parecen hexadecimales pero no lo reproducen: texto
+    'ñandú', '€uro', 'emoji 🚀', '日本語', 'nul\x00byte',
+])
+def test_strings_round_trip(value):
+    decoded = round_trip(value)
+    assert decoded == value and type(decoded) is str
+
+
+def test_hex_strings_are_stored_as_raw_bytes():
+    value = 'ab' * 64
+    assert len(encode_compact({'v': value})) < len(value) // 2 + 16
+
+
+def test_nested_containers_keep_order_and_types():
+    value = {
+        'transactions': [{'sender': 'SYSTEM', 'amount': 10, 'signature': 'SYSTEM_SIGNATURE'}, {}],
+        'clave desconocida': [[], [[1, -1]], {'ñ': {'🚀': None}}],
+        'version': 3,
+        'timestamp': 1700000000.5,
+        '': [True, False, 0, 0.0, ''],
+    }
+    decoded = decode_compact(encode_compact(value))
+    assert decoded == value
+    assert json.dumps(decoded) == json.dumps(value)
+
+
+def test_tuples_decode_as_lists_and_bytes_are_rejected():
+    assert round_trip((1, 'a')) == [1, 'a']
+    with pytest.raises(TypeError):
+        encode_compact({'v': b'\x00'})
+    with pytest.raises(TypeError):
+        encode_compact({'v': {1, 2}})
+
+
+def test_corrupt_data_is_rejected():
+    with pytest.raises(ValueError):
+        decode_compact(b'XX\x01' + encode_compact({})[len(COMPACT_MAGIC):])
+    with pytest.raises(ValueError):
+        decode_compact(COMPACT_MAGIC + bytes([200]))
+
+
+def test_real_block_round_trip_keeps_its_hash(blockchain, funded_key):
+    private_key, public_key = funded_key
+    blockchain.new_transactions_batch([signed(private_key, public_key, f'r{i}', i + 1) for i in range(3)])
+    block, _ = blockchain.mine_block('miner')
+    compact = encode_block(block, 'compact')
+    text = encode_block(block, 'json')
+    assert isinstance(compact, bytes) and isinstance(text, str)
+    assert len(compact) < len(text)
+    for stored in (compact, memoryview(compact), text):
+        decoded = decode_block(stored)
+        assert decoded == block
+        assert Blockchain._hash(decoded) == Blockchain._hash(block)
+        assert json.loads(block_json(stored)) == block
+    # El formato compacto conserva además el orden de las claves
+    assert list(decode_block(compact)) == list(block)
+    assert block_json(text) is text
+
+
+@pytest.mark.parametrize('header', [
+    {'index': 1, 'timestamp': 1700000000.0, 'nonce': 0, 'previous_hash': '0' * 64},
+    {'version': 2, 'index': 2, 'timestamp': 1700000010.5, 'nonce': 77, 'previous_hash': 'ab' * 32,
+     'merkle_root': 'cd' * 32},
+    {'version': 3, 'index': 3, 'timestamp': 1700000020, 'nonce': 2 ** 40, 'previous_hash': 'ab' * 32,
+     'merkle_root': 'cd' * 32, 'target': '0000' + 'f' * 60},
+    {'version': 3, 'index': 4, 'timestamp': 1.5, 'nonce': 1, 'previous_hash': 'NOT-HEX',
+     'merkle_root': 'abc', 'target': '0f' * 32, 'campo_nuevo': {'x': [1]}},
+])
+def test_block_header_round_trip(header):
+    block_hash = 'ee' * 32
+    packed = BlockHeader(header, block_hash)
+    assert packed.to_dict() == header
+    assert packed.block_hash == block_hash
+    # Los hashes hexadecimales se guardan como 32 bytes; los valores no hexadecimales se conservan tal cual
+    assert packed.hash == bytes.fromhex(block_hash)
+    if header.get('previous_hash') == 'ab' * 32:
+        assert packed.previous_hash == bytes.fromhex('ab' * 32)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Versión reducida de benchmarks/bench_concurrency.py: clientes concurrentes gastando más que su saldo
+mientras se mina y se consultan saldos. Comprueba que no se pierden transacciones ni hay dobles gastos.
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchain import GENESIS_SUPPLY, MINING_REWARD
+from keys import Keys
+from conftest import signed
+
+CLIENTS = 16
+TXS_PER_CLIENT = 6
+FUNDS = 4
+
+
+def test_no_lost_transactions_or_double_spends(blockchain):
+    keys = [Keys.generate_key_pair() for _ in range(CLIENTS)]
+    for _, public_key in keys:
+        assert blockchain.issue_faucet_funds(public_key, FUNDS)[0]
+    blockchain.mine_block('stress-miner')
+    transactions = [signed(*key, f"stress-{client}-{i}", 1)
+                    for client, key in enumerate(keys) for i in range(TXS_PER_CLIENT)]
+    random.Random(1234).shuffle(transactions)
+
+    stop = threading.Event()
+    read_errors = []
+
+    def mine_forever():
+        while not stop.is_set():
+            blockchain.mine_block('stress-miner')
+
+    def read_forever():
+        while not stop.is_set():
+            try:
+                blockchain.get_all_balances()
+                blockchain.get_address_stats(keys[0][1])
+            except Exception as exc:
+                read_errors.append(exc)
+
+    background = [threading.Thread(target=mine_forever, daemon=True)]
+    background += [threading.Thread(target=read_forever, daemon=True) for _ in range(2)]
+    for thread in background:
+        thread.start()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        results = list(pool.map(lambda tx: (tx, blockchain.new_transaction(*tx)[0]), transactions))
+    stop.set()
+    blockchain.miner.cancel()
+    for thread in background:
+        thread.join()
+    while blockchain.mempool:
+        blockchain.mine_block('stress-miner')
+
+    assert not read_errors
+    accepted = [tx for tx, ok in results if ok]
+    rejected = [tx for tx, ok in results if not ok]
+    # Sin dobles gastos: cada llave admite exactamente lo que cubre su saldo
+    per_key = {}
+    for sender, *_ in accepted:
+        per_key[sender] = per_key.get(sender, 0) + 1
+    assert per_key == {public_key: min(FUNDS, TXS_PER_CLIENT) for _, public_key in keys}
+
+    # Sin transacciones perdidas: cada admitida está confirmada exactamente una vez, ninguna rechazada
+    confirmed = {}
+    for block in blockchain.chain:
+        for tx in block['transactions'][1:]:
+            confirmed[tx['recipient']] = confirmed.get(tx['recipient'], 0) + 1
+    assert all(confirmed.get(recipient) == 1 for _, recipient, _, _ in accepted)
+    assert not any(recipient in confirmed for _, recipient, _, _ in rejected)
+
+    # Sin sobregiros y con el índice de saldos coherente con la cadena
+    balances = blockchain.get_all_balances()
+    assert all(balance >= 0 for balance in balances.values())
+    assert sum(balances.values()) == GENESIS_SUPPLY + MINING_REWARD * (blockchain.height - 1)
+    assert blockchain.is_ledger_consistent()
+    assert blockchain.validate_chain(full=True)[0]
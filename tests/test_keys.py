@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import ecdsa
+import pytest
+
+from keys import PARALLEL_VERIFY_THRESHOLD, KeyCache, Keys, _load_verifying_key, _precompute_verifying_key
+from conftest import signed
+
+# Hex bien formado que no es un punto de SECP256k1, y valores que no son texto
+MALFORMED_KEYS = ['00' * 64, '04' + '00' * 64, '02' + 'ff' * 32, '', 5]
+
+
+@pytest.mark.parametrize('public_key', MALFORMED_KEYS)
+def test_malformed_public_key_does_not_verify(public_key):
+    assert Keys.verify_signature(public_key, '3006020101020101', 'ab' * 32) is False
+
+
+def test_malformed_der_signature_does_not_verify():
+    private_key, public_key = Keys.generate_key_pair()
+    assert Keys.verify_signature(public_key, 'abcd', 'ab' * 32) is False
+
+
+@pytest.mark.parametrize('size', [3, PARALLEL_VERIFY_THRESHOLD + 7])
+def test_batch_with_malformed_key_reports_per_item(blockchain, funded_key, size):
+    # Lote pequeño (verificación en línea) y grande (pool de procesos)
+    items = [signed(*funded_key, f'bob-{i}', 1) for i in range(size - 1)]
+    items.insert(1, ('00' * 64, 'bob', 1, '3006020101020101'))
+    results = blockchain.new_transactions_batch(items)
+    assert [accepted for accepted, _ in results] == [True, False] + [True] * (size - 2)
+
+
+@pytest.mark.parametrize('size', [3, PARALLEL_VERIFY_THRESHOLD + 7])
+def test_verify_many_with_malformed_key(size):
+    private_key, public_key = Keys.generate_key_pair()
+    digest = 'ab' * 32
+    items = [(public_key, Keys.sign_digest(private_key, digest), digest)] * (size - 1)
+    items.insert(1, ('00' * 64, '3006020101020101', digest))
+    assert Keys.verify_many(items, workers=2) == [True, False] + [True] * (size - 2)
+
+
+def test_key_cache_hits_misses_and_eviction():
+    built, promoted = [], []
+
+    def factory(key_hex):
+        built.append(key_hex)
+        return [key_hex]
+    cache = KeyCache(factory, max_size=2, promote=promoted.append, promote_after=3)
+
+    a = cache.get('a')
+    assert cache.get('a') is a
+    cache.get('b')
+    cache.get('a')  # 'a' pasa a ser la más reciente: se desaloja 'b'
+    assert promoted == [a]
+    cache.get('c')
+    cache.get('b')
+    assert built == ['a', 'b', 'c', 'b']
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 4, 'hit_rate': 2 / 6}
+    # La promoción ocurre una sola vez por llave
+    cache.get('b'), cache.get('b'), cache.get('b')
+    assert promoted == [a, cache.get('b')]
+
+
+def test_key_cache_does_not_store_invalid_keys():
+    cache = KeyCache(_load_verifying_key)
+    with pytest.raises(ValueError):
+        cache.get('zz')
+    assert cache.stats()['size'] == 0 and cache.stats()['misses'] == 1
+    cache.clear()
+    assert cache.stats()['misses'] == 0
+
+
+def test_precomputed_key_still_verifies():
+    private_key, public_key = Keys.generate_key_pair()
+    digest = 'ab' * 32
+    signature = Keys.sign_digest(private_key, digest)
+    cache = KeyCache(_load_verifying_key, promote=_precompute_verifying_key, promote_after=2)
+    for _ in range(3):
+        key = cache.get(public_key)
+    assert key.pubkey.point.x() == _load_verifying_key(public_key).pubkey.point.x()
+    assert Keys.verify_signature(public_key, signature, digest)
+    assert key.verify_digest(bytes.fromhex(signature), bytes.fromhex(digest), sigdecode=ecdsa.util.sigdecode_der)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from blockchain import Blockchain
+from keys import Keys
+from conftest import signed
+
+
+def known_addresses(node) -> set:
+    """
+    Todas las direcciones que aparecen en la cadena o en el Mempool.
+    """
+    addresses = set()
+    for tx in [tx for block in node.chain for tx in block['transactions']] + node.mempool:
+        addresses.update((tx['sender'], tx['recipient']))
+    return addresses
+
+
+def assert_ledger_matches_scan(node):
+    for address in known_addresses(node):
+        assert node.get_balance(address) == node._scan_balance(address), address
+    assert node.is_ledger_consistent()
+
+
+@pytest.fixture
+def peer(tmp_path):
+    node = Blockchain(db_path=str(tmp_path / 'peer.db'))
+    yield node
+    node.miner.shutdown()
+    node.storage.close()
+
+
+def test_incremental_balances_match_full_scan(blockchain, peer):
+    keys = [Keys.generate_key_pair() for _ in range(3)]
+    for _, public_key in keys:
+        assert blockchain.issue_faucet_funds(public_key, 50)[0]
+    blockchain.mine_block('miner-a')
+    assert_ledger_matches_scan(blockchain)
+
+    # Gastos confirmados y otros que quedan pendientes en el Mempool
+    assert blockchain.new_transaction(*signed(*keys[0], keys[1][1], 20))[0]
+    blockchain.mine_block('miner-b')
+    assert blockchain.new_transaction(*signed(*keys[1], keys[2][1], 30))[0]
+    assert blockchain.new_transaction(*signed(*keys[2], 'carol', 15))[0]
+    assert_ledger_matches_scan(blockchain)
+
+    # Reorganización: el par adopta la cadena, mina una rama más larga con otra transferencia y el nodo
+    # la adopta; el bloque huérfano devuelve sus transacciones al Mempool
+    assert peer.replace_suffix(0, blockchain.chain)[0]
+    fork_height = blockchain.height
+    blockchain.mine_block('miner-a')
+    assert blockchain.mempool == []
+    assert peer.new_transaction(*signed(*keys[0], 'dave', 5))[0]
+    peer.mine_block('miner-c')
+    peer.mine_block('miner-c')
+
+    success, message = blockchain.replace_suffix(fork_height, peer.chain[fork_height:])
+    assert success, message
+    assert blockchain.tip_hash == peer.tip_hash
+    assert len(blockchain.mempool) == 2
+    assert_ledger_matches_scan(blockchain)
+    assert_ledger_matches_scan(peer)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from mempool import Mempool
+from merkle import tx_hash
+from conftest import signed
+
+
+def transaction(sender: str, amount: int, timestamp: float) -> dict:
+    return {'sender': sender, 'recipient': 'bob', 'amount': amount, 'signature': 'sig', 'timestamp': timestamp}
+
+
+def filled(size: int, **options) -> Mempool:
+    """
+    Mempool con las filas 1..size, de remitentes alternos y timestamps 100, 101, ...
+    """
+    mempool = Mempool(**options)
+    for row_id in range(1, size + 1):
+        mempool.add(row_id, transaction(f'sender-{row_id % 2}', row_id, 99 + row_id))
+    return mempool
+
+
+def test_select_respects_arrival_order_and_limit():
+    mempool = filled(5)
+    assert [row_id for row_id, _ in mempool.select(3)] == [1, 2, 3]
+    assert [row_id for row_id, _ in mempool.select(10)] == [1, 2, 3, 4, 5]
+    assert mempool.select(0) == []
+
+
+def test_indexes_follow_additions_and_removals():
+    mempool = filled(4)
+    assert mempool.pending_debit('sender-1') == 1 + 3 and mempool.pending_debit('sender-0') == 2 + 4
+    assert mempool.sender_row_ids('sender-0') == [2, 4]
+    third = mempool.get(3)
+    assert mempool.row_id_of(tx_hash(third)) == 3
+
+    generation = mempool.generation
+    assert mempool.remove([3, 99]) == [third]
+    assert mempool.generation == generation + 1
+    assert mempool.remove([99]) == [] and mempool.generation == generation + 1
+    assert mempool.pending_debit('sender-1') == 1 and mempool.row_id_of(tx_hash(third)) is None
+    mempool.remove([1])
+    assert mempool.pending_debit('sender-1') == 0 and 'sender-1' not in mempool.senders()
+    assert [txid for txid, _ in mempool.items()] == [tx_hash(mempool.get(2)), tx_hash(mempool.get(4))]
+
+
+def test_expired_transactions_are_the_oldest_past_the_ttl():
+    mempool = filled(5, ttl=10)
+    # Timestamps 100..104: a los 112.5 s han superado el TTL las de 100, 101 y 102
+    assert mempool.expired_row_ids(112.5) == [1, 2, 3]
+    assert mempool.expired_row_ids(100) == []
+
+
+def test_expiry_follows_timestamps_not_arrival_order():
+    mempool = Mempool(ttl=10)
+    # Una transacción reciente encolada delante de otras difundidas con timestamps más antiguos
+    mempool.add(1, transaction('fresh', 1, 200))
+    mempool.add(2, transaction('gossiped', 2, 150))
+    mempool.add(3, transaction('readmitted', 3, 100))
+    mempool.add(4, transaction('fresh', 4, 205))
+    assert mempool.expired_row_ids(180) == [3, 2]
+    mempool.remove([3])
+    assert mempool.expired_row_ids(180) == [2]
+    assert mempool.expired_row_ids(212) == [2, 1]
+
+
+def test_expiry_index_is_compacted_after_removals():
+    mempool = filled(3000, ttl=10)
+    mempool.remove(range(1, 2990))
+    assert len(mempool._expiry) <= 2 * len(mempool) + 1024
+    assert mempool.expired_row_ids(3120) == list(range(2990, 3001))
+
+
+def test_overflow_evicts_the_oldest():
+    mempool = filled(5, max_size=5)
+    assert mempool.overflow_row_ids() == [1]
+    assert mempool.overflow_row_ids(3) == [1, 2, 3]
+    mempool.remove([1, 2])
+    assert mempool.overflow_row_ids(2) == []
+
+
+def test_node_expires_and_evicts_on_admission(blockchain, funded_key, monkeypatch):
+    for recipient in ('a', 'b', 'c'):
+        assert blockchain.new_transaction(*signed(*funded_key, recipient, 1))[0]
+    blockchain._mempool.max_size = 3
+    assert blockchain.new_transaction(*signed(*funded_key, 'd', 1))[0]
+    assert [tx['recipient'] for tx in blockchain.mempool] == ['b', 'c', 'd']
+
+    blockchain._mempool.ttl = 0
+    monkeypatch.setattr('blockchain.time', lambda: blockchain.mempool[-1]['timestamp'] + 1)
+    assert blockchain.new_transaction(*signed(*funded_key, 'e', 1))[0]
+    assert [tx['recipient'] for tx in blockchain.mempool] == ['e']
+    # Los débitos de las transacciones descartadas ya no cuentan en el saldo
+    assert blockchain.get_balance(funded_key[1]) == 99
+    rows = blockchain.storage.query('SELECT COUNT(*) AS n FROM mempool')
+    assert rows[0]['n'] == 1
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import copy
+import hashlib
+
+import pytest
+
+from merkle import header_hash, merkle_proof, merkle_root, tx_hash, verify_inclusion, verify_merkle_proof
+from retarget import MAX_TARGET, encode_target
+from conftest import signed
+
+
+def leaves(count: int) -> list:
+    return [hashlib.sha256(b'%d' % i).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 4, 5, 7, 8, 9, 16])
+def test_proof_round_trip(count):
+    hashes = leaves(count)
+    root = merkle_root(hashes)
+    for position, leaf in enumerate(hashes):
+        proof = merkle_proof(hashes, position)
+        assert len(proof) == (count - 1).bit_length()
+        assert verify_merkle_proof(leaf, position, proof, root)
+
+
+@pytest.mark.parametrize('count', [2, 5, 8])
+def test_tampered_proofs_fail(count):
+    hashes = leaves(count)
+    root = merkle_root(hashes)
+    for position, leaf in enumerate(hashes):
+        proof = merkle_proof(hashes, position)
+        for level in range(len(proof)):
+            tampered = list(proof)
+            tampered[level] = hashlib.sha256(tampered[level].encode()).hexdigest()
+            assert not verify_merkle_proof(leaf, position, tampered, root)
+        for other in range(count):
+            if other != position:
+                assert not verify_merkle_proof(leaf, other, proof, root)
+        assert not verify_merkle_proof(leaf, position, proof, merkle_root(hashes[::-1]))
+        assert not verify_merkle_proof(leaf, position, proof[:-1], root)
+        assert not verify_merkle_proof(leaf, position, proof + [leaf], root)
+        assert not verify_merkle_proof('zz', position, proof, root)
+
+
+def test_single_leaf_proof_is_empty():
+    hashes = leaves(1)
+    assert merkle_proof(hashes, 0) == []
+    assert verify_merkle_proof(hashes[0], 0, [], hashes[0])
+    assert not verify_merkle_proof(hashes[0], 1, [], hashes[0])
+
+
+@pytest.fixture
+def proof(blockchain, funded_key):
+    """
+    Prueba de inclusión de una transferencia confirmada en un bloque con varias transacciones,
+    con dos cabeceras posteriores.
+    """
+    private_key, public_key = funded_key
+    results = blockchain.new_transactions_batch([signed(private_key, public_key, f'r{i}', 1) for i in range(4)])
+    assert all(accepted for accepted, _ in results)
+    block, _ = blockchain.mine_block('miner')
+    blockchain.mine_block('miner')
+    blockchain.mine_block('miner')
+    txid = tx_hash(block['transactions'][2])
+    found, message = blockchain.get_merkle_proof(txid, headers=10)
+    assert found is not None, message
+    return found
+
+
+def test_inclusion_proof_verifies(blockchain, proof):
+    assert proof['position'] == 2 and len(proof['headers']) == 3 and proof['confirmations'] == 3
+    assert verify_inclusion(proof, trusted_hash=blockchain.tip_hash)[0]
+    assert verify_inclusion(proof, checkpoint=proof['headers'][1])[0]
+
+
+def test_inclusion_proof_requires_a_trusted_anchor(proof):
+    assert not verify_inclusion(proof)[0]
+
+
+@pytest.mark.parametrize('tamper', [
+    lambda proof: proof['transaction'].update(amount=2),
+    lambda proof: proof.update(position=proof['position'] + 1),
+    lambda proof: proof['merkle_path'].__setitem__(0, '00' * 32),
+    lambda proof: proof['headers'][0].update(merkle_root='00' * 32),
+    lambda proof: proof['headers'][1].update(previous_hash='00' * 32),
+    lambda proof: proof['headers'].pop(1),
+    lambda proof: proof.update(headers=[]),
+    lambda proof: proof.pop('merkle_path'),
+])
+def test_tampered_inclusion_proof_fails(proof, tamper):
+    trusted_hash = header_hash(proof['headers'][-1])
+    tampered = copy.deepcopy(proof)
+    tamper(tampered)
+    assert not verify_inclusion(tampered, trusted_hash=trusted_hash)[0]
+
+
+def forged_proof(target: int) -> dict:
+    """
+    Prueba fabricada sin cadena real: una cabecera que declara el objetivo indicado y lo cumple.
+    """
+    tx = {'sender': 'SYSTEM', 'recipient': 'forger', 'amount': 10 ** 6, 'signature': 'SYSTEM_SIGNATURE'}
+    header = {'version': 3, 'index': 7, 'timestamp': 0, 'previous_hash': '00' * 32,
+              'merkle_root': tx_hash(tx), 'target': encode_target(target), 'nonce': 0}
+    while int(header_hash(header), 16) > target:
+        header['nonce'] += 1
+    return {'txid': tx_hash(tx), 'transaction': tx, 'block_index': 7, 'position': 0, 'merkle_path': [],
+            'headers': [header]}
+
+
+def test_forged_proof_with_easy_target_fails():
+    forged = forged_proof(int('f' * 64, 16))
+    trusted_hash = header_hash(forged['headers'][0])
+    assert not verify_inclusion(forged, trusted_hash=trusted_hash)[0]
+    assert not verify_inclusion(forged, checkpoint=forged['headers'][0])[0]
+    # En el límite MAX_TARGET la prueba de trabajo es válida: solo el ancla de confianza la respalda
+    easy = forged_proof(MAX_TARGET)
+    assert verify_inclusion(easy, trusted_hash=header_hash(easy['headers'][0]))[0]
+
+
+def test_inclusion_proof_rejects_untrusted_tip(proof):
+    assert not verify_inclusion(proof, trusted_hash='00' * 32)[0]
+    checkpoint = dict(proof['headers'][1], nonce=proof['headers'][1]['nonce'] + 1)
+    assert not verify_inclusion(proof, checkpoint=checkpoint)[0]
+
+
+def test_pending_and_unknown_transactions_have_no_proof(blockchain, funded_key):
+    private_key, public_key = funded_key
+    assert blockchain.new_transaction(*signed(private_key, public_key, 'bob', 1))[0]
+    pending = tx_hash(blockchain.mempool[0])
+    assert blockchain.get_merkle_proof(pending)[0] is None
+    assert blockchain.get_merkle_proof('ff' * 32)[0] is None
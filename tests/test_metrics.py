@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import marshal
+import threading
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, Registry, SamplingProfiler
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = Registry()
+    requests = registry.register(Counter('test_requests_total', 'Peticiones.', ('route',)))
+    latency = registry.register(Histogram('test_latency_seconds', 'Latencia.', ('route',), buckets=(0.5, 0.1)))
+    assert registry.register(Counter('test_requests_total', 'Otra.')) is requests
+    requests.inc(1, '/chain')
+    requests.inc(2, '/chain')
+    for value in (0.05, 0.1, 0.3, 2.0):
+        latency.observe(value, '/chain')
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ['# HELP test_requests_total Peticiones.', '# TYPE test_requests_total counter',
+                         'test_requests_total{route="/chain"} 3']
+    assert lines[3:] == [
+        '# HELP test_latency_seconds Latencia.',
+        '# TYPE test_latency_seconds histogram',
+        # Cubetas acumuladas y ordenadas; un valor igual al límite cae en esa cubeta
+        'test_latency_seconds_bucket{route="/chain",le="0.1"} 2',
+        'test_latency_seconds_bucket{route="/chain",le="0.5"} 3',
+        'test_latency_seconds_bucket{route="/chain",le="+Inf"} 4',
+        'test_latency_seconds_sum{route="/chain"} 2.45',
+        'test_latency_seconds_count{route="/chain"} 4',
+    ]
+    assert latency.count('/chain') == 4 and latency.count('/mempool') == 0
+
+
+def test_timed_records_each_call(monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    latency = Histogram('test_timed_seconds', 'Duración.')
+
+    @metrics.timed(latency)
+    def work(value):
+        """Documentación original."""
+        if value is None:
+            raise ValueError(value)
+        return value * 2
+
+    assert work(21) == 42 and work.__doc__ == "Documentación original."
+    with pytest.raises(ValueError):
+        work(None)
+    assert latency.count() == 2
+
+
+def test_timed_returns_the_original_function_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+
+    def work():
+        return 42
+
+    assert metrics.timed(Histogram('test_disabled_seconds', 'Duración.'))(work) is work
+
+
+def test_profiler_allows_a_single_window():
+    profiler = SamplingProfiler(interval_ms=1)
+    stop = threading.Event()
+    worker = threading.Thread(target=stop.wait)
+    worker.start()
+    try:
+        stats = profiler.run(0.05)
+        assert profiler.samples > 0
+        assert any(name == 'wait' for _, _, name in stats)
+        assert profiler.report('tottime', 5).startswith(f'{profiler.samples} muestras cada 1 ms')
+        assert marshal.loads(profiler.dump()) == stats
+
+        profiler._running.acquire()
+        with pytest.raises(RuntimeError):
+            profiler.run(0.01)
+        profiler._running.release()
+    finally:
+        stop.set()
+        worker.join()
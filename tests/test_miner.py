@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import threading
+import time
+
+import pytest
+
+from miner import ParallelMiner, _search_nonce
+
+PREFIX = b'{"index":2,"previous_hash":"00"}'
+# Unos 16 intentos de media por nonce válido
+EASY_TARGET = 2 ** 252
+# Ningún hash cumple este objetivo: el minado solo termina si se cancela
+IMPOSSIBLE_TARGET = -1
+
+
+def block_hash(nonce: int) -> int:
+    return int.from_bytes(hashlib.sha256(PREFIX + b'%d' % nonce).digest(), 'big')
+
+
+@pytest.fixture(params=[1, 3])
+def miner(request):
+    engine = ParallelMiner(workers=request.param)
+    yield engine
+    engine.shutdown()
+
+
+def test_search_nonce_walks_its_own_stride():
+    nonce, attempts = _search_nonce(PREFIX, 2, 3, EASY_TARGET, threading.Event())
+    assert nonce % 3 == 2 and block_hash(nonce) <= EASY_TARGET
+    # Es el primer nonce válido de su secuencia
+    assert all(block_hash(earlier) > EASY_TARGET for earlier in range(2, nonce, 3))
+    assert attempts == (nonce - 2) // 3 + 1
+
+
+def test_found_nonce_meets_the_target(miner):
+    result = miner.mine(PREFIX, EASY_TARGET)
+    assert block_hash(result['nonce']) <= EASY_TARGET
+    assert result['hashes'] >= 1 and miner.last_result == result
+
+
+def test_parallel_winner_is_the_first_valid_nonce_of_its_stride():
+    miner = ParallelMiner(workers=3)
+    try:
+        result = miner.mine(PREFIX, EASY_TARGET)
+    finally:
+        miner.shutdown()
+    # Cada proceso recorre su propia secuencia y el primero que encuentra un nonce cancela al resto:
+    # el ganador es el primer nonce válido de su secuencia
+    winner = result['nonce']
+    assert all(block_hash(nonce) > EASY_TARGET for nonce in range(winner % 3, winner, 3))
+
+
+def test_cancel_stops_the_search(miner):
+    results = []
+    worker = threading.Thread(target=lambda: results.append(miner.mine(PREFIX, IMPOSSIBLE_TARGET)))
+    worker.start()
+    deadline = time.monotonic() + 5
+    while not miner._busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    miner.cancel()
+    worker.join(timeout=10)
+    assert not worker.is_alive()
+    assert results == [None]
+    # El minero sigue sirviendo para el bloque siguiente
+    assert block_hash(miner.mine(PREFIX, EASY_TARGET)['nonce']) <= EASY_TARGET
+
+
+def test_cancel_while_idle_does_not_affect_the_next_search(miner):
+    miner.cancel()
+    assert miner.mine(PREFIX, EASY_TARGET) is not None
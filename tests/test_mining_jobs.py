@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from mining_jobs import MiningJobManager
+
+
+@pytest.fixture
+def gated_mining(blockchain, monkeypatch):
+    """
+    mine_block espera a que se abra la compuerta antes de minar, para observar los trabajos en curso.
+    """
+    gate = threading.Event()
+    mine_block = blockchain.mine_block
+
+    def gated(miner_address):
+        gate.wait(timeout=10)
+        return mine_block(miner_address)
+    monkeypatch.setattr(blockchain, 'mine_block', gated)
+    return gate
+
+
+def wait_for_status(manager, job_id, statuses=('done', 'stale', 'cancelled', 'failed'), timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id)['status'] not in statuses and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_requests_for_the_same_height_are_coalesced(blockchain, gated_mining):
+    completed = []
+    manager = MiningJobManager(blockchain, on_complete=lambda job, block: completed.append((job, block)))
+    job, coalesced = manager.submit('miner-a')
+    assert not coalesced and job['height'] == 2 and job['status'] in ('queued', 'running')
+    again, coalesced = manager.submit('miner-b')
+    assert coalesced and again['id'] == job['id'] and again['miner'] == 'miner-a'
+
+    gated_mining.set()
+    finished = wait_for_status(manager, job['id'])
+    assert finished['status'] == 'done' and finished['result']['index'] == 2
+    assert finished['result']['hash'] == blockchain.tip_hash
+    assert blockchain.height == 2
+    assert [(job['id'], block['index']) for job, block in completed] == [(job['id'], 2)]
+
+    # Con la altura ya minada, la siguiente petición abre un trabajo nuevo
+    following, coalesced = manager.submit('miner-b')
+    assert not coalesced and following['id'] != job['id'] and following['height'] == 3
+    assert wait_for_status(manager, following['id'])['status'] == 'done'
+
+
+def test_failed_job_releases_its_height(blockchain, monkeypatch):
+    def broken(miner_address):
+        raise RuntimeError('sin minero')
+    monkeypatch.setattr(blockchain, 'mine_block', broken)
+    manager = MiningJobManager(blockchain)
+    job, _ = manager.submit('miner-a')
+    failed = wait_for_status(manager, job['id'])
+    assert failed['status'] == 'failed' and 'sin minero' in failed['error']
+    assert not manager.submit('miner-a')[1]
+
+
+def test_unknown_job_is_none(blockchain):
+    assert MiningJobManager(blockchain).get('desconocido') is None
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+
+from blockchain import Blockchain
+import chain_validator
+from keys import Keys
+from merkle import merkle_root, tx_hash
+import network
+from network import LocalTransport, PeerNetwork, create_network_blueprint
+from retarget import block_target
+
+
+@pytest.fixture
+def nodes(tmp_path):
+    """
+    Dos nodos en proceso ('a' y 'b') conectados con LocalTransport; b conoce a a.
+    """
+    transport = LocalTransport()
+    networks = []
+    for name in ('a', 'b'):
+        url = f"http://{name}"
+        network = PeerNetwork(Blockchain(db_path=str(tmp_path / f"{name}.db")), node_url=url, transport=transport)
+        app = Flask(name)
+        app.register_blueprint(create_network_blueprint(network))
+        transport.attach(url, app)
+        networks.append(network)
+    networks[1].blockchain.register_node('http://a')
+    yield networks
+    for network in networks:
+        network.blockchain.miner.shutdown()
+        network.blockchain.storage.close()
+
+
+def test_invalid_longer_chain_is_reported_as_invalid(nodes):
+    node_a, node_b = nodes
+    # Un nodo con reglas de admisión defectuosas mina una transferencia negativa (crea fondos)
+    private_key, public_key = Keys.generate_key_pair()
+    digest = Blockchain._transaction_digest(public_key, 'bob', -50)
+    tx = Blockchain._transaction_payload(public_key, 'bob', -50, Keys.sign_digest(private_key, digest))
+    row_id = node_a.blockchain.storage.queue_mempool_insert(json.dumps(tx))
+    node_a.blockchain._mempool.add(row_id, tx)
+    node_a.blockchain.mine_block('miner-a')
+    node_a.blockchain.mine_block('miner-a')
+
+    replaced, message = node_b.resolve_conflicts()
+    assert not replaced
+    assert "inválida" in message and "http://a" in message
+    assert node_b.blockchain.height == 1
+
+
+def test_block_with_malformed_sender_key_is_rejected(nodes):
+    node_a, node_b = nodes
+    # Remitente con saldo confirmado cuya llave es hex válido pero no un punto de la curva
+    assert node_a.blockchain.issue_faucet_funds('00' * 64, 5)[0]
+    # b adopta la cadena de a para que el bloque siguiente enlace con su punta
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    tx = Blockchain._transaction_payload('00' * 64, 'bob', 1, '3006020101020101')
+    row_id = node_a.blockchain.storage.queue_mempool_insert(json.dumps(tx))
+    node_a.blockchain._mempool.add(row_id, tx)
+    block, _ = node_a.blockchain.mine_block('miner-a')
+
+    code, body = node_a.transport.request('POST', 'http://b', '/network/block', {'block': block})
+    assert code == 400
+    assert "Firma" in body['message']
+    code, body = node_a.transport.request('GET', 'http://b', '/nodes/resolve')
+    assert code == 200 and not body['replaced']
+    assert node_b.blockchain.height == 2
+
+
+def test_reorg_drops_spends_funded_by_orphaned_blocks(nodes):
+    node_a, node_b = nodes
+    # Bifurcación: b mina su propia cadena sin difundirla a a
+    node_b.blockchain.unregister_node('http://a')
+    private_key, alice = Keys.generate_key_pair()
+    assert node_a.blockchain.issue_faucet_funds(alice, 100)[0]
+    node_a.blockchain.mine_block('miner-a')
+    digest = Blockchain._transaction_digest(alice, 'bob', 60)
+    assert node_a.blockchain.new_transaction(alice, 'bob', 60, Keys.sign_digest(private_key, digest))[0]
+    for _ in range(3):
+        node_b.blockchain.mine_block('miner-b')
+
+    node_a.blockchain.register_node('http://b')
+    assert node_a.resolve_conflicts()[0]
+    assert node_a.blockchain.tip_hash == node_b.blockchain.tip_hash
+    # El abono huérfano vuelve al Mempool; el gasto que dependía de él ya no está cubierto
+    assert node_a.blockchain.get_balance(alice) == 0
+    assert [(tx['recipient'], tx['amount']) for tx in node_a.blockchain.mempool] == [(alice, 100)]
+    assert node_a.blockchain.is_ledger_consistent()
+
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    assert [tx['recipient'] for tx in block['transactions'][1:]] == [alice]
+    success, message = node_b.receive_block(block, origin='http://a')
+    assert success, message
+    assert node_b.blockchain.tip_hash == node_a.blockchain.tip_hash
+
+
+def test_transaction_rejected_for_a_temporary_reason_is_retried(nodes):
+    node_a, node_b = nodes
+    private_key, alice = Keys.generate_key_pair()
+    assert node_a.blockchain.issue_faucet_funds(alice, 100)[0]
+    node_a.blockchain.mine_block('miner-a')
+    digest = Blockchain._transaction_digest(alice, 'bob', 30)
+    assert node_a.blockchain.new_transaction(alice, 'bob', 30, Keys.sign_digest(private_key, digest))[0]
+    tx = node_a.blockchain.mempool[0]
+
+    # b aún no tiene el bloque que financia a alice
+    success, message = node_b.receive_transaction(tx, origin='http://a')
+    assert not success and "Fondos insuficientes" in message
+    assert node_b.resolve_conflicts()[0]
+    assert node_b.receive_transaction(tx, origin='http://a') == (True, "Transaccion verificada y anadida al Mempool.")
+    assert node_b.receive_transaction(tx, origin='http://a') == (True, "Transacción ya conocida.")
+    assert node_b.blockchain.mempool == [tx]
+    # Una copia que llega sin pasar por la caché de vistos tampoco se admite dos veces
+    success, message = node_b.blockchain.new_transaction(
+        tx['sender'], tx['recipient'], tx['amount'], tx['signature'], timestamp=tx['timestamp'])
+    assert not success and "ya está" in message
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_out_of_sequence_block_never_contacts_unregistered_origin(nodes, monkeypatch):
+    node_a, node_b = nodes
+    contacted = []
+    request = node_b.transport.request
+
+    def recording_request(method, peer, path, payload=None):
+        contacted.append(peer)
+        return request(method, peer, path, payload)
+    monkeypatch.setattr(node_b.transport, 'request', recording_request)
+
+    node_a.blockchain.mine_block('miner-a')
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    success, message = node_b.receive_block(block, origin='http://169.254.169.254')
+    assert success and "pares registrados" in message
+    # b se sincroniza con su par registrado, nunca con la URL declarada en la petición
+    assert wait_for(lambda: node_b.blockchain.tip_hash == node_a.blockchain.tip_hash)
+    assert set(contacted) == {'http://a'}
+
+
+def test_out_of_sequence_block_without_peers_is_not_synced(nodes):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    success, message = node_a.receive_block(dict(block, index=block['index'] + 5), origin='http://b')
+    assert not success and "sin pares registrados" in message
+
+
+def test_sync_holds_at_most_sync_max_blocks(nodes, monkeypatch):
+    node_a, node_b = nodes
+    for _ in range(5):
+        node_a.blockchain.mine_block('miner-a')
+    for _ in range(3):
+        node_b.blockchain.mine_block('miner-b')
+    monkeypatch.setattr(network, 'SYNC_PAGE_SIZE', 2)
+
+    # Los génesis difieren: la bifurcación (6 bloques de a frente a 4 de b) no cabe en 2 bloques
+    monkeypatch.setattr(network, 'SYNC_MAX_BLOCKS', 2)
+    replaced, message = node_b.sync_with('http://a')
+    assert not replaced and "supera" in message
+    assert node_b.blockchain.height == 4
+
+    # Con 5 bloques el primer tramo ya es más largo que la cadena local; el resto se aplica después
+    monkeypatch.setattr(network, 'SYNC_MAX_BLOCKS', 5)
+    limits = []
+    request = node_b.transport.request
+
+    def recording_request(method, peer, path, payload=None):
+        limits.append(payload['limit'])
+        return request(method, peer, path, payload)
+    monkeypatch.setattr(node_b.transport, 'request', recording_request)
+    replaced, message = node_b.sync_with('http://a')
+    assert replaced
+    assert node_b.blockchain.tip_hash == node_a.blockchain.tip_hash
+    assert limits == [2, 2, 1, 2]
+
+
+@pytest.mark.parametrize('amount', ['5', 5.9, True])
+def test_block_with_non_int_amount_is_rejected(nodes, amount):
+    node_a, node_b = nodes
+    private_key, public_key = Keys.generate_key_pair()
+    assert node_a.blockchain.issue_faucet_funds(public_key, 100)[0]
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    # Firma válida sobre int(amount): el monto guardado en el bloque no es el que se firmó
+    digest = Blockchain._transaction_digest(public_key, 'bob', int(amount))
+    tx = Blockchain._transaction_payload(public_key, 'bob', amount, Keys.sign_digest(private_key, digest))
+    row_id = node_a.blockchain.storage.queue_mempool_insert(json.dumps(tx))
+    node_a.blockchain._mempool.add(row_id, tx)
+    block, _ = node_a.blockchain.mine_block('miner-a')
+
+    code, body = node_a.transport.request('POST', 'http://b', '/network/block', {'block': block})
+    assert code == 400
+    assert "malformada" in body['message']
+    success, message = node_b.receive_transaction(tx)
+    assert not success and "malformada" in message.lower()
+
+
+@pytest.mark.parametrize('nonce', [float, lambda nonce: True, lambda nonce: -1])
+def test_block_with_non_int_nonce_is_rejected(nodes, nonce):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    forged = dict(block, nonce=nonce(block['nonce']))
+    if isinstance(forged['nonce'], float):
+        # Mismo hash que el bloque auténtico: pasaría la prueba de trabajo
+        assert Blockchain._hash(forged) == Blockchain._hash(block)
+
+    code, body = node_a.transport.request('POST', 'http://b', '/network/block', {'block': forged})
+    assert code == 400
+    assert "Nonce" in body['message']
+    assert node_b.blockchain.height == 2
+    rows = [(3, json.dumps(forged), None)]
+    assert chain_validator._check_blocks(rows, block['previous_hash'], Blockchain._hash, block_target)[0] == 3
+    rows = [(3, json.dumps(block), None)]
+    assert chain_validator._check_blocks(rows, block['previous_hash'], Blockchain._hash, block_target)[0] is None
+
+
+def test_coinbase_with_float_reward_is_rejected(nodes):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    candidate, _ = node_a.blockchain.build_candidate_block('miner-a')
+    candidate['transactions'][0]['amount'] = float(candidate['transactions'][0]['amount'])
+    candidate['merkle_root'] = merkle_root([tx_hash(tx) for tx in candidate['transactions']])
+    candidate['nonce'] = node_a.blockchain.miner.mine(Blockchain._header_prefix(candidate),
+                                                      block_target(candidate))['nonce']
+
+    success, message = node_b.receive_block(candidate, origin='http://a')
+    assert not success and "Coinbase" in message
+
+
+def test_block_from_the_future_is_rejected(nodes):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    candidate, _ = node_a.blockchain.build_candidate_block('miner-a', current_time=time.time() + 3600)
+    candidate['nonce'] = node_a.blockchain.miner.mine(Blockchain._header_prefix(candidate),
+                                                      block_target(candidate))['nonce']
+
+    success, message = node_b.receive_block(candidate, origin='http://a')
+    assert not success and "Marca de tiempo" in message
+    assert node_b.blockchain.height == 2
+
+
+def test_tampered_copy_does_not_block_the_genuine_block(nodes):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    assert node_b.resolve_conflicts()[0]
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    # Misma cabecera (mismo hash) con otro destinatario de la Coinbase
+    forged = json.loads(json.dumps(block))
+    forged['transactions'][0]['recipient'] = 'attacker'
+    assert Blockchain._hash(forged) == Blockchain._hash(block)
+
+    success, message = node_b.receive_block(forged, origin='http://a')
+    assert not success and "Merkle" in message
+    success, message = node_b.receive_block(block, origin='http://a')
+    assert success and node_b.blockchain.height == 3
+    assert node_b.receive_block(block, origin='http://a') == (True, "Bloque ya conocido.")
+
+
+def test_out_of_sequence_block_syncs_with_a_single_gossip_worker(nodes):
+    node_a, node_b = nodes
+    # resolve_conflicts consulta a los pares por el pool de difusión: no debe ejecutarse dentro de él
+    node_b._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='peer-gossip')
+    node_a.blockchain.mine_block('miner-a')
+    block, _ = node_a.blockchain.mine_block('miner-a')
+    success, message = node_b.receive_block(block, origin='http://169.254.169.254')
+    assert success and "pares registrados" in message
+    assert wait_for(lambda: node_b.blockchain.tip_hash == node_a.blockchain.tip_hash)
+    assert node_b._executor.submit(lambda: True).result(timeout=5)
+
+
+@pytest.mark.parametrize('reply', [
+    [],
+    {},
+    {'blocks': None, 'fork_height': 1, 'height': 3},
+    {'blocks': [], 'fork_height': '1', 'height': 3},
+    {'blocks': ['bloque'], 'fork_height': 1, 'height': 3},
+    {'blocks': [{}], 'fork_height': 1, 'height': 5},
+])
+def test_malformed_sync_reply_fails_the_round(nodes, monkeypatch, reply):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    monkeypatch.setattr(network, 'SYNC_PAGE_SIZE', 1)
+    request = node_b.transport.request
+
+    def malformed_request(method, peer, path, payload=None):
+        if path == '/network/sync':
+            return 200, reply
+        return request(method, peer, path, payload)
+    monkeypatch.setattr(node_b.transport, 'request', malformed_request)
+
+    replaced, message = node_b.sync_with('http://a')
+    assert not replaced and "http://a" in message
+    code, body = node_b.transport.request('GET', 'http://b', '/nodes/resolve')
+    assert code == 200 and not body['replaced']
+    assert node_b.blockchain.height == 1
+
+
+def test_malformed_status_reply_is_skipped(nodes, monkeypatch):
+    node_a, node_b = nodes
+    node_a.blockchain.mine_block('miner-a')
+    monkeypatch.setattr(node_b.transport, 'request', lambda method, peer, path, payload=None: (200, {'height': '9'}))
+    assert node_b.resolve_conflicts() == (False, "La cadena local es la de mayor longitud válida.")
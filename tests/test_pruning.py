@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import blockchain as blockchain_module
+from blockchain import Blockchain
+from chain_store import BlockPrunedError, ChainStore
+from keys import Keys
+from pruning import BlockArchive
+from conftest import signed
+
+PRUNED_HEIGHT = 5
+
+
+def open_node(path: str, archive_path: str, monkeypatch) -> Blockchain:
+    monkeypatch.setattr(blockchain_module, 'PRUNE_ARCHIVE', archive_path)
+    node = Blockchain(db_path=path)
+    node.pruner.keep = 2
+    node.pruner.chunk_size = 2
+    return node
+
+
+def close_node(node: Blockchain):
+    if node.storage._closed:
+        return
+    node.miner.shutdown()
+    node.compactor.stop()
+    node.storage.close()
+    if node._chain.archive is not None:
+        node._chain.archive.close()
+
+
+@pytest.fixture(params=['archive', 'no-archive'])
+def pruned(request, tmp_path, monkeypatch):
+    """
+    Nodo con 7 bloques (con transferencias) podado hasta la instantánea de la altura 5, con o sin archivo.
+    Retorna (nodo, bloques anteriores a la poda, ruta de la BD, ruta del archivo).
+    """
+    path = str(tmp_path / 'chain.db')
+    archive_path = str(tmp_path / 'blocks.archive') if request.param == 'archive' else ''
+    node = open_node(path, archive_path, monkeypatch)
+    node.storage.enable_incremental_vacuum()
+    private_key, public_key = Keys.generate_key_pair()
+    assert node.issue_faucet_funds(public_key, 100)[0]
+    node.mine_block('miner')
+    while node.height < 7:
+        assert node.new_transaction(*signed(private_key, public_key, f'r{node.height}', 3))[0]
+        node.mine_block('miner')
+        if node.height == PRUNED_HEIGHT:
+            assert node.create_snapshot()['height'] == PRUNED_HEIGHT
+    blocks = node.chain
+
+    assert node.prune() == {'pruned_height': PRUNED_HEIGHT, 'pruned_blocks': PRUNED_HEIGHT}
+    yield node, blocks, path, archive_path
+    close_node(node)
+
+
+def test_pruned_rows_keep_only_headers(pruned):
+    node, blocks, _, _ = pruned
+    rows = node.storage.query('SELECT "index", block_data, hash FROM blocks ORDER BY "index"')
+    assert [row['block_data'] == '' for row in rows] == [True] * PRUNED_HEIGHT + [False] * 2
+    assert [row['hash'] for row in rows] == [Blockchain._hash(block) for block in blocks]
+    assert node.height == 7 and node.pruned_height == PRUNED_HEIGHT
+    # Los saldos y la validación no necesitan los cuerpos podados
+    assert node.validate_chain(full=True)[0]
+    assert node.get_block('7') == dict(blocks[6], hash=Blockchain._hash(blocks[6]))
+
+
+@pytest.mark.parametrize('pruned', ['archive'], indirect=True)
+def test_archived_blocks_are_read_back(pruned, monkeypatch):
+    node, blocks, path, archive_path = pruned
+    assert node._chain.available_from == 0
+    assert node.get_block('2') == dict(blocks[1], hash=Blockchain._hash(blocks[1]))
+    assert node.get_blocks(0) == blocks
+    assert len(list(node.iter_block_strings(0))) == 7
+
+    # Un ChainStore nuevo sobre la misma BD lee los cuerpos podados del archivo
+    archive = BlockArchive(archive_path, node.storage)
+    try:
+        store = ChainStore(node.storage, Blockchain._hash, tail_size=1, archive=archive)
+        store.load()
+        assert store.pruned_height == PRUNED_HEIGHT
+        assert [store[position] for position in range(7)] == blocks
+        assert list(store.iter_blocks(3, 6)) == blocks[3:6]
+    finally:
+        archive.close()
+
+    # También tras reiniciar el nodo
+    close_node(node)
+    node = open_node(path, archive_path, monkeypatch)
+    try:
+        assert node.pruned_height == PRUNED_HEIGHT
+        assert node.get_blocks(0) == blocks
+    finally:
+        close_node(node)
+
+
+@pytest.mark.parametrize('pruned', ['no-archive'], indirect=True)
+def test_pruned_blocks_without_archive_raise(pruned):
+    node, blocks, _, _ = pruned
+    assert node._chain.available_from == PRUNED_HEIGHT
+    with pytest.raises(BlockPrunedError):
+        node._chain[1]
+    with pytest.raises(BlockPrunedError):
+        node.get_block('3')
+    with pytest.raises(BlockPrunedError):
+        node.get_blocks(0, 2)
+    with pytest.raises(BlockPrunedError):
+        node.iter_block_strings(PRUNED_HEIGHT - 1)
+    # Los bloques posteriores a la poda siguen disponibles
+    assert node.get_blocks(PRUNED_HEIGHT) == blocks[PRUNED_HEIGHT:]
+    assert len(list(node.iter_block_strings(PRUNED_HEIGHT))) == 2
+
+    store = ChainStore(node.storage, Blockchain._hash, tail_size=1)
+    store.load()
+    with pytest.raises(BlockPrunedError):
+        store[0]
+    assert store[PRUNED_HEIGHT] == blocks[PRUNED_HEIGHT]
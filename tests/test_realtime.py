@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from realtime import DeltaPublisher, address_room
+from conftest import signed
+
+
+class RecordingEmit:
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event, payload, to=None):
+        self.events.append((event, payload, to))
+
+    def named(self, event: str) -> list:
+        return [(payload, to) for name, payload, to in self.events if name == event]
+
+
+def test_address_rooms_receive_only_their_transactions(blockchain, funded_key):
+    private_key, public_key = funded_key
+    emit = RecordingEmit()
+    publisher = DeltaPublisher(blockchain, emit, debounce_ms=60_000)
+    results = blockchain.new_transactions_batch([signed(private_key, public_key, f'r{i}', 1) for i in range(3)])
+    assert all(accepted for accepted, _ in results)
+    publisher.flush()
+
+    [(update, _)] = emit.named('actualizacion_mempool')
+    assert len(update['transactions']) == 3
+    rooms = {to: payload for payload, to in emit.named('saldo_actualizado')}
+    assert len(rooms[address_room(public_key)]['transactions']) == 3
+    assert [tx['recipient'] for tx in rooms[address_room('r1')]['transactions']] == ['r1']
+    assert rooms[address_room('r1')]['balance'] == 0
+
+
+def test_evicted_transactions_are_removed_from_clients(blockchain, funded_key):
+    private_key, public_key = funded_key
+    emit = RecordingEmit()
+    publisher = DeltaPublisher(blockchain, emit, debounce_ms=60_000)
+    blockchain._mempool.max_size = 1
+    assert blockchain.new_transaction(*signed(private_key, public_key, 'bob', 1))[0]
+    evicted = blockchain.mempool_with_ids[0]['txid']
+    assert blockchain.new_transaction(*signed(private_key, public_key, 'carol', 2))[0]
+    publisher.flush()
+
+    [(update, _)] = emit.named('actualizacion_mempool')
+    assert update['removed'] == [evicted]
+    assert update['balances'][public_key] == blockchain.get_balance(public_key) == 98
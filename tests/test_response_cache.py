@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from response_cache import ResponseCache
+
+
+def test_version_change_rebuilds_and_replaces_the_entry():
+    cache = ResponseCache(max_bytes=1024, max_item_bytes=1024)
+    builds = []
+
+    def build(body):
+        return lambda: builds.append(body) or body
+
+    assert cache.get_or_build('mempool', None, 1, build(b'[]')) == b'[]'
+    assert cache.get_or_build('mempool', None, 1, build(b'otro')) == b'[]'
+    assert cache.get_or_build('mempool', None, 2, build(b'[1]')) == b'[1]'
+    assert builds == [b'[]', b'[1]']
+    # Nunca conviven dos versiones de la misma respuesta
+    assert len(cache) == 1 and cache.stats()['bytes'] == 3
+    assert cache.stats()['endpoints']['mempool'] == {'hits': 1, 'misses': 2, 'hit_rate': 0.3333}
+
+
+def test_eviction_and_item_size_limit():
+    cache = ResponseCache(max_bytes=10, max_item_bytes=6)
+    cache.get_or_build('chain', 'a', 1, lambda: b'aaaa')
+    cache.get_or_build('chain', 'b', 1, lambda: b'bbbb')
+    cache.get_or_build('chain', 'a', 1, lambda: b'xxxx')
+    cache.get_or_build('chain', 'c', 1, lambda: b'cccc')
+    # Se expulsa la entrada usada hace más tiempo ('b'), no la primera insertada
+    assert cache.get_or_build('chain', 'a', 1, lambda: b'xxxx') == b'aaaa'
+    assert cache.get_or_build('chain', 'b', 1, lambda: b'BBBB') == b'BBBB'
+    assert cache.stats()['bytes'] <= 10
+
+    # Una respuesta mayor que max_item_bytes se sirve pero no se guarda (y descarta la versión anterior)
+    cache.get_or_build('chain', 'big', 1, lambda: b'1234')
+    assert cache.get_or_build('chain', 'big', 2, lambda: b'1234567') == b'1234567'
+    assert cache.get_or_build('chain', 'big', 2, lambda: b'7654321') == b'7654321'
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()['bytes'] == 0
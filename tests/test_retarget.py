@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from retarget import (INITIAL_TARGET, MAX_ADJUSTMENT, MAX_FUTURE_BLOCK_TIME, RETARGET_INTERVAL,
+                      TARGET_BLOCK_TIME, block_target, encode_target, next_target, valid_target, valid_timestamp)
+
+# Primera altura cuyo objetivo se reajusta (la ventana anterior ya está completa)
+RETARGET_HEIGHT = 2 * RETARGET_INTERVAL + 1
+START = 1700000000.0
+
+
+def build_headers(count: int, spacing: float) -> dict:
+    """
+    Cabeceras v3 de alturas 1..count separadas 'spacing' segundos, cada una con el objetivo que le exige
+    next_target.
+    """
+    headers = {}
+    for height in range(1, count + 1):
+        headers[height] = {'version': 3, 'index': height, 'timestamp': START + height * spacing}
+        headers[height]['target'] = encode_target(next_target(headers.__getitem__, height))
+    return headers
+
+
+def test_steady_block_time_keeps_the_target():
+    headers = build_headers(RETARGET_HEIGHT + RETARGET_INTERVAL, TARGET_BLOCK_TIME)
+    assert {block_target(header) for header in headers.values()} == {INITIAL_TARGET}
+    assert all(valid_target(headers.__getitem__, height) for height in headers)
+
+
+@pytest.mark.parametrize('factor, expected', [
+    (100, INITIAL_TARGET * MAX_ADJUSTMENT),
+    (0.01, INITIAL_TARGET // MAX_ADJUSTMENT),
+])
+def test_adjustment_is_clamped_to_max_adjustment(factor, expected):
+    headers = build_headers(RETARGET_HEIGHT, TARGET_BLOCK_TIME * factor)
+    assert block_target(headers[RETARGET_HEIGHT - 1]) == INITIAL_TARGET
+    assert block_target(headers[RETARGET_HEIGHT]) == expected
+
+
+def test_wrong_target_is_rejected():
+    headers = build_headers(RETARGET_HEIGHT, TARGET_BLOCK_TIME * 2)
+    assert valid_target(headers.__getitem__, RETARGET_HEIGHT)
+    # El bloque que reajusta declara el objetivo anterior
+    headers[RETARGET_HEIGHT]['target'] = encode_target(INITIAL_TARGET)
+    assert not valid_target(headers.__getitem__, RETARGET_HEIGHT)
+    # Entre reajustes el objetivo no puede cambiar
+    headers = build_headers(RETARGET_INTERVAL, TARGET_BLOCK_TIME)
+    headers[RETARGET_INTERVAL]['target'] = encode_target(INITIAL_TARGET * 2)
+    assert not valid_target(headers.__getitem__, RETARGET_INTERVAL)
+
+
+def test_version_cannot_go_back():
+    headers = build_headers(3, TARGET_BLOCK_TIME)
+    headers[3] = {'version': 2, 'index': 3, 'timestamp': headers[3]['timestamp']}
+    assert not valid_target(headers.__getitem__, 3)
+
+
+def test_timestamp_rules():
+    headers = build_headers(RETARGET_HEIGHT, TARGET_BLOCK_TIME)
+    height = RETARGET_HEIGHT
+    now = headers[height]['timestamp']
+    assert valid_timestamp(headers.__getitem__, height, now)
+
+    # Anterior o igual a la mediana de los 11 bloques previos (la de la altura height - 6)
+    for timestamp in (headers[height - 6]['timestamp'], START):
+        headers[height]['timestamp'] = timestamp
+        assert not valid_timestamp(headers.__getitem__, height, now)
+    # Posterior a la mediana aunque anterior al bloque previo: se admite (los relojes no están sincronizados)
+    headers[height]['timestamp'] = headers[height - 6]['timestamp'] + 1
+    assert valid_timestamp(headers.__getitem__, height, now)
+
+    # Demasiado adelantado respecto al reloj local
+    headers[height]['timestamp'] = now + MAX_FUTURE_BLOCK_TIME + 1
+    assert not valid_timestamp(headers.__getitem__, height, now)
+    for timestamp in (float('nan'), float('inf'), '1700000300', True, None):
+        headers[height]['timestamp'] = timestamp
+        assert not valid_timestamp(headers.__getitem__, height, now)
+
+
+def test_far_future_timestamps_cannot_stretch_a_window():
+    # Un par que adelanta la última marca de la ventana una hora no la acepta ningún nodo honesto
+    headers = build_headers(RETARGET_HEIGHT, TARGET_BLOCK_TIME)
+    last = RETARGET_HEIGHT - 1
+    now = headers[last]['timestamp']
+    headers[last]['timestamp'] += 3600
+    assert not valid_timestamp(headers.__getitem__, last, now)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import zlib
+
+import pytest
+
+from blockchain import Blockchain, MINING_REWARD
+from snapshots import SNAPSHOT_FORMAT, decode_snapshot
+
+
+@pytest.fixture
+def peer(tmp_path):
+    node = Blockchain(db_path=str(tmp_path / 'peer.db'))
+    yield node
+    node.miner.shutdown()
+    node.storage.close()
+
+
+def test_create_and_decode(blockchain):
+    blockchain.mine_block('miner')
+    meta = blockchain.create_snapshot()
+    assert (meta['height'], meta['tip_hash']) == (2, blockchain.tip_hash)
+    assert [snapshot['height'] for snapshot in blockchain.snapshots.list()] == [2]
+
+    raw_meta, data = blockchain.snapshots.raw(2)
+    assert raw_meta['state_hash'] == meta['state_hash']
+    snapshot = decode_snapshot(data, meta['state_hash'])
+    assert snapshot['format'] == SNAPSHOT_FORMAT and snapshot['tip_header'] == blockchain._chain.header(1)
+    assert snapshot['miners'] == {'miner': [MINING_REWARD, 1, 2, 2]}
+    assert {address: entry[0] for address, entry in snapshot['addresses'].items()} == blockchain.stats.balances()
+    assert blockchain.snapshots.raw(3) == (None, None)
+
+
+def test_decode_rejects_corrupt_or_mismatching_data():
+    raw = json.dumps({'height': 1}).encode()
+    data = zlib.compress(raw)
+    assert decode_snapshot(data, hashlib.sha256(raw).hexdigest()) == {'height': 1}
+    with pytest.raises(ValueError):
+        decode_snapshot(data, '00' * 32)
+    with pytest.raises(ValueError):
+        decode_snapshot(data[:-4])
+
+
+def test_latest_on_picks_the_newest_snapshot_of_the_given_chain(blockchain, peer):
+    blockchain.mine_block('miner')
+    blockchain.create_snapshot()
+    blockchain.mine_block('miner')
+    blockchain.create_snapshot()
+    assert blockchain.snapshots.latest_on(blockchain._chain)['height'] == 3
+    assert blockchain.snapshots.latest_on(blockchain._chain, max_height=2)['height'] == 2
+    assert blockchain.snapshots.latest_on(blockchain._chain, max_height=1) is None
+    # Ninguna instantánea pertenece a otra cadena
+    assert blockchain.snapshots.latest_on(peer._chain) is None
+
+    # Una instantánea cuyo contenido no corresponde a su hash se salta
+    with blockchain.storage.write() as cursor:
+        cursor.execute('UPDATE snapshots SET data = ? WHERE height = 3', (zlib.compress(b'{}'),))
+    assert blockchain.snapshots.latest_on(blockchain._chain)['height'] == 2
+
+
+def test_snapshot_seeds_the_ledger_rebuild(blockchain):
+    for _ in range(3):
+        blockchain.mine_block('miner')
+    blockchain.create_snapshot()
+    blockchain.mine_block('miner')
+    expected = blockchain.stats.balances()
+    base = blockchain.snapshots.latest_on(blockchain._chain)
+    assert base['height'] == 4
+    # Desde la instantánea solo se recorre el bloque 5
+    assert blockchain.stats.rebuild(blockchain._chain, base) == expected
+    assert blockchain.get_leaders() == {'miner': 4 * MINING_REWARD}
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from blockchain import Blockchain, FOUNDER_ADDRESS, GENESIS_SUPPLY, MINING_REWARD
+from conftest import signed
+
+
+@pytest.fixture
+def peer(tmp_path):
+    node = Blockchain(db_path=str(tmp_path / 'peer.db'))
+    yield node
+    node.miner.shutdown()
+    node.storage.close()
+
+
+def test_leaders_and_address_stats_after_mining(blockchain, funded_key):
+    # funded_key: Faucet de 100 al bloque 2, minado por 'test-miner'
+    _, public_key = funded_key
+    assert blockchain.new_transaction(*signed(*funded_key, 'bob', 30))[0]
+    blockchain.mine_block('alice')
+    blockchain.mine_block('alice')
+
+    assert blockchain.get_leaders() == {'alice': 2 * MINING_REWARD, 'test-miner': MINING_REWARD}
+    assert blockchain.get_leaders(1) == {'alice': 2 * MINING_REWARD}
+    assert blockchain.get_address_stats(public_key) == {
+        'address': public_key, 'balance': 70, 'tx_count': 2, 'first_seen': 2, 'last_seen': 3, 'mining': None}
+    alice = blockchain.get_address_stats('alice')
+    assert alice['balance'] == 2 * MINING_REWARD and (alice['first_seen'], alice['last_seen']) == (3, 4)
+    assert alice['mining'] == {'rewards': 2 * MINING_REWARD, 'blocks': 2, 'first_block': 3, 'last_block': 4}
+    assert blockchain.get_address_stats(FOUNDER_ADDRESS)['balance'] == GENESIS_SUPPLY - 100
+    assert blockchain.get_address_stats('nadie') is None
+
+
+def test_stats_follow_a_reorganisation(blockchain, peer):
+    for _ in range(2):
+        blockchain.mine_block('local-miner')
+    for _ in range(4):
+        peer.mine_block('peer-miner')
+    generation = blockchain.stats.generation
+
+    assert blockchain.replace_suffix(0, peer.get_blocks(0))[0]
+    assert blockchain.tip_hash == peer.tip_hash
+    assert blockchain.stats.generation == generation + 1
+    assert blockchain.get_leaders() == peer.get_leaders() == {'peer-miner': 4 * MINING_REWARD}
+    assert blockchain.get_address_stats('local-miner') is None
+    assert blockchain.get_address_stats('peer-miner') == peer.get_address_stats('peer-miner')
+    assert blockchain.stats.balances() == peer.stats.balances()
+
+    # Los bloques siguientes se aplican de forma incremental sobre las estadísticas recalculadas
+    blockchain.mine_block('local-miner')
+    assert blockchain.get_leaders() == {'peer-miner': 4 * MINING_REWARD, 'local-miner': MINING_REWARD}
+    assert blockchain.stats.state() == (6, blockchain.tip_hash)
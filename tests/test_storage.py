@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from blockchain import Blockchain
+from storage import SQL_DELETE_MEMPOOL_BY_ID, Storage
+from conftest import signed
+
+
+@pytest.fixture
+def slow_commit_node(tmp_path):
+    """
+    Nodo cuyo group commit del mempool solo se vacía cada 200 ms.
+    """
+    node = Blockchain(storage=Storage(str(tmp_path / 'chain.db'), group_commit_ms=200))
+    yield node
+    node.miner.shutdown()
+    node.storage.close()
+
+
+def committed_mempool_ids(storage: Storage) -> list:
+    return [row['id'] for row in storage.query("SELECT id FROM mempool ORDER BY id")]
+
+
+def test_admitted_transaction_is_committed_before_returning(slow_commit_node):
+    assert slow_commit_node.issue_faucet_funds('alice', 5)[0]
+    assert committed_mempool_ids(slow_commit_node.storage) == [slow_commit_node._mempool.select()[0][0]]
+
+
+def test_block_insert_and_mempool_delete_are_atomic(blockchain, funded_key, monkeypatch):
+    assert blockchain.new_transaction(*signed(*funded_key, 'bob', 1))[0]
+    pending_ids = committed_mempool_ids(blockchain.storage)
+    height, tip_hash = blockchain.height, blockchain.tip_hash
+
+    def failing_index(cursor, block):
+        raise sqlite3.OperationalError('disco lleno')
+    monkeypatch.setattr(blockchain.tx_index, 'index_block', failing_index)
+    with pytest.raises(sqlite3.OperationalError):
+        blockchain.mine_block('miner')
+
+    # Ni el bloque ni la limpieza del mempool llegaron a la BD, y el estado en memoria no cambió
+    assert blockchain.storage.query('SELECT COUNT(*) AS n FROM blocks')[0]['n'] == height
+    assert committed_mempool_ids(blockchain.storage) == pending_ids
+    assert (blockchain.height, blockchain.tip_hash) == (height, tip_hash)
+    assert len(blockchain.mempool) == 1
+
+    monkeypatch.undo()
+    block, _ = blockchain.mine_block('miner')
+    assert block['transactions'][1]['recipient'] == 'bob'
+    assert committed_mempool_ids(blockchain.storage) == [] and blockchain.mempool == []
+
+
+def test_queued_mempool_rows_survive_a_failed_write(tmp_path):
+    storage = Storage(str(tmp_path / 'chain.db'), group_commit_ms=60_000)
+    try:
+        row_id = storage.queue_mempool_insert('{"amount": 1}')
+        with pytest.raises(RuntimeError):
+            with storage.write() as cursor:
+                cursor.execute(SQL_DELETE_MEMPOOL_BY_ID, (row_id,))
+                raise RuntimeError('fallo a mitad de la transacción')
+        assert committed_mempool_ids(storage) == []
+        # La inserción revertida vuelve a la cola y se confirma con el siguiente lote
+        storage.flush()
+        storage.wait_committed(row_id)
+        assert committed_mempool_ids(storage) == [row_id]
+    finally:
+        storage.close()
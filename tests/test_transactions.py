@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from keys import Keys
+from conftest import signed
+
+
+@pytest.mark.parametrize('amount', [0, -50])
+def test_non_positive_amount_is_rejected(blockchain, amount):
+    private_key, public_key = Keys.generate_key_pair()
+    tx = signed(private_key, public_key, 'bob', amount)
+
+    assert not blockchain.verify_transaction(*tx)[0]
+    assert not blockchain.new_transaction(*tx)[0]
+    assert blockchain.new_transactions_batch([tx]) == [(False, blockchain.verify_transaction(*tx)[1])]
+    assert blockchain.mempool == []
+    # El bloque minado no crea fondos y sigue siendo válido para cualquier par
+    blockchain.mine_block('test-miner')
+    assert blockchain.get_balance(public_key) == 0
+    assert blockchain.is_chain_valid(full=True)
+
+
+def test_system_sender_is_rejected(blockchain):
+    assert not blockchain.verify_transaction("SYSTEM", 'bob', 10, "SYSTEM_SIGNATURE")[0]
+    assert not blockchain.new_transactions_batch([("SYSTEM", 'bob', 10, "SYSTEM_SIGNATURE")])[0][0]
+
+
+def test_batch_rejects_only_malformed_items(blockchain, funded_key):
+    good = signed(*funded_key, 'bob', 10)
+    bad = signed(*funded_key, 'carol', -10)
+    results = blockchain.new_transactions_batch([bad, good])
+    assert [accepted for accepted, _ in results] == [False, True]
+    assert blockchain.get_balance(funded_key[1]) == 90
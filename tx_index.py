@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from merkle import tx_hash
+from chain_store import CHAIN_PAGE_SIZE
+
+# ==========================================
+# ÍNDICE DE TRANSACCIONES Y DIRECCIONES
+# ==========================================
+# Tamaño de página por defecto y máximo de /address/<addr>/history
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+SQL_INSERT_TRANSACTION = '''
+    INSERT INTO transactions (block_index, position, txid, sender, recipient, amount, signature, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_INSERT_ADDRESS_TX = 'INSERT OR IGNORE INTO address_tx (address, block_index, position) VALUES (?, ?, ?)'
+SQL_DELETE_TRANSACTIONS_ABOVE = 'DELETE FROM transactions WHERE block_index > ?'
+SQL_DELETE_ADDRESS_TX_ABOVE = 'DELETE FROM address_tx WHERE block_index > ?'
+SQL_DELETE_TRANSACTIONS_RANGE = 'DELETE FROM transactions WHERE block_index BETWEEN ? AND ?'
+SQL_DELETE_ADDRESS_TX_RANGE = 'DELETE FROM address_tx WHERE block_index BETWEEN ? AND ?'
+SQL_SELECT_INDEXED_HEIGHT = 'SELECT COALESCE(MAX(block_index), 0) AS height FROM transactions'
+SQL_SELECT_TX_BY_ID = '''
+    SELECT block_index, position, txid, sender, recipient, amount, signature, timestamp
+    FROM transactions WHERE txid = ? ORDER BY block_index ASC, position ASC
+'''
+SQL_SELECT_ADDRESS_HISTORY = '''
+    SELECT t.block_index, t.position, t.txid, t.sender, t.recipient, t.amount, t.signature, t.timestamp
+    FROM address_tx a JOIN transactions t ON t.block_index = a.block_index AND t.position = a.position
+    WHERE a.address = ? AND (a.block_index, a.position) < (?, ?)
+    ORDER BY a.block_index DESC, a.position DESC
+    LIMIT ?
+'''
+
+
+def _transaction_from_row(row) -> dict:
+    """
+    Reconstruye la transacción tal como está en el bloque (el timestamp solo existe en las no-Coinbase).
+    """
+    tx = {'sender': row['sender'], 'recipient': row['recipient'], 'amount': row['amount'], 'signature': row['signature']}
+    if row['timestamp'] is not None:
+        tx['timestamp'] = row['timestamp']
+    return tx
+
+
+class TransactionIndex:
+    """
+    Tablas normalizadas 'transactions' (una fila por transacción confirmada, con su txid indexado)
+    y 'address_tx' (dirección -> posiciones de sus transacciones). Permiten buscar una transacción
+    o el historial de una dirección en O(log n) sin recorrer la cadena.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def index_block(self, cursor, block: dict):
+        """
+        Indexa las transacciones de un bloque dentro de la transacción BD abierta por quien lo persiste.
+        """
+        height = block['index']
+        transactions, addresses = [], []
+        for position, tx in enumerate(block['transactions']):
+            transactions.append((height, position, tx_hash(tx), tx['sender'], tx['recipient'], int(tx['amount']),
+                                 tx.get('signature'), tx.get('timestamp')))
+            addresses.append((tx['sender'], height, position))
+            addresses.append((tx['recipient'], height, position))
+        cursor.executemany(SQL_INSERT_TRANSACTION, transactions)
+        cursor.executemany(SQL_INSERT_ADDRESS_TX, addresses)
+
+    def delete_above(self, cursor, height: int):
+        """
+        Elimina del índice los bloques de altura > height (reorganización de la cadena).
+        """
+        cursor.execute(SQL_DELETE_TRANSACTIONS_ABOVE, (height,))
+        cursor.execute(SQL_DELETE_ADDRESS_TX_ABOVE, (height,))
+
+    def delete_range(self, cursor, first_height: int, last_height: int):
+        """
+        Elimina del índice los bloques de altura [first_height, last_height] (poda con PRUNE_TX_INDEX).
+        """
+        cursor.execute(SQL_DELETE_TRANSACTIONS_RANGE, (first_height, last_height))
+        cursor.execute(SQL_DELETE_ADDRESS_TX_RANGE, (first_height, last_height))
+
+    def backfill(self, chain):
+        """
+        Migración: indexa los bloques guardados antes de existir estas tablas (o no indexados aún),
+        por páginas y en una transacción BD por página.
+        """
+        indexed = self.storage.query(SQL_SELECT_INDEXED_HEIGHT)[0]['height']
+        # Cualquier resto por encima de la cadena actual (p. ej. de una reorganización interrumpida)
+        with self.storage.write() as cursor:
+            self.delete_above(cursor, min(indexed, len(chain)))
+        for page_start in range(min(indexed, len(chain)), len(chain), CHAIN_PAGE_SIZE):
+            with self.storage.write() as cursor:
+                for block in chain.iter_blocks(page_start, page_start + CHAIN_PAGE_SIZE):
+                    self.index_block(cursor, block)
+
+    def find(self, txid: str) -> list:
+        """
+        Apariciones confirmadas de un txid, de la más antigua a la más reciente, como
+        dicts {'block_index', 'position', 'transaction'}. Una misma Coinbase puede repetirse en varios bloques.
+        """
+        return [
+            {'block_index': row['block_index'], 'position': row['position'], 'transaction': _transaction_from_row(row)}
+            for row in self.storage.query(SQL_SELECT_TX_BY_ID, (txid,))
+        ]
+
+    def history(self, address: str, before: tuple = None, limit: int = None) -> tuple[list, tuple]:
+        """
+        Historial de una dirección de la más reciente a la más antigua, por páginas.
+
+        Parámetros:
+            before (tuple): (block_index, position) desde donde continuar (excluido); None para empezar por la punta.
+            limit (int): Tamaño de página (por defecto HISTORY_PAGE_SIZE, como máximo MAX_HISTORY_PAGE_SIZE).
+
+        Retorna:
+            tuple[list, tuple]: (entradas de la página, posición para la página siguiente o None).
+        """
+        limit = min(limit or HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE)
+        before = before or (2 ** 62, 0)
+        rows = self.storage.query(SQL_SELECT_ADDRESS_HISTORY, (address, before[0], before[1], limit))
+        entries = [{
+            'txid': row['txid'],
+            'block_index': row['block_index'],
+            'position': row['position'],
+            'direction': 'out' if row['sender'] == address else 'in',
+            'transaction': _transaction_from_row(row)
+        } for row in rows]
+        next_before = (rows[-1]['block_index'], rows[-1]['position']) if len(rows) == limit else None
+        return entries, next_before
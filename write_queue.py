@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from time import perf_counter
+
+import metrics
+
+# Espera en cola y ejecución de cada mutación del estado (operation: nombre del método)
+WRITE_QUEUE_WAIT_SECONDS = metrics.histogram('state_write_queue_wait_seconds',
+                                             'Tiempo que una mutación del estado espera en la cola de escritura.',
+                                             ('operation',))
+WRITE_SECONDS = metrics.histogram('state_write_seconds', 'Duración de cada mutación del estado en el escritor.',
+                                  ('operation',))
+
+
+class WriteQueue:
+    """
+    Cola de escritura con un único consumidor: todas las mutaciones del estado del nodo se ejecutan
+    de una en una, en orden de llegada, en el mismo hilo escritor.
+    Así ninguna mutación observa a otra a medias (saldos, Mempool, cadena y BD avanzan juntos) y el
+    orden de admisión de transacciones es el de llegada, sin depender del reparto de un candado.
+    Las llamadas hechas desde el propio hilo escritor se ejecutan en línea (p. ej. el Faucet que
+    admite su transacción, o una reorganización que devuelve transacciones al Mempool).
+    """
+
+    def __init__(self, name: str = 'state-writer'):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def in_writer(self) -> bool:
+        return threading.get_ident() == self._thread.ident
+
+    def call(self, function, *args, **kwargs):
+        """
+        Encola la mutación, espera a que el escritor la ejecute y retorna su resultado
+        (o relanza su excepción en el hilo que la pidió).
+        """
+        if self.in_writer():
+            return function(*args, **kwargs)
+        future = Future()
+        self._queue.put((future, perf_counter(), function, args, kwargs))
+        return future.result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, queued_at, function, args, kwargs = item
+            started = perf_counter()
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                if metrics.METRICS_ENABLED:
+                    WRITE_QUEUE_WAIT_SECONDS.observe(started - queued_at, function.__name__)
+                    WRITE_SECONDS.observe(perf_counter() - started, function.__name__)
+
+    def close(self):
+        """
+        Detiene el escritor después de ejecutar lo ya encolado.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+def serialized(method):
+    """
+    Decorador de métodos de mutación: el cuerpo se ejecuta en la WriteQueue del objeto ('_writes').
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._writes.call(method, self, *args, **kwargs)
+    return wrapper